@@ -0,0 +1,37 @@
+"""
+Benchmarks for ogn-lib.
+
+Every module can be executed as a script from the root of the repository,
+e.g. `python -m benchmarks.records`.
+"""
+
+import os
+import timeit
+
+
+def load_messages():
+    """
+    Loads the sample messages used by the tests.
+
+    :return: list of raw APRS messages
+    :rtype: list
+    """
+
+    root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+    with open(os.path.join(root, 'tests', 'messages.txt'), 'r') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def best_of(func, number, repeat=5):
+    """
+    Returns the best time (in seconds) of a single call of `func`.
+
+    :param callable func: benchmarked function
+    :param int number: number of calls per measurement
+    :param int repeat: number of measurements
+    :return: time of a single call
+    :rtype: float
+    """
+
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
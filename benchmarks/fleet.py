@@ -0,0 +1,89 @@
+"""
+Measures FleetState with N_AIRCRAFT concurrent aircraft: update and lookup
+times, snapshot time and the memory of the table compared with a dictionary
+of the latest beacon per aircraft.
+"""
+
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmarks import best_of
+from ogn_lib import fleet
+
+
+N_AIRCRAFT = 50000
+N_UPDATES = 200000
+T0 = datetime(2018, 1, 1)
+
+
+def synthetic_beacons():
+    rnd = random.Random(42)
+    receivers = ['RCV{:04d}'.format(i) for i in range(500)]
+
+    for i in range(N_UPDATES):
+        uid = '{:08X}'.format(rnd.randrange(N_AIRCRAFT))
+        yield {'from': 'FLR' + uid[2:], 'uid': uid,
+               'timestamp': T0 + timedelta(seconds=i // 100),
+               'latitude': rnd.uniform(-60, 60),
+               'longitude': rnd.uniform(-180, 180),
+               'altitude': rnd.uniform(0, 5000),
+               'ground_speed': rnd.uniform(0, 80),
+               'vertical_speed': rnd.uniform(-5, 5),
+               'heading': rnd.randrange(360),
+               'receiver': rnd.choice(receivers)}
+
+
+def retained_size(update, beacons):
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    table = update(beacons)
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return table, end - start
+
+
+def fill_fleet(beacons):
+    state = fleet.FleetState(ttl=3600)
+    for beacon in beacons:
+        state.update(beacon)
+    return state
+
+
+def fill_dict(beacons):
+    latest = {}
+    for beacon in beacons:
+        latest[beacon['uid']] = {
+            key: beacon[key] for key in ('timestamp', 'latitude', 'longitude',
+                                         'altitude', 'ground_speed',
+                                         'vertical_speed', 'heading',
+                                         'receiver')}
+    return latest
+
+
+def main():
+    beacons = list(synthetic_beacons())
+
+    start = time.perf_counter()
+    state = fill_fleet(beacons)
+    elapsed = time.perf_counter() - start
+    print('aircraft:  {}'.format(len(state)))
+    print('update:    {:6.0f} ns/beacon'.format(elapsed / N_UPDATES * 1e9))
+
+    keys = [b['uid'] for b in beacons[:1000]]
+    lookup = best_of(lambda: [state.get(k) for k in keys], 100)
+    print('get:       {:6.0f} ns'.format(lookup / len(keys) * 1e9))
+
+    snapshot = best_of(state.snapshot, 3, 3)
+    print('snapshot:  {:6.1f} ms'.format(snapshot * 1e3))
+
+    # Beacons are copied so the table does not share them with the list
+    _, table_size = retained_size(fill_fleet, [dict(b) for b in beacons])
+    _, dict_size = retained_size(fill_dict, [dict(b) for b in beacons])
+    print('memory:    FleetState {:.1f} MB, dict of dicts {:.1f} MB'.format(
+        table_size / 1e6, dict_size / 1e6))
+
+
+if __name__ == '__main__':
+    main()
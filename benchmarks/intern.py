@@ -0,0 +1,75 @@
+"""
+Measures the memory retained by a window of recently parsed beacons with and
+without the string intern pool (Parser.string_pool).
+
+The synthetic stream contains N_DEVICES aircraft heard by N_RECEIVERS
+receivers; every message is built separately, as if received from the socket.
+"""
+
+import collections
+import random
+import tracemalloc
+
+from benchmarks import load_messages
+from ogn_lib import cache, parser, records
+
+
+N_MESSAGES = 300000
+WINDOW = 100000
+N_DEVICES = 20000
+N_RECEIVERS = 500
+
+
+def synthetic_messages():
+    """
+    Generates the synthetic stream of aircraft beacons.
+    """
+
+    rnd = random.Random(42)
+    bodies = []
+    for msg in load_messages():
+        header, body = msg.split(':', 1)
+        if header.split('>')[1].startswith('APRS,') and ' id' in body:
+            bodies.append(body.split(' id', 1)[0])
+
+    for _ in range(N_MESSAGES):
+        device = rnd.randrange(N_DEVICES)
+        yield 'FLR{:06X}>APRS,qAS,RCV{:04d}:{} id06{:06X} -019fpm'.format(
+            device, rnd.randrange(N_RECEIVERS), rnd.choice(bodies), device)
+
+
+def retained_size(pool):
+    """
+    Returns the number of bytes retained by the window of parsed beacons and
+    the pool.
+    """
+
+    parser.Parser.string_pool = pool
+    parser.APRS.id_cache.clear()
+    parse = records.RecordParser(keep_raw=False)
+
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    window = collections.deque(maxlen=WINDOW)
+    for msg in synthetic_messages():
+        window.append(parse(msg))
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    parser.Parser.string_pool = None
+    return end - start
+
+
+def main():
+    plain = retained_size(None)
+    print('no pool:   {:6.1f} MB'.format(plain / 1e6))
+
+    pool = cache.InternPool()
+    interned = retained_size(pool)
+    print('with pool: {:6.1f} MB ({:.0%})'.format(interned / 1e6,
+                                                  interned / plain))
+    print('pool:      {}'.format(pool.stats()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Measures the throughput of ParallelParser with 1 to N worker processes and
+the cost of the parsed chunks in the parent process.
+
+The parent process parses nothing, but it unpickles every parsed chunk, so
+the unpickling time per message limits the speedup regardless of the number
+of workers.
+"""
+
+import multiprocessing
+import pickle
+import sys
+import time
+
+from benchmarks import best_of, load_messages
+from ogn_lib import parallel, parser
+
+
+N_MESSAGES = 100000
+CHUNK_SIZE = 500
+
+
+def throughput(parse_many, messages):
+    start = time.perf_counter()
+    count = sum(1 for _ in parse_many(messages))
+    elapsed = time.perf_counter() - start
+
+    assert count == len(messages)
+    return len(messages) / elapsed
+
+
+def main():
+    sample = load_messages()
+    messages = [sample[i % len(sample)] for i in range(N_MESSAGES)]
+
+    # A chunk is returned by the workers as a single pickled list
+    chunk = messages[:CHUNK_SIZE]
+    payload = pickle.dumps(list(parser.Parser.parse_many(chunk)),
+                           pickle.HIGHEST_PROTOCOL)
+
+    parse = best_of(lambda: list(parser.Parser.parse_many(chunk)), 5)
+    load = best_of(lambda: pickle.loads(payload), 20)
+    print('payload: {:.0f} B/message'.format(len(payload) / CHUNK_SIZE))
+    print('parse: {:.1f} us/message, parent unpickle: {:.1f} us/message '
+          '(speedup limit {:.1f}x)'.format(1e6 * parse / CHUNK_SIZE,
+                                           1e6 * load / CHUNK_SIZE,
+                                           parse / load))
+
+    baseline = throughput(parser.Parser.parse_many, messages)
+    print('in-process:   {:8.0f} messages/s'.format(baseline))
+
+    max_processes = (int(sys.argv[1]) if len(sys.argv) > 1
+                     else multiprocessing.cpu_count())
+
+    for processes in range(1, max_processes + 1):
+        with parallel.ParallelParser(processes=processes,
+                                     chunk_size=CHUNK_SIZE) as p:
+            list(p.parse_many(messages[:1000]))  # start the workers
+            rate = throughput(p.parse_many, messages)
+
+        print('{:2} processes: {:8.0f} messages/s ({:.2f}x)'.format(
+            processes, rate, rate / baseline))
+
+
+if __name__ == '__main__':
+    main()
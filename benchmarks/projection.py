@@ -0,0 +1,40 @@
+"""
+Compares the full parser with parsers compiled for a subset of the fields
+(Parser.compile).
+"""
+
+from benchmarks import best_of, load_messages
+from ogn_lib import parser
+
+
+PROJECTIONS = [
+    ('position', {'from', 'timestamp', 'latitude', 'longitude'}),
+    ('position+motion', {'from', 'timestamp', 'latitude', 'longitude',
+                         'altitude', 'heading', 'ground_speed'}),
+    ('position+climb', {'from', 'timestamp', 'latitude', 'longitude',
+                        'vertical_speed'})
+]
+
+
+def main():
+    messages = load_messages()
+
+    def run_full():
+        list(parser.Parser.parse_many(messages))
+
+    full = best_of(run_full, number=200, repeat=7) / len(messages)
+    print('{:16}: {:5.2f} us/message'.format('full', full * 1e6))
+
+    for name, fields in PROJECTIONS:
+        projected = parser.Parser.compile(fields)
+
+        def run():
+            list(projected.parse_many(messages))
+
+        t = best_of(run, number=200, repeat=7) / len(messages)
+        print('{:16}: {:5.2f} us/message ({:.1f}x)'.format(name, t * 1e6,
+                                                           full / t))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Measures the throughput of reading messages from a local socket pair with the
+text-mode file returned by `socket.makefile` (OgnClient's former reader) and
+with ogn_lib.reader.LineReader in bulk (`bulk_read=True`), with and without a
+prefilter.
+"""
+
+import socket
+import threading
+import time
+
+from benchmarks import load_messages
+from ogn_lib import filters, reader
+
+
+N_MESSAGES = 500000
+
+
+def send(sock, payload):
+    sock.sendall(payload)
+    sock.close()
+
+
+def text_reader(sock, prefilter):
+    """
+    Reads the messages like OgnClient._read_lines.
+    """
+
+    sock_file = sock.makefile()
+    count = 0
+
+    while True:
+        line = sock_file.readline()
+        if not line:
+            return count
+
+        line = line.strip()
+        if line.startswith('#'):
+            continue
+        if line and (prefilter is None or prefilter(line)):
+            count += 1
+
+
+def bulk_reader(sock, prefilter):
+    """
+    Reads the messages like OgnClient._read_batches.
+    """
+
+    line_reader = reader.LineReader(sock)
+    count = 0
+
+    while True:
+        lines = line_reader.read_lines()
+        if lines is None:
+            return count
+
+        if prefilter is None:
+            batch = [line.decode(errors='replace') for line in lines
+                     if line and not line.startswith(b'#')]
+        else:
+            batch = [line.decode(errors='replace') for line in lines
+                     if line and not line.startswith(b'#') and
+                     prefilter(line)]
+        count += len(batch)
+
+
+def throughput(read, payload, prefilter):
+    left, right = socket.socketpair()
+    thread = threading.Thread(target=send, args=(right, payload))
+
+    start = time.perf_counter()
+    thread.start()
+    count = read(left, prefilter)
+    elapsed = time.perf_counter() - start
+
+    thread.join()
+    left.close()
+    return count, N_MESSAGES / elapsed
+
+
+def main():
+    sample = load_messages()
+    payload = ''.join(sample[i % len(sample)] + '\r\n'
+                      for i in range(N_MESSAGES)).encode()
+
+    cases = [
+        ('no prefilter', None, None),
+        ('sources=FLR', filters.HeaderFilter(sources=['FLR']),
+         filters.HeaderFilter(sources=['FLR'], binary=True))
+    ]
+
+    for name, text_filter, bytes_filter in cases:
+        accepted, text = throughput(text_reader, payload, text_filter)
+        _, bulk = throughput(bulk_reader, payload, bytes_filter)
+        print('{:13} ({:6} accepted): makefile {:8.0f} lines/s, '
+              'LineReader {:8.0f} lines/s ({:.2f}x)'.format(
+                  name, accepted, text, bulk, bulk / text))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Measures the time spent in the receiving thread per recorded message with
+Recorder (gzip compression in the writer thread) and with writing the
+messages to a gzip file directly in the callback.
+"""
+
+import gzip
+import os
+import tempfile
+import time
+
+from benchmarks import load_messages
+from ogn_lib import recorder
+
+
+N_MESSAGES = 200000
+
+
+def callback_time(callback, messages):
+    start = time.perf_counter()
+    for message in messages:
+        callback(message)
+    return (time.perf_counter() - start) / len(messages)
+
+
+def main():
+    sample = load_messages()
+    messages = [sample[i % len(sample)] for i in range(N_MESSAGES)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        with gzip.open(os.path.join(directory, 'direct.gz'), 'wt') as f:
+            direct = callback_time(
+                lambda m: f.write('{:.3f} {}\n'.format(time.time(), m)),
+                messages)
+
+        r = recorder.Recorder(directory, compression='gzip')
+        queued = callback_time(r, messages)
+        start = time.perf_counter()
+        r.close()
+        drain = time.perf_counter() - start
+
+    print('gzip write in callback: {:6.0f} ns/message'.format(direct * 1e9))
+    print('Recorder:               {:6.0f} ns/message '
+          '(writer thread finished {:.2f}s after the last message)'.format(
+              queued * 1e9, drain))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Compares the memory retained by parsed messages stored as dictionaries and as
+beacon records, and the parsing time of both.
+
+RecordParser converts the dictionaries returned by Parser, so records cost
+extra time per message and only save the memory of the kept messages.
+"""
+
+import tracemalloc
+
+from benchmarks import best_of, load_messages
+from ogn_lib import parser, records
+
+
+N_MESSAGES = 100000
+
+
+def retained_size(parse, messages):
+    """
+    Returns the number of bytes retained by the parsed messages.
+    """
+
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    parsed = [parse(m) for m in messages]
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert len(parsed) == len(messages)
+    return end - start
+
+
+def main():
+    sample = [m for m in load_messages() if 'TCPIP*' not in m]
+    # Each message gets its own string, as if received from the socket
+    messages = [(sample[i % len(sample)] + ' ')[:-1] for i in range(N_MESSAGES)]
+
+    def parse_time(parse):
+        return best_of(lambda: [parse(m) for m in sample], 20) / len(sample)
+
+    dicts = retained_size(parser.Parser, messages)
+    dict_time = parse_time(parser.Parser)
+    print('dict:                {:6.0f} B/beacon, {:5.1f} us/beacon'
+          .format(dicts / N_MESSAGES, 1e6 * dict_time))
+
+    for keep_raw in (True, False):
+        record_parser = records.RecordParser(keep_raw=keep_raw)
+        size = retained_size(record_parser, messages)
+        time_ = parse_time(record_parser)
+        print('record (raw={!s:5}): {:6.0f} B/beacon ({:.0%} of dict), '
+              '{:5.1f} us/beacon ({:+.1f} us for the conversion)'
+              .format(keep_raw, size / N_MESSAGES, size / dicts, 1e6 * time_,
+                      1e6 * (time_ - dict_time)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Measures the replay throughput (as fast as possible) of plain, gzip and lzma
+recordings, with raw messages and with Parser.
+"""
+
+import os
+import tempfile
+
+from benchmarks import load_messages
+from ogn_lib import parser, recorder, replay
+
+
+N_MESSAGES = 200000
+RECEIVED = 1514793121.0
+
+
+def main():
+    sample = load_messages()
+    lines = ['{:.3f} {}\n'.format(RECEIVED + i / 1000, sample[i % len(sample)])
+             for i in range(N_MESSAGES)]
+    data = ''.join(lines).encode()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for compression, (open_, extension) in recorder.COMPRESSION.items():
+            path = os.path.join(directory, 'recording.log' + extension)
+            with open_(path, 'wb') as f:
+                f.write(data)
+
+            for name, parse in [('raw', None), ('Parser', parser.Parser)]:
+                r = replay.Replay(path)
+                r.receive(lambda message: None, parser=parse)
+                print('{:5} {:6}: {:8.0f} lines/s'.format(
+                    compression or 'plain', name, r.lines_per_second))
+
+
+if __name__ == '__main__':
+    main()
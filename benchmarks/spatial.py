@@ -0,0 +1,76 @@
+"""
+Measures SpatialGrid with 10k, 50k and 100k aircraft spread over Europe:
+moving an aircraft, and bounding box (1x1 degree) and radius (50 km) queries
+compared with a linear scan of all positions.
+"""
+
+import random
+
+from benchmarks import best_of
+from ogn_lib import spatial
+
+
+SIZES = (10000, 50000, 100000)
+N_QUERIES = 50
+
+
+def random_position(rnd):
+    return rnd.uniform(35, 60), rnd.uniform(-10, 30)
+
+
+def scan_bbox(positions, south, west, north, east):
+    return [(key, lat, lon) for key, (lat, lon) in positions.items()
+            if south <= lat <= north and west <= lon <= east]
+
+
+def scan_radius(positions, latitude, longitude, radius):
+    result = []
+    for key, (lat, lon) in positions.items():
+        d = spatial.distance(latitude, longitude, lat, lon)
+        if d <= radius:
+            result.append((key, d))
+    return result
+
+
+def main():
+    rnd = random.Random(42)
+    centers = [random_position(rnd) for _ in range(N_QUERIES)]
+    boxes = [(lat - 0.5, lon - 0.5, lat + 0.5, lon + 0.5)
+             for lat, lon in centers]
+
+    for size in SIZES:
+        grid = spatial.SpatialGrid()
+        positions = {}
+        for key in range(size):
+            positions[key] = random_position(rnd)
+            grid.move(key, *positions[key])
+
+        moves = [(rnd.randrange(size), random_position(rnd))
+                 for _ in range(10000)]
+        move = best_of(lambda: [grid.move(k, *p) for k, p in moves], 1)
+        for key, position in moves:
+            positions[key] = position
+
+        found = sum(len(grid.within_bbox(*b)) for b in boxes) / N_QUERIES
+        bbox = best_of(lambda: [grid.within_bbox(*b) for b in boxes], 1)
+        bbox_scan = best_of(
+            lambda: [scan_bbox(positions, *b) for b in boxes], 1, 3)
+
+        near = sum(len(grid.within_radius(lat, lon, 50000))
+                   for lat, lon in centers) / N_QUERIES
+        radius = best_of(lambda: [grid.within_radius(lat, lon, 50000)
+                                  for lat, lon in centers], 1)
+        radius_scan = best_of(lambda: [scan_radius(positions, lat, lon, 50000)
+                                       for lat, lon in centers], 1, 3)
+
+        print('{:6} aircraft: move {:5.0f} ns | bbox ({:5.0f} found) '
+              '{:7.1f} us vs scan {:8.1f} us | radius ({:4.0f} found) '
+              '{:7.1f} us vs scan {:8.1f} us'.format(
+                  size, move / len(moves) * 1e9, found,
+                  bbox / N_QUERIES * 1e6, bbox_scan / N_QUERIES * 1e6,
+                  near, radius / N_QUERIES * 1e6,
+                  radius_scan / N_QUERIES * 1e6))
+
+
+if __name__ == '__main__':
+    main()
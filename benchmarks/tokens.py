@@ -0,0 +1,130 @@
+"""
+Compares the per-token cost of parsing APRS comments with the chain of
+`startswith`/`endswith` checks used before ogn_lib.parser.TokenTable and with
+the token table itself.
+
+The previous implementation (including the closures and the `_update` list
+used for the third decimal of the position) is reproduced below as the
+baseline.
+"""
+
+import functools
+
+from benchmarks import best_of, load_messages
+from ogn_lib import parser
+
+
+def _update_location(existing, update):
+    return parser.Parser._update_location_decimal(existing, update)
+
+
+def _update_data(data, updates):
+    for update in updates:
+        try:
+            key = update['target']
+            data[key] = update['function'](data[key])
+        except KeyError:
+            pass
+
+    return data
+
+
+def chain_parse(comment):
+    """
+    Parses the comment with the if-chain of the previous APRS parser.
+    """
+
+    data = {}
+    for field in comment.split(' '):
+        if field.startswith('!') and field.endswith('!'):
+            update_position = [
+                {'target': 'latitude',
+                 'function': functools.partial(_update_location,
+                                               update=int(field[2]))},
+                {'target': 'longitude',
+                 'function': functools.partial(_update_location,
+                                               update=int(field[3]))}
+            ]
+            try:
+                for u in update_position:
+                    data['_update'].append(u)
+            except KeyError:
+                data['_update'] = update_position
+        elif field.startswith('id'):
+            data.update(parser.APRS._parse_id_string(field[2:]))
+        elif field.endswith('fpm'):
+            data['vertical_speed'] = int(field[:-3]) * parser.FPM_TO_MS
+        elif field.endswith('rot'):
+            data['turn_rate'] = float(field[:-3]) * parser.HPM_TO_DEGS
+        elif field.startswith('FL'):
+            data['flight_level'] = float(field[2:])
+        elif field.endswith('dB'):
+            data['signal_to_noise_ratio'] = float(field[:-2])
+        elif field.endswith('e'):
+            data['error_count'] = int(field[:-1])
+        elif field.endswith('kHz'):
+            data['frequency_offset'] = float(field[:-3])
+        elif field.startswith('gps'):
+            x_idx = field.find('x')
+            data['gps_quality'] = {
+                'vertical': int(field[x_idx + 1:]),
+                'horizontal': int(field[3:x_idx])
+            }
+        elif field.startswith('s'):
+            data['flarm_software'] = field[1:]
+        elif field.startswith('r'):
+            data['flarm_id'] = field[1:]
+        elif field.endswith('dBm'):
+            data['power_ratio'] = float(field[:-3])
+        elif field.startswith('hear'):
+            try:
+                data['other_devices'].append(field[4:])
+            except KeyError:
+                data['other_devices'] = [field[4:]]
+        elif field.startswith('h'):
+            data['flarm_hardware'] = int(field[1:], 16)
+
+    return data
+
+
+def chain_merge(data, comment):
+    comment_data = chain_parse(comment)
+    _update_data(data, comment_data.pop('_update', []))
+    data.update(comment_data)
+    return data
+
+
+def table_merge(data, comment):
+    comment_data = parser.APRS.TOKENS.parse(parser.APRS, comment)
+    decimals = comment_data.pop('_third_decimal', None)
+    if decimals is not None:
+        data['latitude'] = parser.Parser._update_location_decimal(
+            data['latitude'], decimals[0])
+        data['longitude'] = parser.Parser._update_location_decimal(
+            data['longitude'], decimals[1])
+    data.update(comment_data)
+    return data
+
+
+def main():
+    comments = []
+    for msg in load_messages():
+        class_ = parser.ParserBase.parsers.get(msg.split('>', 1)[1]
+                                               .split(',', 1)[0])
+        if class_ is parser.APRS and 'TCPIP*' not in msg:
+            comments.append(parser.APRS._match_message(msg)[-1])
+
+    n_tokens = sum(len(c.split(' ')) for c in comments)
+    position = {'latitude': 45.5, 'longitude': 12.25}
+
+    for name, merge in (('if-chain', chain_merge), ('table', table_merge)):
+        def run():
+            for comment in comments:
+                merge(dict(position), comment)
+
+        t = best_of(run, number=200, repeat=7)
+        print('{:9}: {:6.0f} ns/token'.format(name, t / n_tokens * 1e9))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Measures TrajectoryStore: append time and the memory per stored point
+compared with keeping the beacons in per-aircraft lists (deques).
+"""
+
+import collections
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from ogn_lib import trajectory
+
+
+N_AIRCRAFT = 5000
+CAPACITY = 128
+N_POINTS = N_AIRCRAFT * CAPACITY
+T0 = datetime(2018, 1, 1)
+
+
+def synthetic_beacons():
+    rnd = random.Random(42)
+    for i in range(N_POINTS):
+        yield {'uid': '{:08X}'.format(i % N_AIRCRAFT), 'from': 'FLR',
+               'timestamp': T0 + timedelta(seconds=i // N_AIRCRAFT),
+               'latitude': rnd.uniform(35, 60),
+               'longitude': rnd.uniform(-10, 30),
+               'altitude': rnd.uniform(0, 5000),
+               'vertical_speed': rnd.uniform(-5, 5),
+               'ground_speed': rnd.uniform(0, 80),
+               'heading': rnd.randrange(360), 'receiver': 'RCV0001'}
+
+
+def fill_store(beacons):
+    store = trajectory.TrajectoryStore(CAPACITY, initial_aircraft=N_AIRCRAFT)
+    for beacon in beacons:
+        store.append(beacon)
+    return store
+
+
+def fill_lists(beacons):
+    tracks = collections.defaultdict(
+        lambda: collections.deque(maxlen=CAPACITY))
+    for beacon in beacons:
+        tracks[beacon['uid']].append(beacon)
+    return tracks
+
+
+def measure(fill, beacons):
+    start = time.perf_counter()
+    fill(beacons)
+    elapsed = time.perf_counter() - start
+
+    # The beacons are copied while traced, as if they were parsed one by one
+    # from the stream; the copies kept by the tracks are counted
+    tracemalloc.start()
+    start_size, _ = tracemalloc.get_traced_memory()
+    tracks = fill(dict(b) for b in beacons)
+    end_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del tracks
+    return elapsed / N_POINTS, (end_size - start_size) / N_POINTS
+
+
+def main():
+    beacons = list(synthetic_beacons())
+
+    for name, fill in [('TrajectoryStore', fill_store),
+                       ('deques of beacons', fill_lists)]:
+        append, size = measure(fill, beacons)
+        print('{:18} {:6.0f} ns/point, {:6.0f} B/point'.format(
+            name, append * 1e9, size))
+
+
+if __name__ == '__main__':
+    main()
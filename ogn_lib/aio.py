@@ -0,0 +1,374 @@
+"""
+ogn_lib.aio
+-----------
+
+This module contains an asyncio client for OGN's APRS servers (Python 3.7 or
+greater).
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+
+import ogn_lib
+import ogn_lib.client
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncOgnClient(ogn_lib.client.AprsSession):
+    """
+    Holds an APRS session on an asyncio event loop.
+
+    The settings and the login handshake are shared with OgnClient (see
+    ogn_lib.client.AprsSession), but connect, disconnect, send and receive
+    are coroutines and the messages are read through asyncio streams.
+    Keepalive messages are sent by a background task while the client is
+    connected, so several clients can share an event loop with other I/O.
+
+    Requires Python 3.7 or greater; the module is therefore not imported by
+    the `ogn_lib` package.
+
+    Received messages can be iterated over:
+
+        async with AsyncOgnClient('N0CALL', parser=Parser) as client:
+            async for beacon in client:
+                ...
+    """
+
+    READ_TIMEOUT = 15
+    RECONNECT_WAIT = 15
+
+    def __init__(self, username, passcode='-1', server=None, port=None,
+                 filter_=None, parser=None, prefilter=None):
+        """
+        Creates a new AsyncOgnClient instance.
+
+        :param str username: username used for logging in the APRS system
+        :param str passcode: a valid passcode for given `username`
+        :param server: an optional addres of an APRS server (defaults to
+                       aprs.glidernet.org)
+        :type server: str or None
+        :param port: optional port of the APRS server (defaults to 10152 or
+                     14580)
+        :type port: int or None
+        :param filter_: optional `filter` parameter to be passed to the APRS
+                        server
+        :type filter_: str or None
+        :param parser: function that parses the messages yielded when
+                       iterating over the client or None for raw messages
+        :type parser: callable or None
+        :param prefilter: optional filter of the raw messages yielded when
+                          iterating over the client (see ogn_lib.filters)
+        :type prefilter: callable or None
+        """
+
+        super().__init__(username, passcode=passcode, server=server,
+                         port=port, filter_=filter_)
+        self.parser = parser
+        self.prefilter = prefilter
+        self._kill = False
+        # Set when the client is disconnected during AsyncOgnClient.messages;
+        # unlike _kill, it is not reset by connect (e.g. while reconnecting)
+        self._stop = None
+        self._last_send = -1
+        self._connection_retries = 50
+        self._reader = None
+        self._writer = None
+        self._keepalive_task = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.disconnect()
+
+    def __aiter__(self):
+        return self.messages(parser=self.parser, prefilter=self.prefilter)
+
+    async def connect(self):
+        """
+        Opens a connection to the APRS server, authenticates the client and
+        starts the keepalive task.
+
+        :raise ogn_lib.exceptions.LoginError: if an authentication error has
+                                              occured
+        """
+
+        logger.info('Connecting to %s:%d as %s:%s. Filter: %s',
+                    self.server, self.port, self.username, self.passcode,
+                    self.filter_ if self.filter_ else 'not set')
+
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.server, self.port),
+            self.READ_TIMEOUT)
+
+        try:
+            conn_response = (await self._readline()).strip()
+            logger.debug('Connection response: %s', conn_response)
+
+            auth = self._gen_auth_message()
+            logger.debug('Sending authentication message: %s', auth)
+
+            await self.send(auth)
+            login_status = (await self._readline()).strip()
+            logger.debug('Login status: %s', login_status)
+
+            self._authenticated = self._validate_login(login_status)
+        except (ogn_lib.exceptions.LoginError,
+                ogn_lib.exceptions.ParseError) as e:
+            logger.exception(e)
+            logger.fatal('Failed to authenticate')
+            await self._close()
+            logger.info('Socket closed')
+            raise
+        except BaseException:
+            # e.g. a timeout or a cancelled reconnect
+            await self._close()
+            raise
+
+        self._kill = False
+        self._keepalive_task = asyncio.ensure_future(self._keepalive_loop())
+
+    async def disconnect(self):
+        """
+        Closes the connection. Running iterations over the messages stop.
+        """
+
+        logger.info('Disconnecting from the server')
+        self._kill = True
+        if self._stop is not None:
+            self._stop.set()
+        await self._close()
+
+    async def send(self, message):
+        """
+        Sends the message to the APRS server.
+
+        :param str message: message to be sent
+        """
+
+        message_nl = message.strip('\n') + '\n'
+        logger.info('Sending: %s', message_nl)
+        self._writer.write(message_nl.encode())
+        await self._writer.drain()
+        self._last_send = time.time()
+
+    async def receive(self, callback, reconnect=True, parser=None,
+                      prefilter=None):
+        """
+        Receives the messages received from the APRS stream and passes them to
+        the callback function.
+
+        :param callback: the callback function or coroutine function which
+                         takes one parameter (the received message)
+        :type callback: callable
+        :param bool reconnect: True if the client should automatically restart
+                               after the connection drops
+        :param parser: function that parses the APRS messages or None if
+                       callback should receive raw messages
+        :type parser: callable or None
+        :param prefilter: optional filter of the raw messages (see
+                          ogn_lib.filters)
+        :type prefilter: callable or None
+        """
+
+        async for message in self.messages(reconnect, parser, prefilter):
+            result = callback(message)
+            if inspect.isawaitable(result):
+                await result
+
+    async def messages(self, reconnect=True, parser=None, prefilter=None):
+        """
+        Iterates over the messages received from the APRS stream.
+
+        Server messages (starting with `#`), messages rejected by the
+        prefilter and messages which failed to parse are skipped.
+
+        Dropped connections are reestablished in a background task; the
+        iteration stops when the client is disconnected, even while it is
+        reconnecting.
+
+        :param bool reconnect: True if the client should automatically restart
+                               after the connection drops
+        :param parser: function that parses the APRS messages or None if
+                       raw messages should be returned
+        :type parser: callable or None
+        :param prefilter: optional filter of the raw messages (see
+                          ogn_lib.filters)
+        :type prefilter: callable or None
+        :return: asynchronous generator of received messages
+        :rtype: async_generator
+        """
+
+        debug = logger.isEnabledFor(logging.DEBUG)
+        stop = self._stop = asyncio.Event()
+
+        try:
+            while not (self._kill or stop.is_set()):
+                try:
+                    while not (self._kill or stop.is_set()):
+                        line = await self._readline()
+                        if not line:  # connection closed
+                            break
+
+                        line = line.strip()
+                        if debug:
+                            logger.debug('Received APRS message: %s', line)
+
+                        if (not line or line.startswith('#') or
+                                (prefilter is not None and
+                                 not prefilter(line))):
+                            continue
+
+                        if parser is None:
+                            yield line
+                            continue
+
+                        try:
+                            data = parser(line)
+                        except ogn_lib.exceptions.ParseError as e:
+                            ogn_lib.client.message_log.report(
+                                logging.ERROR, 'unparsed', type(e).__name__,
+                                line, exc_info=True)
+                        else:
+                            yield data
+                except (ConnectionError, OSError, asyncio.TimeoutError) as e:
+                    logger.error('Socket connection dropped')
+                    logger.exception(e)
+
+                if self._kill or stop.is_set() or not reconnect:
+                    break
+
+                await self._run_reconnect(stop)
+        finally:
+            if self._stop is stop:
+                self._stop = None
+            ogn_lib.client.message_log.flush()
+            ogn_lib.parser.message_log.flush()
+            logger.info('Exiting AsyncOgnClient.messages()')
+
+    async def _run_reconnect(self, stop):
+        """
+        Runs AsyncOgnClient._reconnect as a task until it completes or the
+        client is disconnected (in which case the task is cancelled).
+
+        :param asyncio.Event stop: event set by AsyncOgnClient.disconnect
+        :raises ConnectionError: if the connection could not be
+                                 reestablished
+        """
+
+        task = asyncio.ensure_future(
+            self._reconnect(stop, retries=self._connection_retries,
+                            wait_period=self.RECONNECT_WAIT))
+        stopped = asyncio.ensure_future(stop.wait())
+
+        try:
+            await asyncio.wait([task, stopped],
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stopped.cancel()
+            if not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+        if not stop.is_set():
+            task.result()
+
+    async def _reconnect(self, stop, retries=1, wait_period=15):
+        """
+        Attempts to recover a failed server connection.
+
+        :param asyncio.Event stop: event set by AsyncOgnClient.disconnect;
+                                   no further attempts are made once it is set
+        :param int retries: number of times reestablishing connection is
+            attempted
+        :param float wait_period: amount of seconds between two sequential
+            retries
+        :raises ConnectionError: if the connection could not be
+                                 reestablished
+        """
+
+        logger.info('Trying to reconnect...')
+        await self._close()
+
+        while retries > 0 and not stop.is_set():
+            try:
+                await self.connect()
+            except (ConnectionError, OSError, asyncio.TimeoutError) as e:
+                logger.error('Reconnection attempt failed')
+                logger.exception(e)
+                retries -= 1
+                await asyncio.sleep(wait_period)
+                continue
+
+            if stop.is_set():
+                # Disconnected while connecting; connect() has reset _kill
+                logger.info('Client disconnected while reconnecting')
+                self._kill = True
+                await self._close()
+            else:
+                logger.error('Successfully reconnected')
+            return
+
+        if not stop.is_set():
+            raise ConnectionError
+
+    async def _readline(self):
+        """
+        Reads a line from the server.
+
+        :return: decoded line or an empty string if the connection is closed
+        :rtype: str
+        :raises asyncio.TimeoutError: if nothing was received in
+                                      `READ_TIMEOUT` seconds
+        """
+
+        line = await asyncio.wait_for(self._reader.readline(),
+                                      self.READ_TIMEOUT)
+        return line.decode(errors='replace')
+
+    async def _keepalive_loop(self):
+        """
+        Sends the keep alive messages to the APRS server while the client is
+        connected.
+        """
+
+        try:
+            while True:
+                remaining = self.SOCKET_KEEPALIVE - (time.time() -
+                                                     self._last_send)
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+                    continue
+
+                logger.info('No messages sent for %.0f seconds; '
+                            'sending keepalive', self.SOCKET_KEEPALIVE)
+                await self.send('#keepalive')
+        except (ConnectionError, OSError) as e:
+            # the reader notices the dropped connection and reconnects
+            logger.error('Failed to send keepalive')
+            logger.exception(e)
+
+    async def _close(self):
+        """
+        Stops the keepalive task and closes the connection.
+        """
+
+        task, self._keepalive_task = self._keepalive_task, None
+        if task is not None:
+            task.cancel()
+
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
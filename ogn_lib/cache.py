@@ -0,0 +1,205 @@
+"""
+ogn_lib.cache
+-------------
+
+This module contains the caches used by the parsers.
+"""
+
+import collections
+import threading
+
+
+CacheStats = collections.namedtuple('CacheStats', ['hits', 'misses',
+                                                   'evictions', 'size',
+                                                   'maxsize'])
+
+
+class LRUCache:
+    """
+    Bounded cache which evicts the least recently used entries.
+
+    The numbers of hits, misses and evictions are counted so the size of the
+    cache can be tuned (see LRUCache.stats). The cache can be shared by
+    threads (e.g. by the parsers in the workers of
+    OgnClient.receive_threaded).
+    """
+
+    def __init__(self, maxsize=8192):
+        """
+        Creates a new LRUCache.
+
+        :param int maxsize: maximum number of entries
+        """
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value and marks it as recently used.
+
+        :param key: key of the entry
+        :param default: value returned if the key is not cached
+        :return: cached value or `default`
+        """
+
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Stores the value, evicting the least recently used entry if the cache
+        is full.
+
+        :param key: key of the entry
+        :param value: cached value
+        """
+
+        with self._lock:
+            entries = self._entries
+            entries[key] = value
+            entries.move_to_end(key)
+
+            if len(entries) > self.maxsize:
+                entries.popitem(last=False)
+                self.evictions += 1
+
+    def resize(self, maxsize):
+        """
+        Changes the maximum size of the cache, evicting the least recently
+        used entries if necessary.
+
+        :param int maxsize: maximum number of entries
+        """
+
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Removes all entries and resets the counters.
+        """
+
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Returns the counters of the cache.
+
+        :return: hits, misses, evictions, current and maximum size
+        :rtype: ogn_lib.cache.CacheStats
+        """
+
+        with self._lock:
+            return CacheStats(self.hits, self.misses, self.evictions,
+                              len(self._entries), self.maxsize)
+
+
+class InternPool:
+    """
+    Bounded pool of shared strings.
+
+    Equal strings passed to InternPool.intern are replaced by a single shared
+    instance, so parsed messages which are kept in memory do not hold
+    duplicates of callsigns, receiver names and other repeated strings.
+
+    Strings are kept in two generations. When the current generation is
+    full, it replaces the previous one and the strings which were not used
+    since the last rotation are evicted, so the pool never holds more than
+    twice `generation_size` strings.
+    """
+
+    def __init__(self, generation_size=65536):
+        """
+        Creates a new InternPool.
+
+        :param int generation_size: maximum number of strings per generation
+        """
+
+        self.generation_size = generation_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._current = {}
+        self._previous = {}
+
+    def __len__(self):
+        return len(self._current) + len(self._previous)
+
+    def __contains__(self, value):
+        return value in self._current or value in self._previous
+
+    def intern(self, value):
+        """
+        Returns the shared instance of the string.
+
+        :param str value: string to be interned
+        :return: shared string equal to `value`
+        :rtype: str
+        """
+
+        try:
+            shared = self._current[value]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            return shared
+
+        shared = self._previous.pop(value, None)
+        if shared is None:
+            self.misses += 1
+            shared = value
+        else:
+            self.hits += 1
+
+        if len(self._current) >= self.generation_size:
+            self.evictions += len(self._previous)
+            self._previous = self._current
+            self._current = {}
+
+        self._current[shared] = shared
+        return shared
+
+    def clear(self):
+        """
+        Removes all strings and resets the counters.
+        """
+
+        self._current = {}
+        self._previous = {}
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Returns the counters of the pool.
+
+        :return: hits, misses, evictions, current size and maximum size
+        :rtype: ogn_lib.cache.CacheStats
+        """
+
+        return CacheStats(self.hits, self.misses, self.evictions, len(self),
+                          2 * self.generation_size)
@@ -7,32 +7,164 @@ connection to OGN's APRS servers.
 """
 
 import logging
+import queue
 import socket
+import threading
 import time
 
 import ogn_lib
+import ogn_lib.diagnostics
+import ogn_lib.reader
 
 
 logger = logging.getLogger(__name__)
 
+# Rate-limited log of received messages which failed to parse
+message_log = ogn_lib.diagnostics.RateLimitedLog(logger)
 
-class OgnClient:
+# Marks the end of the queue for the worker threads
+_STOP = object()
+
+
+class QueueStats:
+    """
+    Counters of OgnClient.receive_threaded.
     """
-    Holds an APRS session.
 
-    Provides methods for listening to received messages and managing
-    the session.
+    def __init__(self, queue_):
+        """
+        Creates a new QueueStats.
+
+        :param queue.Queue queue_: queue between the reader and the workers
+        """
+
+        self.received = 0  # messages read from the socket
+        self.dropped = 0  # messages dropped because the queue was full
+        self.processed = 0  # messages processed by the workers
+        self.callback_errors = 0  # exceptions raised by the callback
+        self.max_depth = 0  # maximum number of queued messages
+        self._queue = queue_
+        self._lock = threading.Lock()
+
+    @property
+    def depth(self):
+        """
+        Current number of queued messages.
+        """
+
+        return self._queue.qsize()
+
+    def _add_processed(self, callback_error=False):
+        with self._lock:
+            self.processed += 1
+            if callback_error:
+                self.callback_errors += 1
+
+
+class Batcher:
+    """
+    Collects messages and passes them to the callback in lists.
+
+    A batch is passed to the callback when it contains `size` messages or
+    when its first message is older than `interval` seconds, whichever comes
+    first. The age is checked when messages are added and when
+    Batcher.flush_due is called; Batcher.remaining tells the reader how long
+    it may wait for the next message.
+    """
+
+    def __init__(self, callback, size=None, interval=None):
+        """
+        Creates a new Batcher.
+
+        :param callable callback: function which takes a list of messages
+        :param size: maximum number of messages in a batch
+        :type size: int or None
+        :param interval: maximum number of seconds a message waits in a batch
+        :type interval: float or None
+        """
+
+        self.callback = callback
+        self.size = size
+        self.interval = interval
+        self._batch = []
+        self._deadline = None
+
+    def __len__(self):
+        return len(self._batch)
+
+    def add(self, message):
+        """
+        Adds the message to the current batch.
+
+        :param message: received message
+        """
+
+        self.flush_due()
+
+        batch = self._batch
+        if not batch and self.interval is not None:
+            self._deadline = time.monotonic() + self.interval
+
+        batch.append(message)
+
+        if self.size is not None and len(batch) >= self.size:
+            self.flush()
+
+    def flush_due(self):
+        """
+        Passes the current batch to the callback if its first message is
+        older than `interval` seconds.
+        """
+
+        if (self._batch and self._deadline is not None and
+                time.monotonic() >= self._deadline):
+            self.flush()
+
+    def remaining(self):
+        """
+        Returns the number of seconds until the current batch is due.
+
+        :return: seconds (negative if overdue) or None if the batch is empty
+                 or has no deadline
+        :rtype: float or None
+        """
+
+        if not self._batch or self._deadline is None:
+            return None
+
+        return self._deadline - time.monotonic()
+
+    def flush(self):
+        """
+        Passes the current batch (if not empty) to the callback.
+        """
+
+        if self._batch:
+            batch = self._batch
+            self._batch = []
+            self._deadline = None
+            self.callback(batch)
+
+
+class AprsSession:
+    """
+    Settings and login handshake of an APRS session.
+
+    Shared by the blocking OgnClient and the asyncio client
+    (ogn_lib.aio.AsyncOgnClient), which implement the connection and the
+    reading of the messages.
     """
 
     APRS_SERVER = 'aprs.glidernet.org'
     APRS_PORT_FULL = 10152
     APRS_PORT_FILTER = 14580
     SOCKET_KEEPALIVE = 240
+    SOCKET_TIMEOUT = 15
 
     def __init__(self, username, passcode='-1', server=None, port=None,
                  filter_=None):
         """
-        Creates a new OgnClient instance.
+        Creates a new AprsSession instance.
 
         :param str username: username used for logging in the APRS system
         :param str passcode: a valid passcode for given `username`
@@ -54,9 +186,116 @@ class OgnClient:
                              else self.APRS_PORT_FULL)
         self.filter_ = filter_
         self._authenticated = False
+
+    def _gen_auth_message(self):
+        """
+        Generates an APRS authentication message.
+
+        :return: authentication message
+        :rtype: str
+        """
+
+        base = 'user {} pass {} vers {} {}'.format(self.username,
+                                                   self.passcode,
+                                                   ogn_lib.__title__,
+                                                   ogn_lib.__version__)
+
+        if self.filter_:
+            base += ' filter {}'.format(self.filter_)
+
+        return base
+
+    def _validate_login(self, message):
+        """
+        Verifies that the login to the APRS server was successful.
+
+        :param str message: authentication response from the server
+        :return: True if user is authenticated to send messages
+        :rtype: bool
+        :raises ogn_lib.exceptions.LoginError: if the login was unsuccessful
+        """
+
+        # Sample response: # logresp user unverified, server GLIDERN3
+        if not message.startswith('# logresp'):
+            raise ogn_lib.exceptions.LoginError(
+                'Not a login message: ' + message)
+
+        try:
+            user_info, serv_info = message.split(', ')
+            username, status = user_info[10:].split(' ')
+            server = serv_info[7:]
+        except (IndexError, ValueError):
+            raise ogn_lib.exceptions.ParseError(
+                'Unable to parse login message: ' + message)
+
+        authenticated = False
+        if status == 'verified':
+            authenticated = True
+            logger.info('Successfully connected to %s as %s', server, username)
+        elif status == 'unverified' and self.passcode != '-1':
+            logger.info('Connected to %s', server)
+            logger.warn('Wrong username/passcode, continuing in r/o mode')
+        elif status == 'unverified':
+            logger.info('Connected to %s as guest', server)
+        else:
+            raise ogn_lib.exceptions.LoginError('Login failed: ' + message)
+
+        return authenticated
+
+
+class OgnClient(AprsSession):
+    """
+    Holds an APRS session.
+
+    Provides methods for listening to received messages and managing
+    the session.
+    """
+
+    # Seconds OgnClient.stream waits for the reader thread when it is closed
+    STREAM_JOIN_TIMEOUT = 1
+
+    # Overflow policies of receive_threaded
+    OVERFLOW_BLOCK = 'block'
+    OVERFLOW_DROP_OLDEST = 'drop-oldest'
+    OVERFLOW_DROP_NEWEST = 'drop-newest'
+
+    def __init__(self, username, passcode='-1', server=None, port=None,
+                 filter_=None, bulk_read=False):
+        """
+        Creates a new OgnClient instance.
+
+        :param str username: username used for logging in the APRS system
+        :param str passcode: a valid passcode for given `username`
+        :param server: an optional addres of an APRS server (defaults to
+                       aprs.glidernet.org)
+        :type server: str or None
+        :param port: optional port of the APRS server (defaults to 10152 or
+                     14580)
+        :type port: int or None
+        :param filter_: optional `filter` parameter to be passed to the APRS
+                        server
+        :type filter_: str or None
+        :param bool bulk_read: True if the messages should be read in bulk
+                               (ogn_lib.reader.LineReader.read_lines)
+                               instead of line by line; prefilters then
+                               receive the messages as bytes (see
+                               ogn_lib.filters) and parsers receive them in
+                               batches
+        """
+
+        super().__init__(username, passcode=passcode, server=server,
+                         port=port, filter_=filter_)
+        self.bulk_read = bulk_read
         self._kill = False
         self._last_send = -1
         self._connection_retries = 50
+        self.queue_stats = None
+        # Optional recorder of all received messages (see ogn_lib.recorder)
+        self.recorder = None
+        self._batcher = None
+        # Set when the consumer of OgnClient.stream stops; unlike _kill, it
+        # is not reset by connect()
+        self._stream_stop = None
 
     def connect(self):
         """
@@ -72,9 +311,11 @@ class OgnClient:
                     self.filter_ if self.filter_ else 'not set')
 
         self._socket = socket.create_connection((self.server, self.port))
-        self._socket.settimeout(15)
+        self._socket.settimeout(self.SOCKET_TIMEOUT)
+        # Unlike the file returned by socket.makefile, LineReader can still be
+        # read after a socket timeout (see OgnClient._read)
+        self._sock_file = ogn_lib.reader.LineReader(self._socket)
 
-        self._sock_file = self._socket.makefile()
         conn_response = self._sock_file.readline().strip()
         logger.debug('Connection response: %s', conn_response)
 
@@ -104,11 +345,18 @@ class OgnClient:
         self._sock_file.close()
         self._socket.close()
 
-    def receive(self, callback, reconnect=True, parser=None):
+    def receive(self, callback, reconnect=True, parser=None, prefilter=None,
+                batch_size=None, batch_interval=None):
         """
         Receives the messages received from the APRS stream and passes them to
         the callback function.
 
+        If `batch_size` or `batch_interval` is set, the callback receives
+        lists of messages instead (see ogn_lib.client.Batcher). A batch is
+        passed to the callback when it is due even if no further messages
+        are received. Incomplete batches are passed to the callback when the
+        connection drops and before the method returns.
+
         :param callback: the callback function which takes one parameter
                          (the received message)
         :type callback: callable
@@ -117,6 +365,40 @@ class OgnClient:
         :param parser: function that parses the APRS messages or None if
                        callback should receive raw messages
         :type parser: callable or None
+        :param prefilter: optional filter of the raw messages (see
+                          ogn_lib.filters); rejected messages are dropped
+                          before they are parsed
+        :type prefilter: callable or None
+        :param batch_size: maximum number of messages in a batch
+        :type batch_size: int or None
+        :param batch_interval: maximum number of seconds a message waits in
+                               a batch
+        :type batch_interval: float or None
+        """
+
+        if batch_size is not None or batch_interval is not None:
+            self._batcher = Batcher(callback, batch_size, batch_interval)
+            callback = self._batcher.add
+
+        try:
+            self._receive(callback, reconnect, parser, prefilter)
+        finally:
+            if self._batcher is not None:
+                batcher, self._batcher = self._batcher, None
+                batcher.flush()
+
+    def _receive(self, callback, reconnect, parser, prefilter):
+        """
+        Receives the messages, reconnecting if necessary (see
+        OgnClient.receive).
+
+        :param callable callback: the callback function
+        :param bool reconnect: True if the client should automatically restart
+                               after the connection drops
+        :param parser: function that parses the APRS messages or None
+        :type parser: callable or None
+        :param prefilter: optional filter of the raw messages
+        :type prefilter: callable or None
         """
 
         # The client might be ran for extended periods of time. Although using
@@ -127,18 +409,247 @@ class OgnClient:
         # This is why this function is written with a double while loop.
         while not self._kill:
             try:
-                self._receive_loop(callback, parser)
+                self._receive_loop(callback, parser, prefilter)
             except (BrokenPipeError, ConnectionResetError, socket.error,
                     socket.timeout) as e:
                 logger.error('Socket connection dropped')
                 logger.exception(e)
 
+            if self._batcher is not None:
+                self._batcher.flush()
+
             if self._kill or not reconnect:
+                message_log.flush()
+                ogn_lib.parser.message_log.flush()
                 logger.info('Exiting OgnClient.receive()')
                 return
 
             self._reconnect(retries=self._connection_retries, wait_period=15)
 
+    def receive_threaded(self, callback, reconnect=True, parser=None,
+                         prefilter=None, workers=1, queue_size=10000,
+                         overflow=OVERFLOW_BLOCK):
+        """
+        Receives the messages like OgnClient.receive, but runs the parser and
+        the callback in a pool of worker threads.
+
+        The calling thread only reads the messages from the socket and puts
+        them in a bounded queue, so a slow callback does not stop the reads.
+        When the queue is full, the reader waits (`OVERFLOW_BLOCK`), drops
+        the oldest queued message (`OVERFLOW_DROP_OLDEST`) or drops the
+        received message (`OVERFLOW_DROP_NEWEST`). The counters are available
+        in OgnClient.queue_stats.
+
+        With more than one worker, the callback may be called concurrently
+        and messages may be processed out of order. Queued messages are
+        processed before the method returns.
+
+        Unlike in OgnClient.receive, where they propagate to the caller,
+        exceptions raised by the callback are logged and counted
+        (QueueStats.callback_errors), and the worker continues with the next
+        message.
+
+        :param callback: the callback function which takes one parameter
+                         (the received message)
+        :type callback: callable
+        :param bool reconnect: True if the client should automatically restart
+                               after the connection drops
+        :param parser: function that parses the APRS messages or None if
+                       callback should receive raw messages
+        :type parser: callable or None
+        :param prefilter: optional filter of the raw messages, applied by the
+                          reader
+        :type prefilter: callable or None
+        :param int workers: number of worker threads
+        :param int queue_size: maximum number of queued messages
+        :param str overflow: overflow policy
+        :raises ValueError: if the overflow policy is not known
+        """
+
+        if overflow not in (self.OVERFLOW_BLOCK, self.OVERFLOW_DROP_OLDEST,
+                            self.OVERFLOW_DROP_NEWEST):
+            raise ValueError('Unknown overflow policy: {}'.format(overflow))
+
+        queue_ = queue.Queue(queue_size)
+        stats = self.queue_stats = QueueStats(queue_)
+
+        def enqueue(line):
+            stats.received += 1
+
+            if overflow == self.OVERFLOW_BLOCK:
+                queue_.put(line)
+            elif overflow == self.OVERFLOW_DROP_NEWEST:
+                try:
+                    queue_.put_nowait(line)
+                except queue.Full:
+                    stats.dropped += 1
+            else:
+                while True:
+                    try:
+                        queue_.put_nowait(line)
+                        break
+                    except queue.Full:
+                        try:
+                            queue_.get_nowait()
+                            stats.dropped += 1
+                        except queue.Empty:
+                            pass
+
+            depth = queue_.qsize()
+            if depth > stats.max_depth:
+                stats.max_depth = depth
+
+        threads = [threading.Thread(target=self._worker,
+                                    args=(queue_, callback, parser, stats),
+                                    name='OgnClient-worker-{}'.format(i),
+                                    daemon=True)
+                   for i in range(workers)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            self.receive(enqueue, reconnect=reconnect, prefilter=prefilter)
+        finally:
+            for _ in threads:
+                queue_.put(_STOP)
+            for thread in threads:
+                thread.join()
+
+    def stream(self, parser=None, prefilter=None, reconnect=True,
+               read_ahead=1000, idle_timeout=None):
+        """
+        Iterates over the messages received from the APRS stream.
+
+        Messages are read from the socket by a background thread into a
+        buffer of at most `read_ahead` messages; when the buffer is full, the
+        thread stops reading until the consumer catches up. Messages are
+        parsed when they are taken from the buffer, so the consumer pulls
+        them at its own rate. Reconnects are handled by the background thread.
+
+        The iteration stops when the connection drops (unless `reconnect` is
+        True), when no message was received for `idle_timeout` seconds or
+        when the generator is closed; the connection is then closed. Errors
+        raised by the background thread (e.g. failed reconnects) are raised
+        by the iterator.
+
+        :param parser: function that parses the APRS messages or None if
+                       raw messages should be returned
+        :type parser: callable or None
+        :param prefilter: optional filter of the raw messages (see
+                          ogn_lib.filters)
+        :type prefilter: callable or None
+        :param bool reconnect: True if the client should automatically restart
+                               after the connection drops
+        :param int read_ahead: maximum number of buffered messages
+        :param idle_timeout: maximum number of seconds to wait for a message
+        :type idle_timeout: float or None
+        :return: generator of received messages
+        :rtype: generator
+        """
+
+        queue_ = queue.Queue(read_ahead)
+        stopped = self._stream_stop = threading.Event()
+        errors = []
+
+        def enqueue(line):
+            # Blocks while the buffer is full, unless the consumer has stopped
+            while not stopped.is_set():
+                try:
+                    queue_.put(line, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+
+        def read():
+            try:
+                self.receive(enqueue, reconnect=reconnect,
+                             prefilter=prefilter)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                enqueue(_STOP)
+
+        thread = threading.Thread(target=read, name='OgnClient-stream',
+                                  daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                try:
+                    line = queue_.get(timeout=idle_timeout)
+                except queue.Empty:
+                    logger.info('No messages received for %.0f seconds',
+                                idle_timeout)
+                    return
+
+                if line is _STOP:
+                    if errors:
+                        raise errors[0]
+                    return
+
+                if parser is None:
+                    yield line
+                    continue
+
+                try:
+                    data = parser(line)
+                except ogn_lib.exceptions.ParseError as e:
+                    message_log.report(logging.ERROR, 'unparsed',
+                                       type(e).__name__, line, exc_info=True)
+                else:
+                    yield data
+        finally:
+            stopped.set()
+            self._kill = True
+            try:
+                # Wakes up the background thread if it is waiting for data
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+            # The thread may be blocked in a reconnect; it stops on its own
+            # once the connection attempt returns (see OgnClient._reconnect)
+            thread.join(self.STREAM_JOIN_TIMEOUT)
+            if thread.is_alive():
+                logger.warning('Stream reader did not stop in %.0f seconds',
+                               self.STREAM_JOIN_TIMEOUT)
+
+            self._stream_stop = None
+            self.disconnect()
+
+    def _worker(self, queue_, callback, parser, stats):
+        """
+        Parses the queued messages and passes them to the callback until the
+        queue is stopped.
+
+        :param queue.Queue queue_: queue of received messages
+        :param callable callback: the callback function
+        :param parser: function that parses the APRS messages or None
+        :type parser: callable or None
+        :param ogn_lib.client.QueueStats stats: counters
+        """
+
+        while True:
+            line = queue_.get()
+            if line is _STOP:
+                return
+
+            try:
+                data = parser(line) if parser else line
+            except ogn_lib.exceptions.ParseError as e:
+                message_log.report(logging.ERROR, 'unparsed',
+                                   type(e).__name__, line, exc_info=True)
+                stats._add_processed()
+                continue
+
+            try:
+                callback(data)
+            except Exception:
+                logger.exception('Callback failed for message: %s', line)
+                stats._add_processed(callback_error=True)
+            else:
+                stats._add_processed()
+
     def _reconnect(self, retries=1, wait_period=15):
         """
         Attempts to recover a failed server connection.
@@ -150,8 +661,12 @@ class OgnClient:
         """
 
         logger.info('Trying to reconnect...')
+        stop = self._stream_stop
 
         while retries > 0:
+            if stop is not None and stop.is_set():
+                break
+
             try:
                 self.connect()
                 logger.error('Successfully reconnected')
@@ -161,11 +676,20 @@ class OgnClient:
                 logger.error('Reconnection attempt failed')
                 logger.exception(e)
                 retries -= 1
-                time.sleep(wait_period)
+                if stop is not None:
+                    stop.wait(wait_period)
+                else:
+                    time.sleep(wait_period)
         else:
             raise ConnectionError
 
-    def _receive_loop(self, callback, parser):
+        if stop is not None and stop.is_set():
+            # The stream was closed while reconnecting; connect() has reset
+            # _kill and opened a connection nobody will read
+            logger.info('Stream closed while reconnecting')
+            self.disconnect()
+
+    def _receive_loop(self, callback, parser, prefilter=None):
         """
         The main loop of the receive function.
 
@@ -175,25 +699,205 @@ class OgnClient:
         :param parser: function that parses the APRS messages or None if
                        callback should receive raw messages
         :type parser: callable or None
+        :param prefilter: optional filter of the raw messages
+        :type prefilter: callable or None
         """
 
-        line = None
-        while line != '' and not self._kill:
-            line = self._sock_file.readline().strip()
-            logger.debug('Received APRS message: %s', line)
+        if self.bulk_read:
+            self._receive_batches(callback, parser, prefilter)
+            return
 
-            if line.startswith('#'):
-                logger.debug('Received server message: %s', line)
-            elif parser:
+        lines = self._read_lines(prefilter)
+
+        if parser is None:
+            for line in lines:
+                callback(line)
+        elif hasattr(parser, 'parse_stream'):
+            # Parsers which process messages in batches (e.g.
+            # ogn_lib.parallel.ParallelParser)
+            failures = []
+            for data in parser.parse_stream(lines, failures):
+                callback(data)
+                self._report_failures(failures)
+        else:
+            for line in lines:
                 try:
                     callback(parser(line))
                 except ogn_lib.exceptions.ParseError as e:
-                    logger.exception(e)
+                    message_log.report(logging.ERROR, 'unparsed',
+                                       type(e).__name__, line, exc_info=True)
+
+    def _receive_batches(self, callback, parser, prefilter):
+        """
+        The main loop of the receive function when reading in bulk.
+
+        :param callback: the callback function which takes one parameter
+                         (the received message)
+        :type callback: callable
+        :param parser: function that parses the APRS messages or None if
+                       callback should receive raw messages
+        :type parser: callable or None
+        :param prefilter: optional filter of the raw messages (as bytes)
+        :type prefilter: callable or None
+        """
+
+        batches = self._read_batches(prefilter)
+
+        if parser is None:
+            for lines in batches:
+                for line in lines:
+                    callback(line)
+        elif hasattr(parser, 'parse_many'):
+            failures = []
+            for lines in batches:
+                for data in parser.parse_many(lines, failures):
+                    callback(data)
+                self._report_failures(failures)
+        else:
+            for lines in batches:
+                for line in lines:
+                    try:
+                        callback(parser(line))
+                    except ogn_lib.exceptions.ParseError as e:
+                        message_log.report(logging.ERROR, 'unparsed',
+                                           type(e).__name__, line,
+                                           exc_info=True)
+
+    @staticmethod
+    def _report_failures(failures):
+        """
+        Reports and clears the collected parse failures.
+
+        :param list failures: ogn_lib.parser.ParseFailure instances
+        """
+
+        for failure in failures:
+            message_log.report(logging.ERROR, 'unparsed',
+                               failure.reason.split(':', 1)[0], failure.raw)
+        del failures[:]
+
+    def _read_batches(self, prefilter):
+        """
+        Reads the APRS messages from the socket in batches until the
+        connection is closed.
+
+        Server messages and messages rejected by the prefilter are skipped
+        before they are decoded; keepalive messages are sent when necessary.
+
+        :param prefilter: optional filter of the raw messages (as bytes)
+        :type prefilter: callable or None
+        :return: generator of lists of decoded APRS messages
+        :rtype: generator
+        """
+
+        debug = logger.isEnabledFor(logging.DEBUG)
+
+        while not self._kill:
+            lines = self._read(self._sock_file.read_lines, [])
+            if lines is None:  # connection closed
+                return
+
+            if debug:
+                for line in lines:
+                    logger.debug('Received APRS message: %r', line)
+
+            if self.recorder is not None:
+                recorder = self.recorder
+                for line in lines:
+                    if line and not line.startswith(b'#'):
+                        recorder(line)
+
+            if prefilter is None:
+                batch = [line.decode(errors='replace') for line in lines
+                         if line and not line.startswith(b'#')]
             else:
-                logger.debug('Returning raw APRS message to callback')
-                callback(line)
+                batch = [line.decode(errors='replace') for line in lines
+                         if line and not line.startswith(b'#') and
+                         prefilter(line)]
+
+            if batch:
+                yield batch
 
             self._keepalive()
+            if self._batcher is not None:
+                self._batcher.flush_due()
+
+    def _read_lines(self, prefilter):
+        """
+        Reads the APRS messages from the socket until the connection is closed.
+
+        Server messages (starting with `#`) and messages rejected by the
+        prefilter are skipped; keepalive messages are sent when necessary.
+
+        :param prefilter: optional filter of the raw messages
+        :type prefilter: callable or None
+        :return: generator of raw APRS messages
+        :rtype: generator
+        """
+
+        # Checked once per connection to keep the per-line cost at zero when
+        # debug logging is disabled
+        debug = logger.isEnabledFor(logging.DEBUG)
+
+        while not self._kill:
+            line = self._read(self._sock_file.readline, None)
+            if line is None:  # the pending batch was due
+                continue
+            if not line:  # connection closed
+                return
+
+            line = line.strip()
+            if debug:
+                logger.debug('Received APRS message: %s', line)
+
+            if line.startswith('#'):
+                if debug:
+                    logger.debug('Received server message: %s', line)
+            elif line:
+                if self.recorder is not None:
+                    self.recorder(line)
+                if prefilter is None or prefilter(line):
+                    yield line
+
+            self._keepalive()
+            if self._batcher is not None:
+                self._batcher.flush_due()
+
+    def _read(self, read, due):
+        """
+        Calls the read function of the socket file.
+
+        While a batch is pending, the socket timeout is limited to the time
+        left until the batch is due. If nothing is received until then, the
+        batch is passed to the callback instead of treating the timeout as a
+        dropped connection.
+
+        :param callable read: read function of ogn_lib.reader.LineReader
+        :param due: value returned if the batch was passed to the callback
+                    before anything was received
+        :return: result of the read function or `due`
+        """
+
+        batcher = self._batcher
+        remaining = None if batcher is None else batcher.remaining()
+
+        if remaining is not None and remaining <= 0:
+            batcher.flush()
+            remaining = None
+
+        if remaining is None or remaining >= self.SOCKET_TIMEOUT:
+            return read()
+
+        self._socket.settimeout(remaining)
+        try:
+            return read()
+        except socket.timeout:
+            pass
+        finally:
+            self._socket.settimeout(self.SOCKET_TIMEOUT)
+
+        batcher.flush()
+        return due
 
     def send(self, message, retries=0, wait_period=0):
         """
@@ -226,58 +930,3 @@ class OgnClient:
             logger.info('No messages sent for %.0f seconds; sending keepalive',
                         td)
             self.send('#keepalive')
-
-    def _gen_auth_message(self):
-        """
-        Generates an APRS authentication message.
-
-        :return: authentication message
-        :rtype: str
-        """
-
-        base = 'user {} pass {} vers {} {}'.format(self.username,
-                                                   self.passcode,
-                                                   ogn_lib.__title__,
-                                                   ogn_lib.__version__)
-
-        if self.filter_:
-            base += ' filter {}'.format(self.filter_)
-
-        return base
-
-    def _validate_login(self, message):
-        """
-        Verifies that the login to the APRS server was successful.
-
-        :param str message: authentication response from the server
-        :return: True if user is authenticated to send messages
-        :rtype: bool
-        :raises ogn_lib.exceptions.LoginError: if the login was unsuccessful
-        """
-
-        # Sample response: # logresp user unverified, server GLIDERN3
-        if not message.startswith('# logresp'):
-            raise ogn_lib.exceptions.LoginError(
-                'Not a login message: ' + message)
-
-        try:
-            user_info, serv_info = message.split(', ')
-            username, status = user_info[10:].split(' ')
-            server = serv_info[7:]
-        except (IndexError, ValueError):
-            raise ogn_lib.exceptions.ParseError(
-                'Unable to parse login message: ' + message)
-
-        authenticated = False
-        if status == 'verified':
-            authenticated = True
-            logger.info('Successfully connected to %s as %s', server, username)
-        elif status == 'unverified' and self.passcode != '-1':
-            logger.info('Connected to %s', server)
-            logger.warn('Wrong username/passcode, continuing in r/o mode')
-        elif status == 'unverified':
-            logger.info('Connected to %s as guest', server)
-        else:
-            raise ogn_lib.exceptions.LoginError('Login failed: ' + message)
-
-        return authenticated
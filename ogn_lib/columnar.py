@@ -0,0 +1,314 @@
+"""
+ogn_lib.columnar
+----------------
+
+This module contains a batch parser which stores aircraft beacons in NumPy
+structured arrays (one row per beacon) instead of dictionaries.
+
+NumPy is an optional dependency of ogn-lib; it is only required when this
+module is used.
+"""
+
+import calendar
+
+from ogn_lib import parser, timestamps
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+NAN = float('nan')
+NO_CODE = -1  # dictionary code of missing strings
+NO_TYPE = 255  # aircraft/address type of beacons without the id field
+
+DTYPE = [
+    ('timestamp', 'int64'),  # seconds since the unix epoch (UTC)
+    ('latitude', 'float64'),
+    ('longitude', 'float64'),
+    ('altitude', 'float64'),
+    ('heading', 'float64'),
+    ('ground_speed', 'float64'),
+    ('vertical_speed', 'float64'),
+    ('aircraft_type', 'uint8'),
+    ('address_type', 'uint8'),
+    ('from', 'int32'),
+    ('uid', 'int32'),
+    ('receiver', 'int32')
+]
+
+
+class Dictionary:
+    """
+    Maps strings to integer codes.
+
+    Codes are assigned in order of appearance and are stable for the lifetime
+    of the dictionary.
+    """
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, value):
+        """
+        Returns the code of the given string, adding it to the dictionary if
+        necessary.
+
+        :param value: string to be encoded
+        :type value: str or None
+        :return: code of the string or NO_CODE if value is None
+        :rtype: int
+        """
+
+        if value is None:
+            return NO_CODE
+
+        try:
+            return self.codes[value]
+        except KeyError:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+            return code
+
+    def decode(self, codes):
+        """
+        Converts an array of codes back to strings.
+
+        :param codes: array of codes
+        :type codes: numpy.ndarray
+        :return: list of strings (None for NO_CODE)
+        :rtype: list
+        """
+
+        values = self.values
+        return [values[c] if c != NO_CODE else None for c in codes.tolist()]
+
+
+class ColumnarParser:
+    """
+    Parses batches of aircraft beacons into NumPy structured arrays.
+
+    Only the fields listed in DTYPE are extracted. String fields (`from`,
+    `uid` and `receiver`) are dictionary-encoded; the dictionaries are shared
+    by all batches parsed by the same instance so codes can be compared
+    across batches.
+
+    Raw values of the header and the position are collected per message;
+    unit conversions (knots and feet to SI units, minutes to degrees) and
+    timestamp resolution are then applied to whole columns. Comments are
+    parsed by the parser class of the message, so the values are the same as
+    the ones returned by Parser.
+    """
+
+    def __init__(self):
+        if numpy is None:
+            raise ImportError('ColumnarParser requires numpy')
+
+        self.sources = Dictionary()
+        self.uids = Dictionary()
+        self.receivers = Dictionary()
+
+    def parse(self, raw_messages, reference=None, failures=None,
+              prefilter=None):
+        """
+        Parses an iterable of raw APRS messages.
+
+        Server beacons and messages which fail to parse are skipped and
+        reported through `failures` (see ParserBase.parse_many).
+
+        :param raw_messages: raw APRS messages
+        :type raw_messages: iterable
+        :param reference: UTC time used to resolve the timestamps (defaults
+                          to the reference time of Parser.timestamp_resolver)
+        :type reference: datetime.datetime or None
+        :param failures: optional list collecting the parse failures
+        :type failures: list or None
+        :param prefilter: optional filter of the raw messages (see
+                          ogn_lib.filters); rejected messages are skipped
+        :type prefilter: callable or None
+        :return: parsed beacons
+        :rtype: numpy.ndarray
+        """
+
+        seconds = []  # seconds of the day or -1 for DDHHMM timestamps
+        dated = []  # timestamps of DDHHMM messages
+        latitudes = []  # thousandths of a minute
+        longitudes = []
+        altitudes = []  # feet
+        headings = []
+        speeds = []  # knots
+        vertical_speeds = []  # m/s
+        aircraft_types = []
+        address_types = []
+        sources = []
+        uids = []
+        receivers = []
+
+        if reference is not None:
+            resolver = timestamps.TimestampResolver(reference)
+        else:
+            resolver = parser.Parser.timestamp_resolver
+
+        for index, raw_message in enumerate(raw_messages):
+            if prefilter is not None and not prefilter(raw_message):
+                continue
+
+            try:
+                row = self._scan(raw_message, resolver)
+            except Exception as e:
+                if failures is not None:
+                    reason = '{}: {}'.format(type(e).__name__, e)
+                    failures.append(parser.ParseFailure(index, raw_message,
+                                                        reason))
+                continue
+
+            (sod, timestamp, latitude, longitude, altitude, heading, speed,
+             vertical_speed, aircraft_type, address_type, source, uid,
+             receiver) = row
+
+            seconds.append(sod)
+            dated.append(timestamp)
+            latitudes.append(latitude)
+            longitudes.append(longitude)
+            altitudes.append(altitude)
+            headings.append(heading)
+            speeds.append(speed)
+            vertical_speeds.append(vertical_speed)
+            aircraft_types.append(aircraft_type)
+            address_types.append(address_type)
+            sources.append(self.sources.encode(source))
+            uids.append(self.uids.encode(uid))
+            receivers.append(self.receivers.encode(receiver))
+
+        beacons = numpy.empty(len(seconds), dtype=DTYPE)
+
+        beacons['timestamp'] = self._resolve_timestamps(
+            numpy.array(seconds, dtype='int64'),
+            numpy.array(dated, dtype='int64'), resolver.reference)
+        beacons['latitude'] = numpy.array(latitudes, dtype='float64') / 60000
+        beacons['longitude'] = numpy.array(longitudes, dtype='float64') / 60000
+        beacons['altitude'] = (numpy.array(altitudes, dtype='float64') *
+                               parser.FEET_TO_METERS)
+        beacons['vertical_speed'] = vertical_speeds
+
+        # Parser._parse_heading_speed reports both values as missing if they
+        # are both zero.
+        headings = numpy.array(headings, dtype='float64')
+        speeds = numpy.array(speeds, dtype='float64')
+        stationary = (headings == 0) & (speeds == 0)
+        headings[stationary] = NAN
+        speeds[stationary] = NAN
+        beacons['heading'] = headings
+        beacons['ground_speed'] = speeds * parser.KNOTS_TO_MS
+
+        beacons['aircraft_type'] = aircraft_types
+        beacons['address_type'] = address_types
+        beacons['from'] = sources
+        beacons['uid'] = uids
+        beacons['receiver'] = receivers
+
+        return beacons
+
+    @staticmethod
+    def _scan(raw_message, resolver):
+        """
+        Extracts the raw (unconverted) values of a single message.
+
+        :param str raw_message: raw APRS message
+        :param resolver: resolver of the DDHHMM timestamps
+        :type resolver: ogn_lib.timestamps.TimestampResolver
+        :return: tuple of raw values
+        :rtype: tuple
+        :raises ValueError: if message is not an aircraft beacon
+        """
+
+        _, body = raw_message.split('>', 1)
+        if 'TCPIP*' in body:
+            raise ValueError('Not an aircraft beacon')
+
+        destto = body.split(',', 1)[0]
+        class_ = parser.ParserBase.parsers.get(destto,
+                                               parser.ParserBase.default)
+        if class_ is None:
+            raise ValueError('Parser for a destto name {} not found'
+                             .format(destto))
+
+        raw_message = class_._preprocess_message(raw_message)
+        (source, _, digipeaters, time_, latitude, longitude, heading, speed,
+         altitude, comment) = class_._match_message(raw_message)
+
+        if time_[-1] == 'h':
+            hours, minutes, seconds = (int(time_[:2]), int(time_[2:4]),
+                                       int(time_[4:6]))
+            if hours > 23 or minutes > 59 or seconds > 59:
+                raise ValueError('Invalid timestamp: {}'.format(time_))
+
+            sod = hours * 3600 + minutes * 60 + seconds
+            timestamp = 0
+        else:
+            sod = -1
+            timestamp = calendar.timegm(
+                resolver.resolve_datetime(time_[:6]).timetuple())
+
+        lat_digit = lon_digit = 0
+        vertical_speed = NAN
+        aircraft_type = address_type = NO_TYPE
+        uid = None
+
+        if comment:
+            data = class_._parse_protocol_specific(comment)
+
+            decimals = data.get('_third_decimal')
+            if decimals is not None:
+                lat_digit, lon_digit = decimals
+            if data.get('vertical_speed') is not None:
+                vertical_speed = data['vertical_speed']
+            if data.get('aircraft_type') is not None:
+                aircraft_type = data['aircraft_type'].value
+            if data.get('address_type') is not None:
+                address_type = data['address_type'].value
+            uid = data.get('uid')
+
+        # Positions are kept as signed integers in thousandths of a minute
+        lat = (int(latitude[:2]) * 60000 + int(latitude[2:4]) * 1000 +
+               int(latitude[5:7]) * 10 + lat_digit)
+        lon = (int(longitude[:3]) * 60000 + int(longitude[3:5]) * 1000 +
+               int(longitude[6:8]) * 10 + lon_digit)
+
+        return (sod, timestamp,
+                -lat if latitude[-1] == 'S' else lat,
+                -lon if longitude[-1] == 'W' else lon,
+                int(altitude) if altitude else NAN,
+                int(heading) if heading else NAN,
+                int(speed) if speed else NAN,
+                vertical_speed, aircraft_type, address_type, source, uid,
+                parser.Parser._parse_digipeaters(digipeaters)['receiver'])
+
+    @staticmethod
+    def _resolve_timestamps(seconds, timestamps, reference):
+        """
+        Converts the seconds of the day to unix timestamps in the same way
+        as Parser._parse_time.
+
+        :param numpy.ndarray seconds: seconds of the day (-1 if message used
+                                      the DDHHMM format)
+        :param numpy.ndarray timestamps: timestamps of DDHHMM messages
+        :param reference: reference time (UTC)
+        :type reference: datetime.datetime or None
+        :return: unix timestamps
+        :rtype: numpy.ndarray
+        """
+
+        reference = reference or parser.Parser.timestamp_resolver.reference
+        now = calendar.timegm(reference.timetuple())
+        midnight = now - now % 86400
+
+        resolved = midnight + seconds
+        resolved[resolved - now > 300] -= 86400
+
+        return numpy.where(seconds >= 0, resolved, timestamps)
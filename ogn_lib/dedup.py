@@ -0,0 +1,201 @@
+"""
+ogn_lib.dedup
+-------------
+
+This module contains a filter which suppresses duplicate copies of beacons
+reported by several receivers.
+"""
+
+import heapq
+import itertools
+import sys
+from datetime import timedelta
+
+from ogn_lib import cache
+
+
+class Deduplicator:
+    """
+    Passes through the first copy of every transmission.
+
+    Transmissions are identified by the source, the timestamp and the
+    position of the parsed beacon; copies reported by other receivers (or
+    relayed) are dropped. Beacons without a timestamp or a position (e.g.
+    server status messages) are always passed through.
+
+    Transmissions are remembered for `ttl` seconds, measured by the
+    timestamps of the beacons (so the filter also works on recorded streams),
+    but at most `maxsize` transmissions are kept. The transmissions are
+    evicted in the order of their timestamps (oldest first), so beacons do
+    not have to be received in order.
+
+    If `collect_receivers` is True, first copies are returned as
+    (beacon, receivers) tuples, where receivers is a list of
+    (receiver, signal_to_noise_ratio) tuples. The list is extended with the
+    receivers of the duplicates which arrive later, until the transmission
+    is evicted.
+    """
+
+    def __init__(self, ttl=30.0, maxsize=100000, collect_receivers=False):
+        """
+        Creates a new Deduplicator.
+
+        :param float ttl: number of seconds a transmission is remembered
+        :param int maxsize: maximum number of remembered transmissions
+        :param bool collect_receivers: True if the receivers of all copies
+                                       should be collected
+        """
+
+        self.ttl = timedelta(seconds=ttl)
+        self.maxsize = maxsize
+        self.collect_receivers = collect_receivers
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = {}  # key -> receivers (or None)
+        self._expiry = []  # heap of (timestamp, sequence number, key)
+        self._sequence = itertools.count()  # orders equal timestamps
+        self._latest = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __call__(self, beacon):
+        """
+        Checks whether the beacon is the first copy of the transmission.
+
+        :param beacon: parsed beacon
+        :type beacon: collections.abc.Mapping
+        :return: the beacon (or a (beacon, receivers) tuple) if it is the
+                 first copy, None otherwise
+        """
+
+        timestamp = beacon.get('timestamp')
+        latitude = beacon.get('latitude')
+
+        if timestamp is None or latitude is None:
+            return (beacon, []) if self.collect_receivers else beacon
+
+        key = (beacon.get('from'), timestamp, latitude,
+               beacon.get('longitude'))
+        entries = self._entries
+
+        if key in entries:
+            self.hits += 1
+            receivers = entries[key]
+            if receivers is not None:
+                receivers.append(self._receiver(beacon))
+            return None
+
+        self.misses += 1
+
+        if self._latest is None or timestamp > self._latest:
+            self._latest = timestamp
+            self._evict_expired()
+
+        receivers = ([self._receiver(beacon)] if self.collect_receivers
+                     else None)
+        entries[key] = receivers
+        heapq.heappush(self._expiry, (timestamp, next(self._sequence), key))
+
+        if len(entries) > self.maxsize:
+            del entries[heapq.heappop(self._expiry)[2]]
+            self.evictions += 1
+
+        return (beacon, receivers) if self.collect_receivers else beacon
+
+    def filter(self, beacons):
+        """
+        Filters an iterable of parsed beacons.
+
+        :param beacons: parsed beacons
+        :type beacons: iterable
+        :return: generator of first copies (see Deduplicator.__call__)
+        :rtype: generator
+        """
+
+        for beacon in beacons:
+            result = self(beacon)
+            if result is not None:
+                yield result
+
+    @property
+    def hit_rate(self):
+        """
+        Fraction of the checked beacons which were duplicates.
+        """
+
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        """
+        Returns the counters of the filter. Hits are duplicates, misses are
+        first copies.
+
+        :return: hits, misses, evictions, current and maximum size
+        :rtype: ogn_lib.cache.CacheStats
+        """
+
+        return cache.CacheStats(self.hits, self.misses, self.evictions,
+                                len(self._entries), self.maxsize)
+
+    def memory_usage(self):
+        """
+        Estimates the memory used by the remembered transmissions (without
+        the shared values of the beacons, e.g. callsigns and timestamps).
+
+        :return: number of bytes
+        :rtype: int
+        """
+
+        size = sys.getsizeof(self._entries) + sys.getsizeof(self._expiry)
+
+        for key, receivers in self._entries.items():
+            size += sys.getsizeof(key)
+            if receivers is not None:
+                size += sys.getsizeof(receivers)
+                size += sum(sys.getsizeof(r) for r in receivers)
+
+        # the (timestamp, sequence number, key) tuples of the heap
+        if self._expiry:
+            size += len(self._expiry) * (sys.getsizeof(self._expiry[0]) +
+                                         sys.getsizeof(self._expiry[0][1]))
+
+        return size
+
+    def clear(self):
+        """
+        Forgets all transmissions and resets the counters.
+        """
+
+        self._entries.clear()
+        self._expiry = []
+        self._latest = None
+        self.hits = self.misses = self.evictions = 0
+
+    def _evict_expired(self):
+        """
+        Forgets the transmissions older than `ttl` relative to the latest
+        timestamp.
+        """
+
+        cutoff = self._latest - self.ttl
+        expiry = self._expiry
+
+        while expiry and expiry[0][0] < cutoff:
+            del self._entries[heapq.heappop(expiry)[2]]
+            self.evictions += 1
+
+    @staticmethod
+    def _receiver(beacon):
+        """
+        Returns the receiver of the beacon.
+
+        :param beacon: parsed beacon
+        :type beacon: collections.abc.Mapping
+        :return: (receiver, signal_to_noise_ratio) tuple
+        :rtype: tuple
+        """
+
+        return beacon.get('receiver'), beacon.get('signal_to_noise_ratio')
@@ -0,0 +1,109 @@
+"""
+ogn_lib.diagnostics
+-------------------
+
+This module contains helpers for logging problems with received messages
+without flooding the logs.
+"""
+
+import threading
+import time
+
+
+class RateLimitedLog:
+    """
+    Aggregates repeated log messages.
+
+    Messages are reported with a category (e.g. `unknown-destto`) and a key
+    (e.g. the destto name). The first message for every category and key is
+    logged immediately; further messages are only counted and logged as a
+    single summary (with a sample) once per `interval` seconds, e.g.
+
+        12 unknown-destto messages for OGXYZ in the last 60s; sample: ...
+
+    The number of tracked keys is limited; keys above the limit are counted
+    together under the key `*`.
+    """
+
+    def __init__(self, logger, interval=60.0, max_keys=1000):
+        """
+        Creates a new RateLimitedLog.
+
+        :param logging.Logger logger: logger used to emit the messages
+        :param float interval: seconds between two summaries
+        :param int max_keys: maximum number of tracked keys
+        """
+
+        self.logger = logger
+        self.interval = interval
+        self.max_keys = max_keys
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._next_flush = time.monotonic() + interval
+
+    def report(self, level, category, key, sample, exc_info=None):
+        """
+        Reports a message.
+
+        :param int level: logging level
+        :param str category: category of the message
+        :param str key: key of the message within the category
+        :param str sample: example (e.g. the raw APRS message)
+        :param exc_info: exception info logged with the first message for the
+                         key
+        """
+
+        now = time.monotonic()
+
+        with self._lock:
+            if now >= self._next_flush:
+                self._flush(now)
+
+            entry = self._entries.get((category, key))
+
+            if entry is None:
+                if len(self._entries) >= self.max_keys:
+                    key = '*'
+                    entry = self._entries.get((category, key))
+
+            if entry is None:
+                self._entries[(category, key)] = [level, 0, None]
+                self.logger.log(level, '%s message for %s: %s', category, key,
+                                sample, exc_info=exc_info)
+            else:
+                entry[1] += 1
+                if entry[2] is None:
+                    entry[2] = sample
+
+    def flush(self):
+        """
+        Logs the summaries of all messages counted since the last summary.
+        """
+
+        with self._lock:
+            self._flush(time.monotonic())
+
+    def _flush(self, now):
+        """
+        Logs the summaries and forgets keys without new messages; the next
+        message for such a key is logged immediately again.
+
+        :param float now: current monotonic time
+        """
+
+        elapsed = self.interval - (self._next_flush - now)
+
+        for (category, key), entry in list(self._entries.items()):
+            level, count, sample = entry
+
+            if count:
+                self.logger.log(level,
+                                '%d %s messages for %s in the last %.0fs; '
+                                'sample: %s', count, category, key, elapsed,
+                                sample)
+                entry[1] = 0
+                entry[2] = None
+            else:
+                del self._entries[(category, key)]
+
+        self._next_flush = now + self.interval
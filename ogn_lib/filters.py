@@ -0,0 +1,377 @@
+"""
+ogn_lib.filters
+---------------
+
+This module contains filters which accept or reject raw APRS messages before
+they are parsed.
+
+Filters are callables which accept the raw message and return True if the
+message should be parsed. They can be passed as the `prefilter` argument to
+OgnClient.receive and to the `parse_many` methods of the parsers.
+
+Filters created with `binary=True` accept the raw message as bytes; they are
+used with the bytes-level reader of OgnClient (`bulk_read=True`), which only
+decodes the accepted messages.
+"""
+
+
+def _encoder(binary):
+    """
+    Returns a function converting the str constants of a filter to the type
+    of the filtered messages.
+
+    :param bool binary: True if the filtered messages are bytes
+    :return: conversion function
+    :rtype: callable
+    """
+
+    return str.encode if binary else str
+
+
+class HeaderFilter:
+    """
+    Filters messages by the fields of their header.
+
+    Only the header (the part of the message before the first `:`) is
+    inspected, using a few string operations per message. Criteria which are
+    None accept all messages; messages have to match all given criteria.
+    """
+
+    def __init__(self, sources=None, destto=None, receivers=None,
+                 servers=True, binary=False):
+        """
+        Creates a new HeaderFilter.
+
+        :param sources: accepted prefixes of the source callsign (e.g.
+                        `['FLR', 'ICA', 'OGN']`)
+        :type sources: iterable or None
+        :param destto: accepted destto names (e.g. `['APRS', 'OGNAVI']`)
+        :type destto: iterable or None
+        :param receivers: accepted receiver names
+        :type receivers: iterable or None
+        :param bool servers: True if server messages (`TCPIP*`) should be
+                             accepted regardless of the other criteria, False
+                             if they should be rejected
+        :param bool binary: True if the filter accepts messages as bytes
+        """
+
+        enc = _encoder(binary)
+        self.sources = (tuple(map(enc, sources)) if sources is not None
+                        else None)
+        self.destto = (frozenset(map(enc, destto)) if destto is not None
+                       else None)
+        self.receivers = (frozenset(map(enc, receivers))
+                          if receivers is not None else None)
+        self.servers = servers
+        self._symbols = tuple(map(enc, (':', 'TCPIP*', '>', ',')))
+
+    def __call__(self, raw_message):
+        """
+        Checks whether the message should be parsed.
+
+        :param raw_message: raw APRS message
+        :type raw_message: str or bytes
+        :return: True if message matches the criteria
+        :rtype: bool
+        """
+
+        colon, server, gt, comma = self._symbols
+
+        # find() is used instead of `in`, which is slow for bytes
+        end = raw_message.find(colon)
+        header = raw_message[:end] if end >= 0 else raw_message
+
+        if header.find(server) >= 0:
+            return self.servers
+
+        if self.sources is not None and not header.startswith(self.sources):
+            return False
+
+        if self.destto is not None:
+            start = header.find(gt)
+            if start < 0:
+                return False
+
+            start += 1
+            end = header.find(comma, start)
+            destto = header[start:end] if end >= 0 else header[start:]
+            if destto not in self.destto:
+                return False
+
+        if self.receivers is not None:
+            start = header.rfind(comma)
+            if start < 0 or header[start + 1:] not in self.receivers:
+                return False
+
+        return True
+
+
+_POSITION_SYMBOLS = {
+    False: (':', frozenset('NS'), frozenset('EW')),
+    True: (b':', frozenset([b'N', b'S']), frozenset([b'E', b'W']))
+}
+
+
+def _position_fields(raw_message, symbols):
+    """
+    Returns the latitude and longitude fields of the message as raw text.
+
+    :param raw_message: raw APRS message
+    :type raw_message: str or bytes
+    :param tuple symbols: `_POSITION_SYMBOLS` of the type of the message
+    :return: `DDMM.mmH` latitude and `DDDMM.mmH` longitude strings or None if
+             the message does not contain a position
+    :rtype: tuple or None
+    """
+
+    colon, north_south, east_west = symbols
+
+    # SRC>DST,DIGIS:/HHMMSSh4415.41N/00600.03E...
+    start = raw_message.find(colon)
+    if start < 0:
+        return None
+
+    start += 9
+    latitude = raw_message[start:start + 8]
+    longitude = raw_message[start + 9:start + 18]
+
+    if (len(longitude) != 9 or latitude[7:] not in north_south or
+            longitude[8:] not in east_west):
+        return None
+
+    return latitude, longitude
+
+
+def _format_minutes(degrees, width):
+    """
+    Formats an absolute coordinate in the fixed-width APRS format (without
+    the hemisphere), truncated to hundredths of a minute.
+
+    :param float degrees: absolute coordinate
+    :param int width: number of digits of degrees (2 or 3)
+    :return: `DDMM.mm` or `DDDMM.mm` string
+    :rtype: str
+    """
+
+    hundredths = int(degrees * 6000 + 1e-6)
+    deg, hundredths = divmod(hundredths, 6000)
+    minutes, hundredths = divmod(hundredths, 100)
+
+    return '{:0{}d}{:02d}.{:02d}'.format(deg, width, minutes, hundredths)
+
+
+def _hemisphere_ranges(low, high, width, positive, negative, enc):
+    """
+    Splits the interval of coordinates into intervals of the raw text for
+    each hemisphere.
+
+    :param float low: lower bound (degrees)
+    :param float high: upper bound (degrees)
+    :param int width: number of digits of degrees
+    :param str positive: hemisphere of positive coordinates (N or E)
+    :param str negative: hemisphere of negative coordinates (S or W)
+    :param callable enc: conversion of the strings (see `_encoder`)
+    :return: dictionary mapping hemispheres to (lowest, highest) strings
+    :rtype: dict
+    """
+
+    ranges = {}
+
+    if high >= 0:
+        ranges[enc(positive)] = (enc(_format_minutes(max(low, 0), width)),
+                                 enc(_format_minutes(high, width)))
+    if low < 0:
+        ranges[enc(negative)] = (enc(_format_minutes(max(-high, 0), width)),
+                                 enc(_format_minutes(-low, width)))
+
+    return ranges
+
+
+class BoundingBoxFilter:
+    """
+    Filters messages by the position, using one or more bounding boxes.
+
+    The fixed-width `DDMM.mm`/`DDDMM.mm` fields of the raw message are
+    compared as strings against bounds precomputed for each hemisphere, so
+    no regular expression or float conversion is needed. Bounds are
+    truncated to hundredths of a minute (the precision of the raw fields, the
+    third decimal is ignored).
+    """
+
+    def __init__(self, boxes, keep_unpositioned=False, binary=False):
+        """
+        Creates a new BoundingBoxFilter.
+
+        :param boxes: bounding boxes as (south, west, north, east) tuples in
+                      degrees
+        :type boxes: iterable
+        :param bool keep_unpositioned: True if messages without a position
+                                       (e.g. server status) should be accepted
+        :param bool binary: True if the filter accepts messages as bytes
+        """
+
+        enc = _encoder(binary)
+        self.boxes = [tuple(b) for b in boxes]
+        self.keep_unpositioned = keep_unpositioned
+        self._symbols = _POSITION_SYMBOLS[binary]
+        self._ranges = [
+            (_hemisphere_ranges(south, north, 2, 'N', 'S', enc),
+             _hemisphere_ranges(west, east, 3, 'E', 'W', enc))
+            for south, west, north, east in self.boxes
+        ]
+
+    def __call__(self, raw_message):
+        """
+        Checks whether the message should be parsed.
+
+        :param raw_message: raw APRS message
+        :type raw_message: str or bytes
+        :return: True if position is in one of the bounding boxes
+        :rtype: bool
+        """
+
+        fields = _position_fields(raw_message, self._symbols)
+        if fields is None:
+            return self.keep_unpositioned
+
+        latitude, longitude = fields
+        lat, lat_sphere = latitude[:7], latitude[7:]
+        lon, lon_sphere = longitude[:8], longitude[8:]
+
+        for lat_ranges, lon_ranges in self._ranges:
+            lat_range = lat_ranges.get(lat_sphere)
+            if lat_range is None or not lat_range[0] <= lat <= lat_range[1]:
+                continue
+
+            lon_range = lon_ranges.get(lon_sphere)
+            if lon_range is not None and lon_range[0] <= lon <= lon_range[1]:
+                return True
+
+        return False
+
+
+class GridFilter:
+    """
+    Filters messages by the position, using a set of 1x1 degree grid cells.
+
+    The cell of a message is read from the degrees and hemispheres of the
+    raw position fields; it is checked with a single set lookup regardless
+    of the number of cells. Positions on a whole degree in the southern or
+    western hemisphere (e.g. `1000.00S`) belong to the cell further from the
+    equator.
+    """
+
+    def __init__(self, cells, keep_unpositioned=False, binary=False):
+        """
+        Creates a new GridFilter.
+
+        :param cells: cells given by the (latitude, longitude) of their
+                      south-west corners in whole degrees, e.g. (46, 13) for
+                      the cell between 46N-47N and 13E-14E
+        :type cells: iterable
+        :param bool keep_unpositioned: True if messages without a position
+                                       (e.g. server status) should be accepted
+        :param bool binary: True if the filter accepts messages as bytes
+        """
+
+        enc = _encoder(binary)
+        self.keep_unpositioned = keep_unpositioned
+        self._symbols = _POSITION_SYMBOLS[binary]
+        self._cells = frozenset(enc(self._cell_key(lat, lon))
+                                for lat, lon in cells)
+
+    @classmethod
+    def covering(cls, south, west, north, east, keep_unpositioned=False,
+                 binary=False):
+        """
+        Creates a filter with all cells which intersect the bounding box.
+
+        The bounds are inclusive: positions on a whole degree at the edge of
+        the box are accepted (their cell is found as in GridFilter.__call__).
+
+        :param float south: southern bound (degrees)
+        :param float west: western bound (degrees)
+        :param float north: northern bound (degrees)
+        :param float east: eastern bound (degrees)
+        :param bool keep_unpositioned: see GridFilter.__init__
+        :param bool binary: see GridFilter.__init__
+        :return: new filter
+        :rtype: ogn_lib.filters.GridFilter
+        """
+
+        lats = range(cls._cell_of(south), cls._cell_of(north) + 1)
+        lons = range(cls._cell_of(west), cls._cell_of(east) + 1)
+
+        return cls([(lat, lon) for lat in lats for lon in lons],
+                   keep_unpositioned, binary)
+
+    @staticmethod
+    def _cell_of(degrees):
+        """
+        Returns the cell coordinate of a latitude or a longitude.
+
+        :param float degrees: signed coordinate
+        :return: coordinate of the south-west corner of the cell
+        :rtype: int
+        """
+
+        # Whole degrees in the southern and western hemisphere belong to
+        # the cell further from the equator
+        if degrees >= 0:
+            return int(degrees)
+        return -int(-degrees) - 1
+
+    @staticmethod
+    def _cell_key(lat, lon):
+        """
+        Returns the raw text key of the cell.
+
+        :param int lat: latitude of the south-west corner
+        :param int lon: longitude of the south-west corner
+        :return: key in the format `DDHDDDH`
+        :rtype: str
+        """
+
+        lat_key = ('{:02d}N'.format(lat) if lat >= 0
+                   else '{:02d}S'.format(-lat - 1))
+        lon_key = ('{:03d}E'.format(lon) if lon >= 0
+                   else '{:03d}W'.format(-lon - 1))
+
+        return lat_key + lon_key
+
+    def __call__(self, raw_message):
+        """
+        Checks whether the message should be parsed.
+
+        :param raw_message: raw APRS message
+        :type raw_message: str or bytes
+        :return: True if position is in one of the cells
+        :rtype: bool
+        """
+
+        fields = _position_fields(raw_message, self._symbols)
+        if fields is None:
+            return self.keep_unpositioned
+
+        latitude, longitude = fields
+        return (latitude[:2] + latitude[7:] + longitude[:3] + longitude[8:]
+                in self._cells)
+
+
+def all_of(*filters):
+    """
+    Combines the filters into a filter which accepts messages accepted by
+    all of them (e.g. a HeaderFilter and a BoundingBoxFilter).
+
+    :param filters: filters to be combined
+    :return: combined filter
+    :rtype: callable
+    """
+
+    def combined(raw_message):
+        for filter_ in filters:
+            if not filter_(raw_message):
+                return False
+        return True
+
+    return combined
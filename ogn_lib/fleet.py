@@ -0,0 +1,285 @@
+"""
+ogn_lib.fleet
+-------------
+
+This module contains a table with the latest known state of every aircraft.
+"""
+
+import array
+import collections
+import heapq
+import math
+from datetime import datetime, timedelta
+
+
+EPOCH = datetime(1970, 1, 1)
+
+AircraftState = collections.namedtuple('AircraftState', [
+    'key', 'timestamp', 'latitude', 'longitude', 'altitude', 'ground_speed',
+    'vertical_speed', 'heading', 'receiver'])
+
+# Numeric fields of the state and the typecodes of their arrays
+_COLUMNS = (('latitude', 'd'), ('longitude', 'd'), ('altitude', 'f'),
+            ('ground_speed', 'f'), ('vertical_speed', 'f'), ('heading', 'f'))
+
+_NAMES = tuple(name for name, _ in _COLUMNS)
+
+_NAN = float('nan')
+
+# Bits of the slot in the entries of the expiry heap
+_SLOT_BITS = 32
+_SLOT_MASK = (1 << _SLOT_BITS) - 1
+
+
+class FleetState:
+    """
+    Keeps the latest known state of every aircraft.
+
+    The state is updated from parsed beacons (e.g. by passing
+    FleetState.update as the callback of OgnClient.receive). Aircraft are
+    identified by the `uid` of the beacon (or `from` if the beacon has no
+    uid, or if `key` is `from`).
+
+    Numeric values are stored in typed arrays (one slot per aircraft, slots
+    of evicted aircraft are reused) instead of a dictionary per aircraft.
+    Aircraft which have not been heard for `ttl` seconds, measured by the
+    timestamps of the beacons, are evicted when newer beacons are received
+    or when FleetState.evict is called. Beacons do not have to be received
+    in the order of their timestamps.
+
+    An optional spatial index (ogn_lib.spatial.SpatialGrid) is kept in sync
+    with the positions in the table.
+    """
+
+    def __init__(self, ttl=600.0, key='uid', index=None):
+        """
+        Creates a new FleetState.
+
+        :param float ttl: number of seconds after which a silent aircraft is
+                          evicted
+        :param str key: `uid` or `from`
+        :param index: optional spatial index of the positions
+        :type index: ogn_lib.spatial.SpatialGrid or None
+        """
+
+        self.ttl = ttl
+        self.key = key
+        self.index = index
+        self.evictions = 0
+        self._slots = collections.OrderedDict()  # least recently updated first
+        # Heap with one entry per aircraft: the time of the last update
+        # (rounded up to whole seconds) and the slot packed into an int, see
+        # FleetState._expiry_entry; the time is updated lazily, when the
+        # entry reaches the top of the heap
+        self._expiry = []
+        self._keys = []  # key of the aircraft in each slot
+        self._free = []
+        self._times = array.array('d')
+        self._columns = [array.array(typecode) for _, typecode in _COLUMNS]
+        self._receivers = []
+        self._latest = None
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, key):
+        return key in self._slots
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def update(self, beacon):
+        """
+        Updates the state of the aircraft with the parsed beacon.
+
+        Beacons without a position or a timestamp and beacons older than the
+        known state are ignored.
+
+        :param beacon: parsed beacon
+        :type beacon: collections.abc.Mapping
+        :return: True if the state was updated
+        :rtype: bool
+        """
+
+        timestamp = beacon.get('timestamp')
+        if timestamp is None or beacon.get('latitude') is None:
+            return False
+
+        key = ((self.key == 'uid' and beacon.get('uid')) or
+               beacon.get('from'))
+        seconds = (timestamp - EPOCH).total_seconds()
+
+        slot = self._slots.get(key)
+
+        if slot is None:
+            slot = self._allocate()
+            self._slots[key] = slot
+            self._keys[slot] = key
+            heapq.heappush(self._expiry, self._expiry_entry(seconds, slot))
+        elif seconds < self._times[slot]:
+            return False
+        else:
+            self._slots.move_to_end(key)
+
+        self._times[slot] = seconds
+        for column, name in zip(self._columns, _NAMES):
+            value = beacon.get(name)
+            column[slot] = _NAN if value is None else value
+        self._receivers[slot] = beacon.get('receiver')
+
+        if self.index is not None:
+            self.index.move(key, beacon['latitude'], beacon['longitude'])
+
+        if self._latest is None or seconds > self._latest:
+            self._latest = seconds
+            self._evict_before(seconds - self.ttl)
+
+        return True
+
+    def get(self, key, default=None):
+        """
+        Returns the state of the aircraft.
+
+        :param str key: uid or callsign of the aircraft
+        :param default: value returned if the aircraft is not known
+        :return: state of the aircraft or `default`
+        :rtype: ogn_lib.fleet.AircraftState
+        """
+
+        slot = self._slots.get(key)
+        if slot is None:
+            return default
+
+        return self._state(key, slot)
+
+    def snapshot(self):
+        """
+        Returns the states of all aircraft.
+
+        :return: list of states, least recently updated first
+        :rtype: list
+        """
+
+        return [self._state(key, slot) for key, slot in self._slots.items()]
+
+    def evict(self, reference=None):
+        """
+        Evicts the aircraft which have not been heard for `ttl` seconds.
+
+        :param reference: current time (defaults to the timestamp of the
+                          latest beacon)
+        :type reference: datetime.datetime or None
+        :return: number of evicted aircraft
+        :rtype: int
+        """
+
+        if reference is not None:
+            latest = (reference - EPOCH).total_seconds()
+        elif self._latest is not None:
+            latest = self._latest
+        else:
+            return 0
+
+        return self._evict_before(latest - self.ttl)
+
+    def clear(self):
+        """
+        Removes all aircraft.
+        """
+
+        self._slots.clear()
+        if self.index is not None:
+            self.index.clear()
+        self._expiry = []
+        self._keys = []
+        self._free = []
+        self._times = array.array('d')
+        self._columns = [array.array(typecode) for _, typecode in _COLUMNS]
+        self._receivers = []
+        self._latest = None
+
+    def _allocate(self):
+        """
+        Returns a free slot, growing the arrays if necessary.
+
+        :return: index of the slot
+        :rtype: int
+        """
+
+        if self._free:
+            return self._free.pop()
+
+        self._times.append(_NAN)
+        for column in self._columns:
+            column.append(_NAN)
+        self._receivers.append(None)
+        self._keys.append(None)
+
+        return len(self._times) - 1
+
+    @staticmethod
+    def _expiry_entry(seconds, slot):
+        """
+        Packs the time of the last update and the slot into an entry of the
+        expiry heap. The time is rounded up, so an aircraft is never evicted
+        before its last update expires.
+
+        :param float seconds: seconds since the epoch
+        :param int slot: index of the slot
+        :return: entry ordered by the time
+        :rtype: int
+        """
+
+        return math.ceil(seconds) << _SLOT_BITS | slot
+
+    def _evict_before(self, cutoff):
+        """
+        Evicts the aircraft last heard before the cutoff.
+
+        :param float cutoff: seconds since the epoch
+        :return: number of evicted aircraft
+        :rtype: int
+        """
+
+        slots = self._slots
+        times = self._times
+        expiry = self._expiry
+        evicted = 0
+
+        while expiry and expiry[0] >> _SLOT_BITS < cutoff:
+            slot = expiry[0] & _SLOT_MASK
+            entry = self._expiry_entry(times[slot], slot)
+            if entry >> _SLOT_BITS >= cutoff:
+                # updated since the entry was pushed
+                heapq.heapreplace(expiry, entry)
+                continue
+
+            heapq.heappop(expiry)
+            key = self._keys[slot]
+            self._keys[slot] = None
+            del slots[key]
+            if self.index is not None:
+                self.index.remove(key)
+            self._receivers[slot] = None
+            self._free.append(slot)
+            evicted += 1
+
+        self.evictions += evicted
+        return evicted
+
+    def _state(self, key, slot):
+        """
+        Builds the state of the aircraft from its slot.
+
+        :param str key: key of the aircraft
+        :param int slot: index of the slot
+        :return: state of the aircraft
+        :rtype: ogn_lib.fleet.AircraftState
+        """
+
+        # NaN (missing value) is the only value not equal to itself
+        values = [v if v == v else None
+                  for v in [column[slot] for column in self._columns]]
+        return AircraftState(key,
+                             EPOCH + timedelta(seconds=self._times[slot]),
+                             *values, receiver=self._receivers[slot])
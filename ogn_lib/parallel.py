@@ -0,0 +1,351 @@
+"""
+ogn_lib.parallel
+----------------
+
+This module contains a parser which spreads the parsing of raw APRS messages
+across a pool of worker processes.
+
+Messages are sent to the workers in chunks and the parsed messages are
+returned in the same order as the input. The parsed dictionaries are sent
+back as they are: the parent process only unpickles them, which is cheaper
+than decoding a more compact form field by field in Python.
+"""
+
+import collections
+import multiprocessing
+import queue
+import threading
+import time
+
+from ogn_lib import parser
+
+
+# Parser used by the worker processes (set by _init_worker)
+_worker_parser = None
+
+# Items of the queue read by ParallelParser.parse_stream besides the raw
+# messages: the end of the input, an error raised by the input and a chunk
+# which finished parsing
+_END = object()
+_InputError = collections.namedtuple('_InputError', ['exception'])
+_PARSED = object()
+
+
+def _init_worker(parser_):
+    """
+    Initializes a worker process.
+
+    :param parser_: parser used by the worker
+    """
+
+    global _worker_parser
+    _worker_parser = parser_
+
+
+def _parse_chunk(lines):
+    """
+    Parses a chunk of raw messages in a worker process.
+
+    :param list lines: raw APRS messages
+    :return: parsed messages and (index, reason) tuples of the failures
+    :rtype: tuple
+    """
+
+    failures = []
+    parsed = list(_worker_parser.parse_many(lines, failures))
+
+    return parsed, [(f.index, f.reason) for f in failures]
+
+
+def _feed(raw_messages, inbox, stop):
+    """
+    Reads the input of ParallelParser.parse_stream into a queue (in a
+    background thread).
+
+    :param raw_messages: raw APRS messages
+    :type raw_messages: iterable
+    :param queue.Queue inbox: queue receiving the messages
+    :param threading.Event stop: event which is set when the messages are no
+                                 longer needed
+    """
+
+    try:
+        for raw_message in raw_messages:
+            if stop.is_set():
+                return
+            inbox.put(raw_message)
+    except Exception as e:
+        inbox.put(_InputError(e))
+
+    inbox.put(_END)
+
+
+class ParallelParser:
+    """
+    Parses raw APRS messages in a pool of worker processes.
+
+    The parser can be passed to OgnClient.receive as the `parser` argument:
+    received messages are collected into chunks (of at most `chunk_size`
+    messages, or the messages received in `max_delay` seconds) which are
+    parsed in the workers, and the parsed messages are passed to the
+    callback in the order in which they were received, as soon as they are
+    parsed (see ParallelParser.parse_stream).
+
+    Worker processes are started on first use and stopped by
+    ParallelParser.close (or when used as a context manager). With the `fork`
+    start method, workers inherit the state of the parser at that time (e.g.
+    Parser.timestamp_resolver).
+    """
+
+    def __init__(self, processes=None, chunk_size=500, max_delay=0.5,
+                 parser_=parser.Parser):
+        """
+        Creates a new ParallelParser.
+
+        :param processes: number of worker processes (defaults to the number
+                          of CPUs)
+        :type processes: int or None
+        :param int chunk_size: maximum number of messages per chunk
+        :param float max_delay: maximum number of seconds a received message
+                                waits for its chunk to be sent to a worker
+        :param parser_: parser used by the workers; must provide parse_many
+                        and be picklable (e.g. Parser or a ProjectedParser)
+        """
+
+        self.processes = processes or multiprocessing.cpu_count()
+        self.chunk_size = chunk_size
+        self.max_delay = max_delay
+        self.parser = parser_
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __call__(self, raw_message):
+        """
+        Parses a single raw APRS message in the current process.
+
+        :param str raw_message: raw APRS message
+        :return: parsed message
+        :rtype: dict
+        """
+
+        return self.parser(raw_message)
+
+    def close(self):
+        """
+        Stops the worker processes.
+        """
+
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def parse_many(self, raw_messages, failures=None, prefilter=None):
+        """
+        Parses an iterable of raw APRS messages (see ParserBase.parse_many).
+
+        :param raw_messages: raw APRS messages
+        :type raw_messages: iterable
+        :param failures: optional list collecting the parse failures
+        :type failures: list or None
+        :param prefilter: optional filter of the raw messages (see
+                          ogn_lib.filters); applied in the current process
+        :type prefilter: callable or None
+        :return: generator of parsed messages
+        :rtype: generator
+        """
+
+        if prefilter is not None:
+            messages = ((i, m) for i, m in enumerate(raw_messages)
+                        if prefilter(m))
+        else:
+            messages = enumerate(raw_messages)
+
+        return self._parse(messages, failures)
+
+    def parse_stream(self, raw_messages, failures=None):
+        """
+        Parses a stream of raw APRS messages, e.g. messages received from the
+        socket.
+
+        Unlike ParallelParser.parse_many, a chunk is also sent to the workers
+        when its first message has waited for `max_delay` seconds, and parsed
+        messages are returned as soon as their chunk (and all the chunks
+        before it) is parsed, even if no further messages are received.
+
+        The messages are read from `raw_messages` in a background thread;
+        errors raised by it are raised by the returned generator. If the
+        generator is closed early, the thread stops after reading the next
+        message.
+
+        :param raw_messages: raw APRS messages
+        :type raw_messages: iterable
+        :param failures: optional list collecting the parse failures
+        :type failures: list or None
+        :return: generator of parsed messages
+        :rtype: generator
+        """
+
+        pool = self._get_pool()
+        max_pending = 2 * self.processes
+
+        inbox = queue.Queue()
+        stop = threading.Event()
+        feeder = threading.Thread(target=_feed,
+                                  args=(raw_messages, inbox, stop))
+        feeder.daemon = True
+        feeder.start()
+
+        def notify(result):
+            inbox.put(_PARSED)
+
+        chunks = collections.deque()  # (indices, messages, async result)
+        indices = []
+        lines = []
+        deadline = None
+        index = 0
+
+        try:
+            while True:
+                timeout = None
+                if lines:
+                    timeout = max(0, deadline - time.monotonic())
+
+                try:
+                    item = inbox.get(timeout=timeout)
+                except queue.Empty:
+                    item = None  # the chunk is due
+
+                if item is _END:
+                    break
+                elif isinstance(item, _InputError):
+                    raise item.exception
+                elif item is not None and item is not _PARSED:
+                    if not lines:
+                        deadline = time.monotonic() + self.max_delay
+
+                    indices.append(index)
+                    lines.append(item)
+                    index += 1
+
+                if lines and (len(lines) >= self.chunk_size or
+                              time.monotonic() >= deadline):
+                    self._send(pool, chunks, indices, lines, notify)
+                    indices = []
+                    lines = []
+
+                while chunks and (chunks[0][2].ready() or
+                                  len(chunks) > max_pending):
+                    yield from self._collect(chunks.popleft(), failures)
+
+            if lines:
+                self._send(pool, chunks, indices, lines)
+
+            while chunks:
+                yield from self._collect(chunks.popleft(), failures)
+        finally:
+            stop.set()
+
+    def _parse(self, messages, failures):
+        """
+        Sends the messages to the workers in full chunks and returns the
+        parsed messages in the input order.
+
+        :param messages: iterable of (index, raw message) tuples
+        :type messages: iterable
+        :param failures: optional list collecting the parse failures
+        :type failures: list or None
+        :return: generator of parsed messages
+        :rtype: generator
+        """
+
+        pool = self._get_pool()
+        max_pending = 2 * self.processes
+
+        chunks = collections.deque()  # (indices, messages, async result)
+        indices = []
+        lines = []
+
+        for index, raw_message in messages:
+            indices.append(index)
+            lines.append(raw_message)
+
+            if len(lines) >= self.chunk_size:
+                self._send(pool, chunks, indices, lines)
+                indices = []
+                lines = []
+
+            while chunks and (chunks[0][2].ready() or
+                              len(chunks) > max_pending):
+                yield from self._collect(chunks.popleft(), failures)
+
+        if lines:
+            self._send(pool, chunks, indices, lines)
+
+        while chunks:
+            yield from self._collect(chunks.popleft(), failures)
+
+    @staticmethod
+    def _send(pool, chunks, indices, lines, notify=None):
+        """
+        Sends a chunk of messages to the workers.
+
+        :param multiprocessing.pool.Pool pool: pool of worker processes
+        :param collections.deque chunks: chunks which are being parsed
+        :param list indices: indices of the messages
+        :param list lines: raw APRS messages
+        :param notify: optional function called (in a thread of the pool)
+                       when the chunk is parsed
+        :type notify: callable or None
+        """
+
+        if notify is not None:
+            result = pool.apply_async(_parse_chunk, (lines,), callback=notify,
+                                      error_callback=notify)
+        else:
+            result = pool.apply_async(_parse_chunk, (lines,))
+
+        chunks.append((indices, lines, result))
+
+    def _get_pool(self):
+        """
+        Returns the pool of worker processes, starting it if necessary.
+
+        :return: pool of worker processes
+        :rtype: multiprocessing.pool.Pool
+        """
+
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(self.processes,
+                                              initializer=_init_worker,
+                                              initargs=(self.parser,))
+
+        return self._pool
+
+    @staticmethod
+    def _collect(chunk, failures):
+        """
+        Waits for the chunk to be parsed.
+
+        :param tuple chunk: indices of the messages, the messages and the
+                            async result
+        :param failures: optional list collecting the parse failures
+        :type failures: list or None
+        :return: generator of parsed messages
+        :rtype: generator
+        """
+
+        indices, lines, result = chunk
+        parsed, chunk_failures = result.get()
+
+        if failures is not None:
+            for index, reason in chunk_failures:
+                failures.append(parser.ParseFailure(indices[index],
+                                                    lines[index], reason))
+
+        yield from parsed
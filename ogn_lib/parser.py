@@ -1,10 +1,10 @@
 import collections
-import functools
 import logging
 import re
-from datetime import datetime, time, timedelta
+import types
+from datetime import timedelta
 
-from ogn_lib import constants, exceptions
+from ogn_lib import cache, constants, diagnostics, exceptions, timestamps
 
 
 FEET_TO_METERS = 0.3048
@@ -17,6 +17,9 @@ TD_1DAY = timedelta(days=1)
 
 logger = logging.getLogger(__name__)
 
+# Rate-limited log of unknown destto names and messages which failed to parse
+message_log = diagnostics.RateLimitedLog(logger)
+
 
 class ParserBase(type):
     """
@@ -70,35 +73,146 @@ class ParserBase(type):
         """
 
         try:
-            _, body = raw_message.split('>', 1)
-            destto, *_ = body.split(',', 1)
+            parser = cls.find_parser(raw_message)
+            return parser.parse_message(raw_message)
+
+        except exceptions.ParserNotFoundError:
+            raise
+        except Exception as e:
+            raise exceptions.ParseError('Failed to parse message: {}'
+                                        .format(raw_message)) from e
+
+    @classmethod
+    def find_parser(cls, raw_message):
+        """
+        Finds the parser for the given message using its destto name.
+
+        :param str raw_message: raw APRS message
+        :return: parser for the message
+        :rtype: ogn_lib.parser.ParserBase
+        :raises ogn_lib.exceptions.ParserNotFoundError: if parser for this
+            message's callsign was not found
+        :raises ValueError: if message does not contain a destto name
+        """
+
+        _, body = raw_message.split('>', 1)
+        destto, *_ = body.split(',', 1)
+
+        if 'TCPIP*' in body:
+            return ServerParser
+
+        try:
+            parser = cls.parsers[destto]
+        except KeyError:
+            message_log.report(logging.WARNING, 'unknown-destto', destto,
+                               raw_message)
+
+            if cls.default:
+                parser = cls.default
+            else:
+                raise exceptions.ParserNotFoundError(
+                    'Parser for a destto name {} not found; found: {}'
+                    .format(destto, list(cls.parsers.keys())))
 
-            if 'TCPIP*' in body:
-                return ServerParser.parse_message(raw_message)
+        return parser
+
+    @classmethod
+    def parse_many(cls, raw_messages, failures=None, prefilter=None):
+        """
+        Parses an iterable of raw APRS messages.
+
+        Messages are parsed lazily; use `list(Parser.parse_many(lines))` to
+        collect the results. Unlike ParserBase.__call__, failures are not
+        raised or logged. Instead, a ParseFailure (index of the message in
+        `raw_messages`, the message and the reason) is appended to `failures`
+        for every message which could not be parsed.
+
+        :param raw_messages: raw APRS messages
+        :type raw_messages: iterable
+        :param failures: optional list collecting the parse failures
+        :type failures: list or None
+        :param prefilter: optional filter of the raw messages (see
+                          ogn_lib.filters); rejected messages are skipped
+        :type prefilter: callable or None
+        :return: generator of parsed messages
+        :rtype: generator
+        """
+
+        return cls._parse_each(raw_messages, failures,
+                               lambda parser, raw: parser.parse_message(raw),
+                               prefilter)
+
+    @classmethod
+    def compile(cls, fields):
+        """
+        Creates a parser which only parses the given fields (see
+        ProjectedParser).
+
+        :param fields: keys of the parsed messages which should be returned
+        :type fields: iterable
+        :return: projected parser
+        :rtype: ogn_lib.parser.ProjectedParser
+        """
+
+        return ProjectedParser(fields)
+
+    @classmethod
+    def _parse_each(cls, raw_messages, failures, parse, prefilter=None):
+        """
+        Finds the parser for each of the raw messages and parses it with the
+        `parse` function (see ParserBase.parse_many).
+
+        :param raw_messages: raw APRS messages
+        :type raw_messages: iterable
+        :param failures: optional list collecting the parse failures
+        :type failures: list or None
+        :param callable parse: function which accepts the parser and the raw
+                               message and returns the parsed message
+        :param prefilter: optional filter of the raw messages
+        :type prefilter: callable or None
+        :return: generator of parsed messages
+        :rtype: generator
+        """
+
+        # Destto names are resolved once per call; None marks names without
+        # a parser (when the default parser is not set).
+        resolved = {}
+
+        for index, raw_message in enumerate(raw_messages):
+            if prefilter is not None and not prefilter(raw_message):
+                continue
 
             try:
-                parser = cls.parsers[destto]
-                logger.debug('Using %s parser for %s', parser, raw_message)
-            except KeyError:
-                logger.warn('Parser for a destto name %s not found; found: %s',
-                            destto, list(cls.parsers.keys()))
+                _, body = raw_message.split('>', 1)
 
-                if cls.default:
-                    parser = cls.default
+                if 'TCPIP*' in body:
+                    parser = ServerParser
                 else:
-                    raise exceptions.ParserNotFoundError(
-                        'Parser for a destto name {} not found; found: {}'
-                        .format(destto, list(cls.parsers.keys())))
+                    destto = body.split(',', 1)[0]
 
-            return parser.parse_message(raw_message)
+                    try:
+                        parser = resolved[destto]
+                    except KeyError:
+                        parser = cls.parsers.get(destto, cls.default)
+                        resolved[destto] = parser
 
-        except exceptions.ParserNotFoundError:
-            raise
-        except Exception as e:
-            msg = 'Failed to parse message: {}'.format(raw_message)
-            logger.error(msg)
-            logger.exception(e)
-            raise exceptions.ParseError(msg)
+                    if parser is None:
+                        raise exceptions.ParserNotFoundError(
+                            'Parser for a destto name {} not found'
+                            .format(destto))
+
+                data = parse(parser, raw_message)
+            except Exception as e:
+                if failures is not None:
+                    reason = '{}: {}'.format(type(e).__name__, e)
+                    failures.append(ParseFailure(index, raw_message, reason))
+                continue
+
+            yield data
+
+
+ParseFailure = collections.namedtuple('ParseFailure',
+                                      ['index', 'raw', 'reason'])
 
 
 class Parser(metaclass=ParserBase):
@@ -112,6 +226,18 @@ class Parser(metaclass=ParserBase):
 
     __default__ = True
 
+    # Resolves the timestamps of all parsers; see TimestampResolver.set_reference
+    # for resolving timestamps of archived messages.
+    timestamp_resolver = timestamps.TimestampResolver()
+
+    # Optional ogn_lib.cache.InternPool used to deduplicate the callsigns,
+    # receiver names and ids of parsed messages (disabled by default)
+    string_pool = None
+
+    # True if the comments contain the third decimal of the position (`!Wxy!`),
+    # which is applied to the position of the parsed message
+    THIRD_DECIMAL = False
+
     # TNC-2 formatted header (p. 84)
     PATTERN_HEADER = re.compile('(?P<source>.{1,9})'
                                 '>(?P<destination>.{1,9}?)'
@@ -140,6 +266,15 @@ class Parser(metaclass=ParserBase):
                              '(/A=(?P<altitude>\d{6}))?'
                              '( (?P<protocol_specific>.*?))?$')
 
+    # Groups of PATTERN_ALL, in the order returned by Parser._match_message
+    PATTERN_FIELDS = ('source', 'destination', 'digipeaters', 'time',
+                      'latitude', 'longitude', 'heading', 'speed', 'altitude',
+                      'protocol_specific')
+
+    # Use Parser._scan_message before falling back to PATTERN_ALL. Classes
+    # which change the layout of PATTERN_ALL should disable the scanner.
+    FAST_SCAN = True
+
     @classmethod
     def parse_message(cls, raw_message):
         """
@@ -153,7 +288,91 @@ class Parser(metaclass=ParserBase):
             using Parser.PATTERN_ALL
         """
 
+        data, protocol_specific = cls._parse_report(raw_message)
+
+        if protocol_specific:
+            cls._merge_protocol_specific(
+                data, cls._parse_protocol_specific(protocol_specific))
+
+        return data
+
+    @classmethod
+    def _parse_report(cls, raw_message):
+        """
+        Parses the header and the position of a raw APRS message.
+
+        :param str raw_message: raw APRS message
+        :return: parsed fields and the unparsed protocol specific comment
+        :rtype: tuple
+        :raises ogn_lib.exceptions.ParseError: if message cannot be parsed
+            using Parser.PATTERN_ALL
+        """
+
         raw_message = cls._preprocess_message(raw_message)
+        (source, destination, digipeaters, time_, latitude, longitude,
+         heading, speed, altitude,
+         protocol_specific) = cls._match_message(raw_message)
+
+        pool = Parser.string_pool
+        if pool is not None:
+            source = pool.intern(source)
+            destination = pool.intern(destination)
+
+        data = {
+            'from': source,
+            'destto': destination,
+            'beacon_type': constants.BeaconType.aircraft_beacon,
+            'timestamp': Parser._parse_timestamp(time_),
+            'latitude': Parser._parse_location(latitude),
+            'longitude': Parser._parse_location(longitude),
+            'altitude': Parser._parse_altitude(altitude),
+            'raw': raw_message
+        }
+        data.update(Parser._parse_digipeaters(digipeaters))
+        data.update(Parser._parse_heading_speed(heading, speed))
+
+        return data, protocol_specific
+
+    @classmethod
+    def _merge_protocol_specific(cls, data, comment_data):
+        """
+        Merges the parsed protocol specific comment into the message data.
+
+        :param dict data: parsed message
+        :param dict comment_data: parsed comment
+        :return: updated message
+        :rtype: dict
+        """
+
+        decimals = comment_data.pop('_third_decimal', None)
+        if decimals is not None:
+            data['latitude'] = Parser._update_location_decimal(
+                data['latitude'], decimals[0])
+            data['longitude'] = Parser._update_location_decimal(
+                data['longitude'], decimals[1])
+
+        data.update(comment_data)
+        return data
+
+    @classmethod
+    def _match_message(cls, raw_message):
+        """
+        Splits the message into the fields described by PATTERN_ALL.
+
+        The positional scanner is tried first (if enabled for the class);
+        the regular expression is only used for messages the scanner rejects.
+
+        :param str raw_message: raw APRS message
+        :return: tuple of matched fields (see Parser.PATTERN_FIELDS)
+        :rtype: tuple
+        :raises ogn_lib.exceptions.ParseError: if message cannot be parsed
+            using Parser.PATTERN_ALL
+        """
+
+        if cls.FAST_SCAN:
+            fields = Parser._scan_message(raw_message)
+            if fields is not None:
+                return fields
 
         match = cls.PATTERN_ALL.match(raw_message)
 
@@ -161,33 +380,71 @@ class Parser(metaclass=ParserBase):
             raise exceptions.ParseError('Message {} did not match {}'
                                         .format(raw_message, cls.PATTERN_ALL))
 
-        data = {
-            'from': match.group('source'),
-            'destto': match.group('destination'),
-            'beacon_type': constants.BeaconType.aircraft_beacon,
-            'timestamp': Parser._parse_timestamp(match.group('time')),
-            'latitude': Parser._parse_location(match.group('latitude')),
-            'longitude': Parser._parse_location(match.group('longitude')),
-            'altitude': Parser._parse_altitude(match.group('altitude'))
-        }
-        data.update(Parser._parse_digipeaters(match.group('digipeaters')))
-        data.update(Parser._parse_heading_speed(match.group('heading'),
-                                                match.group('speed')))
+        return match.group(*Parser.PATTERN_FIELDS)
 
-        protocol_specific = match.group('protocol_specific')
-        if protocol_specific:
-            comment_data = cls._parse_protocol_specific(protocol_specific)
+    @staticmethod
+    def _scan_message(raw_message):
+        """
+        Splits the message into the fields of Parser.PATTERN_ALL without using
+        regular expressions.
 
-            try:
-                cls._update_data(data, comment_data['_update'])
-                del comment_data['_update']
-            except KeyError:
-                logger.debug('comment_data[\'_update\'] not set')
+        Only the fixed TNC-2 header and the `/HHMMSSh DDMM.mmN/DDDMM.mmE`
+        position layout are recognized. Whenever the message deviates from it
+        (or could be matched differently by the pattern), None is returned
+        and the caller should fall back to the regular expression.
 
-            data.update(comment_data)
+        :param str raw_message: raw APRS message
+        :return: tuple of matched fields or None if the message was rejected
+        :rtype: tuple or None
+        """
 
-        data['raw'] = raw_message
-        return data
+        colon = raw_message.find(':')
+        gt = raw_message.find('>', 0, colon)
+        comma = raw_message.find(',', gt + 1, gt + 11)
+
+        # Sources, destinations and digipeaters with additional '>' or ':'
+        # characters might be split differently by the pattern.
+        if (not 0 < gt < 10 or not gt + 1 < comma < colon or
+                colon - comma > 82 or '\n' in raw_message or
+                raw_message.find('>', gt + 1, colon) >= 0 or
+                raw_message.find(':', colon + 1, comma + 83) >= 0):
+            return None
+
+        position = raw_message[colon + 1:colon + 27]
+        if (position[7:8] not in ('z', 'h') or
+                position[15:16] not in ('N', 'S') or
+                position[25:] not in ('E', 'W') or
+                position[0] not in '@/' or
+                position[12] != '.' or position[22] != '.' or
+                not (position[1:7] + position[8:12] + position[13:15] +
+                     position[17:22] + position[23:25]).isdecimal()):
+            return None
+
+        heading = speed = altitude = protocol_specific = None
+        tail = raw_message[colon + 28:]
+
+        if tail:
+            if (tail[3:4] == '/' and len(tail) >= 7 and
+                    tail[:3].isdecimal() and tail[4:7].isdecimal()):
+                heading = tail[:3]
+                speed = tail[4:7]
+                tail = tail[7:]
+
+            if (tail[:3] == '/A=' and len(tail) >= 9 and
+                    tail[3:9].isdecimal()):
+                altitude = tail[3:9]
+                tail = tail[9:]
+
+            if tail:
+                if tail[0] != ' ':
+                    return None
+                protocol_specific = tail[1:]
+        elif len(raw_message) < colon + 28:
+            return None
+
+        return (raw_message[:gt], raw_message[gt + 1:comma],
+                raw_message[comma + 1:colon], position[1:8], position[8:16],
+                position[17:26], heading, speed, altitude, protocol_specific)
 
     @staticmethod
     def _preprocess_message(message):
@@ -201,6 +458,20 @@ class Parser(metaclass=ParserBase):
 
         return message
 
+    @staticmethod
+    def _intern(value):
+        """
+        Returns the shared instance of the string from Parser.string_pool (or
+        the string itself if the pool is not enabled).
+
+        :param str value: string to be interned
+        :return: interned string
+        :rtype: str
+        """
+
+        pool = Parser.string_pool
+        return value if pool is None else pool.intern(value)
+
     @staticmethod
     def _parse_digipeaters(digipeaters):
         """
@@ -223,7 +494,15 @@ class Parser(metaclass=ParserBase):
             raise ValueError('Unknown digipeaters format: {}'
                              .format(digipeaters))
 
-        return {'receiver': fields[-1], 'relayer': relayer}
+        receiver = fields[-1]
+
+        pool = Parser.string_pool
+        if pool is not None:
+            receiver = pool.intern(receiver)
+            if relayer is not None:
+                relayer = pool.intern(relayer)
+
+        return {'receiver': receiver, 'relayer': relayer}
 
     @staticmethod
     def _parse_heading_speed(heading, speed):
@@ -295,38 +574,19 @@ class Parser(metaclass=ParserBase):
         :rtype: datetime.datetime
         """
 
-        ts = time(*map(lambda x: int(x),
-                       map(lambda x: timestamp[x * 2: x * 2 + 2], range(3))))
-        full_ts = datetime.combine(datetime.utcnow(), ts)
-
-        now = datetime.utcnow()
-
-        td = (now - full_ts).total_seconds()
-        if td < -300:
-            full_ts -= TD_1DAY
-
-        return full_ts
+        return Parser.timestamp_resolver.resolve_time(timestamp)
 
     @staticmethod
     def _parse_datetime(timestamp):
         """
-        Parses the HMS formated timestamp string.
+        Parses the DHM formated timestamp string.
 
-        :param timestamp_str: utc timestamp string in %H%M%S
+        :param timestamp_str: utc timestamp string in %d%H%M
         :return: parsed timestamp
         :rtype: datetime.datetime
         """
 
-        ts = list(map(lambda x: int(x),
-                      map(lambda x: timestamp[x * 2: x * 2 + 2], range(3))))
-
-        now = datetime.now()
-        date_ = datetime(now.year, now.month, ts[0])
-        time_ = time(ts[1], ts[2], 0)
-
-        full_ts = datetime.combine(date_, time_)
-
-        return full_ts
+        return Parser.timestamp_resolver.resolve_datetime(timestamp)
 
     @staticmethod
     def _parse_location(location_str):
@@ -362,7 +622,10 @@ class Parser(metaclass=ParserBase):
         :rtype: dict
         """
 
-        logger.warn('Parser._parse_protocol_specific method not overriden')
+        # Reached by every message of an unknown destto (and of parsers
+        # without a comment format), so it is rate-limited
+        message_log.report(logging.WARNING, 'ignored-comment',
+                           'Parser._parse_protocol_specific', comment)
         return {}
 
     @staticmethod
@@ -377,20 +640,6 @@ class Parser(metaclass=ParserBase):
 
         return int(fpm_string[:-3]) * FPM_TO_MS
 
-    @staticmethod
-    def _get_location_update_func(update_with):
-        """
-        Builds a partial function for updating location with 3rd additional
-        decimal.
-
-        :param int update_with: 3rd decimal
-        :return: partial function updating position with 3rd digit
-        :rtype: callable
-        """
-
-        return functools.partial(Parser._update_location_decimal,
-                                 update=update_with)
-
     @staticmethod
     def _update_location_decimal(existing, update):
         """
@@ -408,30 +657,246 @@ class Parser(metaclass=ParserBase):
 
         return existing + delta / 60000
 
-    def _update_data(data, updates):
+    @classmethod
+    def _scan_third_decimal(cls, comment):
+        """
+        Finds the third decimal of the position (`!Wxy!`) in an unparsed
+        comment without parsing the other fields.
+
+        As in the parsed comments, the digits of all fields enclosed in `!`
+        are added up.
+
+        :param str comment: comment string
+        :return: latitude and longitude digits or None if not present, if a
+                 field is malformed or if the class does not use the third
+                 decimal
+        :rtype: tuple or None
+        """
+
+        if not cls.THIRD_DECIMAL or '!' not in comment:
+            return None
+
+        decimals = None
+
+        for field in comment.split(' '):
+            if field[:1] == '!' and field[-1:] == '!':
+                try:
+                    lat, lon = int(field[2]), int(field[3])
+                except (IndexError, ValueError):
+                    return None
+
+                if decimals is None:
+                    decimals = (lat, lon)
+                else:
+                    decimals = (decimals[0] + lat, decimals[1] + lon)
+
+        return decimals
+
+
+class TokenTable:
+    """
+    Dispatch table for the space separated fields of APRS comments.
+
+    Every rule matches fields by a prefix, a suffix or both (for fields
+    enclosed in a character). When several rules match a field, the first
+    one wins. Candidate rules are precomputed for every pair of the first and
+    the last character of a field, so usually only one prefix or suffix has
+    to be compared per field.
+    """
+
+    PREFIX = 'prefix'
+    SUFFIX = 'suffix'
+    ENCLOSED = 'enclosed'
+
+    def __init__(self, rules):
         """
-        Updates the existing data with values described in `updates`.
+        Creates a new TokenTable.
+
+        :param list rules: list of (name, kind, affix, handler) tuples in
+                           order of priority. `kind` is one of
+                           TokenTable.PREFIX, TokenTable.SUFFIX or
+                           TokenTable.ENCLOSED and `handler` is a callable
+                           which accepts the parser class, parsed data and
+                           the field.
+        """
+
+        self.rules = tuple(rules)
+        self.handlers = {name: handler for name, _, _, handler in self.rules}
+        self._candidates = {}
 
-        Updates are a list of dictionaries. Each dictionary should have two
-        keys: `target` that contains the key from `data` which should be
-        updated, and `function` which describes the update function.
+    def select(self, *names):
+        """
+        Creates a new table with a subset of the rules.
+
+        :param names: names of the rules to be kept
+        :return: new table
+        :rtype: ogn_lib.parser.TokenTable
+        """
 
-        :param dict data: existing data
-        :param list updates: list of updates
-        :return: updated data
+        return TokenTable(r for r in self.rules if r[0] in names)
+
+    def handle(self, name, parser, data, field):
+        """
+        Handles the field with the named rule, regardless of its affix.
+
+        :param str name: name of the rule
+        :param parser: parser class
+        :type parser: ogn_lib.parser.ParserBase
+        :param dict data: parsed data
+        :param str field: comment field
+        """
+
+        self.handlers[name](parser, data, field)
+
+    def parse(self, parser, comment):
+        """
+        Parses the comment string.
+
+        :param parser: parser class (passed to the handlers)
+        :type parser: ogn_lib.parser.ParserBase
+        :param str comment: comment string
+        :return: parsed comment
         :rtype: dict
         """
 
-        for update in updates:
+        data = {}
+        candidates = self._candidates
+
+        for field in comment.split(' '):
+            if not field:
+                continue
+
+            key = field[0] + field[-1]
             try:
-                key = update['target']
-                value = data[key]
-                data[key] = update['function'](value)
+                rules = candidates[key]
             except KeyError:
-                logger.error('Key for update %s not found', update['target'])
+                rules = candidates[key] = self._find_candidates(field[0],
+                                                                field[-1])
+
+            for prefix, suffix, handler in rules:
+                if ((prefix is None or field.startswith(prefix)) and
+                        (suffix is None or field.endswith(suffix))):
+                    handler(parser, data, field)
+                    break
 
         return data
 
+    def _find_candidates(self, first, last):
+        """
+        Finds the rules which can match fields starting with `first` and
+        ending with `last`.
+
+        :param str first: first character of the field
+        :param str last: last character of the field
+        :return: tuple of (prefix, suffix, handler) tuples; prefixes and
+                 suffixes are None if they do not need to be checked
+        :rtype: tuple
+        """
+
+        rules = []
+        for _, kind, affix, handler in self.rules:
+            prefix = suffix = None
+
+            if kind in (self.PREFIX, self.ENCLOSED):
+                if not affix.startswith(first):
+                    continue
+                prefix = affix if len(affix) > 1 else None
+
+            if kind in (self.SUFFIX, self.ENCLOSED):
+                if not affix.endswith(last):
+                    continue
+                suffix = affix if len(affix) > 1 else None
+
+            rules.append((prefix, suffix, handler))
+
+        return tuple(rules)
+
+
+def _parse_third_decimal(parser, data, field):  # !Wxy!
+    lat, lon = data.get('_third_decimal', (0, 0))
+    data['_third_decimal'] = (lat + int(field[2]), lon + int(field[3]))
+
+
+def _parse_id(parser, data, field):  # idXXXXXXXX
+    data.update(parser._parse_id_string(field[2:]))
+
+
+def _parse_vertical_speed(parser, data, field):  # +123fpm
+    data['vertical_speed'] = int(field[:-3]) * FPM_TO_MS
+
+
+def _parse_turn_rate(parser, data, field):  # -1.1rot
+    data['turn_rate'] = float(field[:-3]) * HPM_TO_DEGS
+
+
+def _parse_flight_level(parser, data, field):  # FL000.00
+    data['flight_level'] = float(field[2:])
+
+
+def _parse_signal_to_noise_ratio(parser, data, field):  # 8.8dB
+    data['signal_to_noise_ratio'] = float(field[:-2])
+
+
+def _parse_error_count(parser, data, field):  # 0e
+    data['error_count'] = int(field[:-1])
+
+
+def _parse_frequency_offset(parser, data, field):  # +51.2kHz
+    data['frequency_offset'] = float(field[:-3])
+
+
+def _parse_gps_quality(parser, data, field):  # gps4x5
+    x_idx = field.find('x')
+    data['gps_quality'] = {
+        'vertical': int(field[x_idx + 1:]),
+        'horizontal': int(field[3:x_idx])
+    }
+
+
+def _parse_flarm_software(parser, data, field):  # s6.09
+    data['flarm_software'] = field[1:]
+
+
+def _parse_flarm_id(parser, data, field):  # rDF0267
+    data['flarm_id'] = field[1:]
+
+
+def _parse_power_ratio(parser, data, field):  # +14.3dBm
+    data['power_ratio'] = float(field[:-3])
+
+
+def _parse_other_devices(parser, data, field):  # hearD7EA
+    try:
+        data['other_devices'].append(field[4:])
+    except KeyError:
+        data['other_devices'] = [field[4:]]
+
+
+def _parse_flarm_hardware(parser, data, field):  # h02
+    data['flarm_hardware'] = int(field[1:], 16)
+
+
+# Fields of the OGN-flavoured APRS comments. The third decimal of the position
+# is returned as the `_third_decimal` tuple which is applied to the position by
+# Parser._merge_protocol_specific.
+COMMENT_TOKENS = TokenTable([
+    ('third_decimal', TokenTable.ENCLOSED, '!', _parse_third_decimal),
+    ('id', TokenTable.PREFIX, 'id', _parse_id),
+    ('vertical_speed', TokenTable.SUFFIX, 'fpm', _parse_vertical_speed),
+    ('turn_rate', TokenTable.SUFFIX, 'rot', _parse_turn_rate),
+    ('flight_level', TokenTable.PREFIX, 'FL', _parse_flight_level),
+    ('signal_to_noise_ratio', TokenTable.SUFFIX, 'dB',
+     _parse_signal_to_noise_ratio),
+    ('error_count', TokenTable.SUFFIX, 'e', _parse_error_count),
+    ('frequency_offset', TokenTable.SUFFIX, 'kHz', _parse_frequency_offset),
+    ('gps_quality', TokenTable.PREFIX, 'gps', _parse_gps_quality),
+    ('flarm_software', TokenTable.PREFIX, 's', _parse_flarm_software),
+    ('flarm_id', TokenTable.PREFIX, 'r', _parse_flarm_id),
+    ('power_ratio', TokenTable.SUFFIX, 'dBm', _parse_power_ratio),
+    ('other_devices', TokenTable.PREFIX, 'hear', _parse_other_devices),
+    ('flarm_hardware', TokenTable.PREFIX, 'h', _parse_flarm_hardware)
+])
+
 
 class APRS(Parser):
     """
@@ -440,6 +905,9 @@ class APRS(Parser):
 
     __destto__ = ['APRS', 'OGFLR', 'OGNTRK']
 
+    TOKENS = COMMENT_TOKENS
+    THIRD_DECIMAL = True
+
     FLAGS_STEALTH = 1 << 7
     FLAGS_DO_NOT_TRACK = 1 << 6
     FLAGS_AIRCRAFT_TYPE = 0b1111 << 2
@@ -455,75 +923,50 @@ class APRS(Parser):
         :rtype: dict
         """
 
-        data = {}
-        fields = comment.split(' ')
-        for field in fields:
-            if field.startswith('!') and field.endswith('!'):  # 3rd decimal
-                lat_dig = int(field[2])
-                lon_dig = int(field[3])
-                update_position = [
-                    {
-                        'target': 'latitude',
-                        'function': Parser._get_location_update_func(lat_dig)
-                    }, {
-                        'target': 'longitude',
-                        'function': Parser._get_location_update_func(lon_dig)
-                    }
-                ]
-                try:
-                    for u in update_position:
-                        data['_update'].append(u)
-                except KeyError:
-                    data['_update'] = update_position
-            elif field.startswith('id'):
-                data.update(APRS._parse_id_string(field[2:]))
-            elif field.endswith('fpm'):  # vertical speed
-                data['vertical_speed'] = Parser._convert_fpm_to_ms(field)
-            elif field.endswith('rot'):  # turn rate
-                data['turn_rate'] = float(field[:-3]) * HPM_TO_DEGS
-            elif field.startswith('FL'):  # (optional) flight level
-                data['flight_level'] = float(field[2:])
-            elif field.endswith('dB'):  # signal to noise ratio
-                data['signal_to_noise_ratio'] = float(field[:-2])
-            elif field.endswith('e'):  # error count
-                data['error_count'] = int(field[:-1])
-            elif field.endswith('kHz'):  # frequency offset
-                data['frequency_offset'] = float(field[:-3])
-            elif field.startswith('gps'):  # (optional) gps quality
-                x_idx = field.find('x')
-                data['gps_quality'] = {
-                    'vertical': int(field[x_idx + 1:]),
-                    'horizontal': int(field[3:x_idx])
-                }
-            elif field.startswith('s'):  # (optional) flarm software version
-                data['flarm_software'] = field[1:]
-            elif field.startswith('r'):  # (optional) flarm id
-                data['flarm_id'] = field[1:]
-            elif field.endswith('dBm'):  # (optional) power ratio
-                data['power_ratio'] = float(field[:-3])
-            elif field.startswith('hear'):  # (optional) other devices heard
-                try:
-                    data['other_devices'].append(field[4:])
-                except KeyError:
-                    data['other_devices'] = [field[4:]]
-            elif field.startswith('h'):  # (optional) flarm hardware version
-                data['flarm_hardware'] = int(field[1:], 16)
+        return APRS.TOKENS.parse(APRS, comment)
 
-        return data
+    # Decoded identities of recently seen devices, keyed by the id string
+    id_cache = cache.LRUCache()
 
     @staticmethod
     def _parse_id_string(id_string):
         """
         Parses the information encoded in the id string.
 
+        Parsed ids are cached in APRS.id_cache; the returned mapping is
+        shared and must not be modified.
+
         :param str id_string: unique identification string
         :return: parsed information
+        :rtype: types.MappingProxyType
+        """
+
+        identity = APRS.id_cache.get(id_string)
+
+        if identity is None:
+            flags = APRS.FLAG_TABLE[int(id_string[:2], 16)]
+            if flags is None:
+                raise ValueError('Invalid flags in id string: {}'
+                                 .format(id_string))
+
+            identity = types.MappingProxyType(
+                dict(flags, uid=Parser._intern(id_string)))
+            APRS.id_cache.put(id_string, identity)
+
+        return identity
+
+    @staticmethod
+    def _decode_flags(flags):
+        """
+        Decodes the flag byte of the id string.
+
+        :param int flags: flag byte
+        :return: decoded flags
         :rtype: dict
+        :raises ValueError: if the aircraft or address type is not known
         """
 
-        flags = int(id_string[:2], 16)
         return {
-            'uid': id_string,
             'stealth': bool(flags & APRS.FLAGS_STEALTH),
             'do_not_track': bool(flags & APRS.FLAGS_DO_NOT_TRACK),
             'aircraft_type': constants.AirplaneType(
@@ -532,6 +975,29 @@ class APRS(Parser):
         }
 
 
+def _build_flag_table(decode, size):
+    """
+    Decodes all possible values of the flags.
+
+    :param callable decode: function decoding a single value
+    :param int size: number of possible values
+    :return: decoded flags (None for invalid values), indexed by value
+    :rtype: tuple
+    """
+
+    table = []
+    for flags in range(size):
+        try:
+            table.append(decode(flags))
+        except ValueError:
+            table.append(None)
+
+    return tuple(table)
+
+
+APRS.FLAG_TABLE = _build_flag_table(APRS._decode_flags, 256)
+
+
 class Naviter(Parser):
     """
     Parser for the Naviter-formatted APRS messages.
@@ -539,6 +1005,10 @@ class Naviter(Parser):
 
     __destto__ = ['OGNAVI', 'OGNAVI-1']
 
+    TOKENS = COMMENT_TOKENS.select('third_decimal', 'id', 'vertical_speed',
+                                   'turn_rate')
+    THIRD_DECIMAL = True
+
     FLAGS_STEALTH = 1 << 15
     FLAGS_DO_NOT_TRACK = 1 << 14
     FLAGS_AIRCRAFT_TYPE = 0b1111 << 10
@@ -554,34 +1024,10 @@ class Naviter(Parser):
         :rtype: dict
         """
 
-        data = {}
-        fields = comment.split(' ')
-        for field in fields:
-            if field.startswith('!') and field.endswith('!'):  # 3rd decimal
-                lat_dig = int(field[2])
-                lon_dig = int(field[3])
-                update_position = [
-                    {
-                        'target': 'latitude',
-                        'function': Parser._get_location_update_func(lat_dig)
-                    }, {
-                        'target': 'longitude',
-                        'function': Parser._get_location_update_func(lon_dig)
-                    }
-                ]
-                try:
-                    for u in update_position:
-                        data['_update'].append(u)
-                except KeyError:
-                    data['_update'] = update_position
-            elif field.startswith('id'):
-                data.update(Naviter._parse_id_string(field[2:]))
-            elif field.endswith('fpm'):  # vertical speed
-                data['vertical_speed'] = Parser._convert_fpm_to_ms(field)
-            elif field.endswith('rot'):  # turn rate
-                data['turn_rate'] = float(field[:-3]) * HPM_TO_DEGS
+        return Naviter.TOKENS.parse(Naviter, comment)
 
-        return data
+    # Decoded identities of recently seen devices, keyed by the id string
+    id_cache = cache.LRUCache()
 
     @staticmethod
     def _parse_id_string(id_string):
@@ -589,20 +1035,26 @@ class Naviter(Parser):
         Parses the information encoded in the id string.
 
         :param str id_string: unique identification string
-        :return: parsed information
-        :rtype: dict
+        :return: parsed information (shared, see APRS._parse_id_string)
+        :rtype: types.MappingProxyType
         """
 
-        flags = int(id_string[:4], 16)
-        return {
-            'uid': id_string,
-            'stealth': bool(flags & Naviter.FLAGS_STEALTH),
-            'do_not_track': bool(flags & Naviter.FLAGS_DO_NOT_TRACK),
-            'aircraft_type': constants.AirplaneType(
-                (flags & Naviter.FLAGS_AIRCRAFT_TYPE) >> 10),
-            'address_type': constants.AddressType(
-                (flags & Naviter.FLAGS_ADDRESS_TYPE) >> 4)
-        }
+        identity = Naviter.id_cache.get(id_string)
+
+        if identity is None:
+            flags = int(id_string[:4], 16)
+            identity = types.MappingProxyType({
+                'uid': Parser._intern(id_string),
+                'stealth': bool(flags & Naviter.FLAGS_STEALTH),
+                'do_not_track': bool(flags & Naviter.FLAGS_DO_NOT_TRACK),
+                'aircraft_type': constants.AirplaneType(
+                    (flags & Naviter.FLAGS_AIRCRAFT_TYPE) >> 10),
+                'address_type': constants.AddressType(
+                    (flags & Naviter.FLAGS_ADDRESS_TYPE) >> 4)
+            })
+            Naviter.id_cache.put(id_string, identity)
+
+        return identity
 
 
 class ServerParser(Parser):
@@ -623,6 +1075,8 @@ class ServerParser(Parser):
                              '(/A=(?P<altitude>\d{6}))?)?'
                              '( (?P<protocol_specific>.*?))?$')
 
+    FAST_SCAN = False
+
     @classmethod
     def parse_message(cls, raw_message):
         """
@@ -787,6 +1241,8 @@ class Fanet(Parser):
 
     __destto__ = ['OGNFNT', 'OGNFNT-1']
 
+    THIRD_DECIMAL = True
+
     @staticmethod
     def _parse_protocol_specific(comment):
         """
@@ -802,20 +1258,165 @@ class Fanet(Parser):
             raise exceptions.ParseError('Fanet comment incorrectly formatted:'
                                         ' received {}'.format(comment))
 
-        lat_dig = int(fields[0][2])
-        lon_dig = int(fields[0][3])
-        update_position = [
-            {
-                'target': 'latitude',
-                'function': Parser._get_location_update_func(lat_dig)
-            }, {
-                'target': 'longitude',
-                'function': Parser._get_location_update_func(lon_dig)
-            }
-        ]
+        data = {'id': fields[1]}
+        COMMENT_TOKENS.handle('third_decimal', Fanet, data, fields[0])
+        COMMENT_TOKENS.handle('vertical_speed', Fanet, data, fields[2])
 
-        return {
-            '_update': update_position,
-            'id': fields[1],
-            'vertical_speed': Parser._convert_fpm_to_ms(fields[2])
-        }
+        return data
+
+
+class ProjectedParser:
+    """
+    Parser which only returns a subset of the fields of parsed messages.
+
+    The work needed for fields which were not requested is skipped: e.g. a
+    parser for `{'from', 'timestamp', 'latitude', 'longitude'}` does not
+    split the digipeaters, convert heading and speed or tokenize the
+    protocol specific comment (the third decimal of the position is found
+    with a single scan of the comment).
+
+    Returned dictionaries contain the requested fields with the same values
+    as Parser.parse_message would return; fields which are not present in
+    the message are omitted, as they would be in the full result.
+
+    The header, the position and the timestamp are always validated, but the
+    protocol specific comment is only parsed when one of its fields is
+    requested. Messages with a malformed comment are therefore rejected by
+    Parser and accepted by a projection without comment fields.
+    """
+
+    # Fields which are parsed from the header and the position
+    REPORT_FIELDS = frozenset(['from', 'destto', 'beacon_type', 'timestamp',
+                               'latitude', 'longitude', 'altitude', 'raw',
+                               'receiver', 'relayer', 'heading',
+                               'ground_speed'])
+
+    def __init__(self, fields):
+        """
+        Creates a new ProjectedParser.
+
+        :param fields: keys of the parsed messages which should be returned
+        :type fields: iterable
+        """
+
+        self.fields = fields = frozenset(fields)
+        self._position = bool(fields & {'latitude', 'longitude'})
+        self._digipeaters = bool(fields & {'receiver', 'relayer'})
+        self._heading_speed = bool(fields & {'heading', 'ground_speed'})
+        self._comment_fields = fields - self.REPORT_FIELDS
+
+    def __call__(self, raw_message):
+        """
+        Parses the requested fields of a raw APRS message.
+
+        :param str raw_message: raw APRS message
+        :return: parsed fields
+        :rtype: dict
+        :raises ogn_lib.exceptions.ParserNotFoundError: if parser for this
+            message's callsign was not found
+        :raises ogn_lib.exceptions.ParseError: if message cannot be parsed
+        """
+
+        try:
+            return self._parse(ParserBase.find_parser(raw_message), raw_message)
+        except exceptions.ParserNotFoundError:
+            raise
+        except Exception as e:
+            raise exceptions.ParseError('Failed to parse message: {}'
+                                        .format(raw_message)) from e
+
+    def parse_many(self, raw_messages, failures=None, prefilter=None):
+        """
+        Parses the requested fields of an iterable of raw APRS messages (see
+        ParserBase.parse_many).
+
+        :param raw_messages: raw APRS messages
+        :type raw_messages: iterable
+        :param failures: optional list collecting the parse failures
+        :type failures: list or None
+        :param prefilter: optional filter of the raw messages (see
+                          ogn_lib.filters); rejected messages are skipped
+        :type prefilter: callable or None
+        :return: generator of parsed messages
+        :rtype: generator
+        """
+
+        return ParserBase._parse_each(raw_messages, failures, self._parse,
+                                      prefilter)
+
+    def _parse(self, class_, raw_message):
+        """
+        Parses the requested fields using the given parser class.
+
+        :param class_: parser for the message
+        :type class_: ogn_lib.parser.ParserBase
+        :param str raw_message: raw APRS message
+        :return: parsed fields
+        :rtype: dict
+        """
+
+        raw_message = class_._preprocess_message(raw_message)
+        (source, destination, digipeaters, time_, latitude, longitude,
+         heading, speed, altitude, comment) = class_._match_message(raw_message)
+
+        fields = self.fields
+        data = {}
+
+        if 'from' in fields:
+            data['from'] = Parser._intern(source)
+        if 'destto' in fields:
+            data['destto'] = Parser._intern(destination)
+        if 'raw' in fields:
+            data['raw'] = raw_message
+
+        # Resolved even if not requested so invalid times are rejected (the
+        # resolver memoizes the timestamps, so this is cheap)
+        timestamp = Parser._parse_timestamp(time_)
+        if 'timestamp' in fields:
+            data['timestamp'] = timestamp
+        if 'altitude' in fields:
+            data['altitude'] = Parser._parse_altitude(altitude)
+
+        if 'beacon_type' in fields:
+            if not issubclass(class_, ServerParser):
+                data['beacon_type'] = constants.BeaconType.aircraft_beacon
+            elif comment:
+                data['beacon_type'] = constants.BeaconType.server_status
+            else:
+                data['beacon_type'] = constants.BeaconType.server_beacon
+
+        if self._digipeaters:
+            for key, value in Parser._parse_digipeaters(digipeaters).items():
+                if key in fields:
+                    data[key] = value
+
+        if self._heading_speed:
+            for key, value in Parser._parse_heading_speed(heading,
+                                                          speed).items():
+                if key in fields:
+                    data[key] = value
+
+        decimals = None
+        if comment and self._comment_fields:
+            comment_data = class_._parse_protocol_specific(comment)
+            decimals = comment_data.pop('_third_decimal', None)
+
+            for key in self._comment_fields:
+                if key in comment_data:
+                    data[key] = comment_data[key]
+        elif comment and self._position:
+            decimals = class_._scan_third_decimal(comment)
+
+        if 'latitude' in fields:
+            data['latitude'] = Parser._parse_location(latitude)
+            if decimals is not None and data['latitude'] is not None:
+                data['latitude'] = Parser._update_location_decimal(
+                    data['latitude'], decimals[0])
+
+        if 'longitude' in fields:
+            data['longitude'] = Parser._parse_location(longitude)
+            if decimals is not None and data['longitude'] is not None:
+                data['longitude'] = Parser._update_location_decimal(
+                    data['longitude'], decimals[1])
+
+        return data
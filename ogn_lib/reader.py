@@ -0,0 +1,134 @@
+"""
+ogn_lib.reader
+--------------
+
+This module contains a bytes-level reader of the lines received from a
+socket.
+"""
+
+
+class LineReader:
+    """
+    Reads lines from a socket in bulk.
+
+    Data is received with `socket.recv_into` into a reusable buffer and all
+    complete lines in the buffer are split at once. Lines are returned as
+    bytes (without the line endings), so they can be filtered before they are
+    decoded. The buffer grows if a single line does not fit into it.
+
+    LineReader.readline and LineReader.close mirror the file object returned
+    by `socket.makefile`, so the reader can also be used to read the
+    messages one by one. Unlike that file object, the reader can still be
+    read after a socket timeout; partially received lines are kept.
+    """
+
+    def __init__(self, sock, buffer_size=65536):
+        """
+        Creates a new LineReader.
+
+        :param socket.socket sock: connected socket
+        :param int buffer_size: initial size of the receive buffer in bytes
+        """
+
+        self._sock = sock
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._start = 0  # start of the unread data
+        self._end = 0  # end of the received data
+
+    def read_lines(self):
+        """
+        Returns the complete lines in the buffer, receiving data from the
+        socket if there are none.
+
+        At most one `recv_into` call is made, so the returned list may be
+        empty if only a part of a line was received. Empty lines are
+        included.
+
+        :return: list of lines (bytes) or None if the connection was closed
+        :rtype: list or None
+        """
+
+        buffer = self._buffer
+        last = buffer.rfind(b'\n', self._start, self._end)
+
+        if last < 0:
+            if not self._recv():
+                return None
+            last = buffer.rfind(b'\n', self._start, self._end)
+            if last < 0:
+                return []
+
+        lines = self._view[self._start:last].tobytes().splitlines()
+        self._consume(last + 1)
+        return lines
+
+    def readline(self):
+        """
+        Reads a single line.
+
+        :return: decoded line including the line ending or an empty string if
+                 the connection was closed
+        :rtype: str
+        """
+
+        while True:
+            end = self._buffer.find(b'\n', self._start, self._end)
+            if end >= 0:
+                line = self._view[self._start:end + 1].tobytes()
+                self._consume(end + 1)
+                return line.decode(errors='replace')
+
+            if not self._recv():
+                return ''
+
+    def close(self):
+        """
+        Releases the buffer. The socket is not closed.
+        """
+
+        self._view.release()
+        self._buffer = bytearray()
+        self._view = memoryview(self._buffer)
+        self._start = self._end = 0
+
+    def _recv(self):
+        """
+        Receives data from the socket into the free part of the buffer,
+        moving the unread data to the start of the buffer or growing the
+        buffer first if necessary.
+
+        :return: number of received bytes (0 if the connection was closed)
+        :rtype: int
+        """
+
+        if self._end == len(self._buffer):
+            unread = self._end - self._start
+
+            if self._start == 0:
+                buffer = bytearray(2 * len(self._buffer))
+                buffer[:unread] = self._buffer
+                self._view.release()
+                self._buffer = buffer
+                self._view = memoryview(buffer)
+            else:
+                self._view[:unread] = self._buffer[self._start:self._end]
+
+            self._start = 0
+            self._end = unread
+
+        received = self._sock.recv_into(self._view[self._end:])
+        self._end += received
+        return received
+
+    def _consume(self, position):
+        """
+        Marks the data before the position as read.
+
+        :param int position: end of the read data
+        """
+
+        if position == self._end:
+            self._start = self._end = 0
+        else:
+            self._start = position
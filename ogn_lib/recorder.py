@@ -0,0 +1,250 @@
+"""
+ogn_lib.recorder
+----------------
+
+This module contains a recorder which archives the raw APRS messages to
+rotating (optionally compressed) files.
+
+Every line of a recording contains the receive time (seconds since the unix
+epoch) and the raw message, separated by a space:
+
+    1514808000.123 FLRDDA5BA>APRS,qAS,LFMX:/165829h4415.41N/00600.03E...
+"""
+
+import collections
+import gzip
+import logging
+import lzma
+import os
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION = {
+    None: (open, ''),
+    'gzip': (gzip.open, '.gz'),
+    'lzma': (lzma.open, '.xz')
+}
+
+
+class Recorder:
+    """
+    Writes the raw APRS messages to rotating files.
+
+    The recorder can be used as the callback of OgnClient.receive (without a
+    parser) or assigned to OgnClient.recorder, which records every received
+    message (before prefiltering) regardless of the callback.
+
+    Recording a message only appends it (with the receive time) to an
+    in-memory queue; formatting, compression and writing are done by a
+    background thread, which writes the queued messages in bulk every
+    `flush_interval` seconds. If more than `max_pending` messages are
+    waiting, new messages are dropped and counted in Recorder.dropped.
+
+    If a file cannot be opened or written, the messages which were not
+    written are queued again and written to a new file on the next attempt;
+    messages which are still queued when the recorder is closed are counted
+    as dropped.
+
+    A new file is started every hour (by the receive time, UTC) if `hourly`
+    is True and when the current file exceeds `max_bytes` (uncompressed).
+    """
+
+    def __init__(self, directory, prefix='ogn', compression=None, hourly=True,
+                 max_bytes=None, flush_interval=0.5, max_pending=1000000):
+        """
+        Creates a new Recorder and starts the writer thread.
+
+        :param str directory: directory of the recordings
+        :param str prefix: prefix of the file names
+        :param compression: None, `gzip` or `lzma`
+        :type compression: str or None
+        :param bool hourly: True if a new file should be started every hour
+        :param max_bytes: maximum size of a file in bytes (uncompressed)
+        :type max_bytes: int or None
+        :param float flush_interval: seconds between two writes
+        :param int max_pending: maximum number of queued messages
+        :raises ValueError: if the compression is not known
+        """
+
+        if compression not in COMPRESSION:
+            raise ValueError('Unknown compression: {}'.format(compression))
+
+        self.directory = directory
+        self.prefix = prefix
+        self.compression = compression
+        self.hourly = hourly
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.recorded = 0
+        self.dropped = 0
+        self.files = []
+
+        self._pending = collections.deque()
+        self._file = None
+        self._hour = None
+        self._size = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run,
+                                        name='Recorder-writer', daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __call__(self, raw_message):
+        """
+        Records the message.
+
+        :param raw_message: raw APRS message
+        :type raw_message: str or bytes
+        """
+
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+
+        self._pending.append((time.time(), raw_message))
+
+    def close(self):
+        """
+        Writes the queued messages, stops the writer thread and closes the
+        current file.
+        """
+
+        if not self._stop.is_set():
+            self._stop.set()
+            self._thread.join()
+
+    def _run(self):
+        """
+        Main loop of the writer thread.
+        """
+
+        while True:
+            stopping = self._stop.wait(self.flush_interval)
+
+            try:
+                self._write_pending()
+            except Exception:
+                logger.exception('Failed to write the recording; %d messages '
+                                 'will be retried', len(self._pending))
+
+            if stopping:
+                break
+
+        if self._pending:
+            logger.error('%d messages were not recorded', len(self._pending))
+            self.dropped += len(self._pending)
+            self._pending.clear()
+
+        self._close_file()
+
+    def _write_pending(self):
+        """
+        Writes the queued messages, rotating the files when necessary.
+        """
+
+        pending = self._pending
+        messages = []  # queued messages of the chunk
+        chunk = []
+
+        try:
+            while pending:
+                message = pending.popleft()
+                messages.append(message)
+
+                received, line = message
+                if isinstance(line, str):
+                    line = line.encode()
+                line = '{:.3f} '.format(received).encode() + line + b'\n'
+
+                if self._needs_rotation(received, len(line)):
+                    self._write(chunk)
+                    self.recorded += len(chunk)
+                    del messages[:-1]
+                    chunk = []
+                    self._rotate(received)
+
+                chunk.append(line)
+                self._size += len(line)
+
+            self._write(chunk)
+            self.recorded += len(chunk)
+        except Exception:
+            # The messages are retried in a new file
+            pending.extendleft(reversed(messages))
+            self._close_file()
+            raise
+
+    def _needs_rotation(self, received, size):
+        """
+        Checks whether the line should be written to a new file.
+
+        :param float received: receive time of the line
+        :param int size: size of the line in bytes
+        :return: True if a new file should be started
+        :rtype: bool
+        """
+
+        if self._file is None:
+            return True
+        if self.hourly and int(received // 3600) != self._hour:
+            return True
+        return (self.max_bytes is not None and self._size > 0 and
+                self._size + size > self.max_bytes)
+
+    def _rotate(self, received):
+        """
+        Closes the current file and opens a new one.
+
+        :param float received: receive time of the first line of the file
+        """
+
+        self._close_file()
+
+        open_, extension = COMPRESSION[self.compression]
+        name = '{}-{}'.format(self.prefix,
+                              time.strftime('%Y%m%d-%H%M%S',
+                                            time.gmtime(received)))
+        path = os.path.join(self.directory, name + '.log' + extension)
+
+        counter = 1
+        while os.path.exists(path):
+            path = os.path.join(self.directory, '{}-{}.log{}'.format(
+                name, counter, extension))
+            counter += 1
+
+        logger.info('Recording to %s', path)
+        self._file = open_(path, 'wb')
+        self._hour = int(received // 3600)
+        self._size = 0
+        self.files.append(path)
+
+    def _close_file(self):
+        """
+        Closes the current file.
+        """
+
+        file_, self._file = self._file, None
+        if file_ is not None:
+            try:
+                file_.close()
+            except Exception:
+                logger.exception('Failed to close the recording')
+
+    def _write(self, chunk):
+        """
+        Writes the lines to the current file.
+
+        :param list chunk: encoded lines
+        """
+
+        if chunk:
+            self._file.write(b''.join(chunk))
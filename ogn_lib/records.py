@@ -0,0 +1,457 @@
+"""
+ogn_lib.records
+---------------
+
+This module contains compact record types for parsed beacons.
+
+Records store the values of parsed messages in `__slots__` instead of a
+per-message dictionary, but implement the (read-only) mapping interface so
+they can be used in place of the dictionaries returned by the parsers.
+
+Records are built from the dictionaries returned by the parsers, so they
+reduce the memory retained by stored messages, not the allocations made while
+parsing (LazyParser also defers the parsing of the comments).
+"""
+
+import collections
+import collections.abc
+
+from ogn_lib import constants, exceptions, parser
+
+
+_MISSING = object()
+
+GpsQuality = collections.namedtuple('GpsQuality', ['horizontal', 'vertical'])
+
+
+class Beacon(collections.abc.Mapping):
+    """
+    Base class for all beacon records.
+
+    Values are accessible both as attributes (`beacon.latitude`) and as
+    items (`beacon['latitude']`). Fields which were not present in the parsed
+    message are not set; accessing them as items raises a KeyError, just as
+    it would with dictionaries. Keys which do not have a slot in the record
+    type are kept in a dictionary.
+    """
+
+    __slots__ = ('from_', 'destto', 'beacon_type', 'timestamp', 'latitude',
+                 'longitude', 'altitude', 'receiver', 'relayer', 'heading',
+                 'ground_speed', 'raw', '_extra')
+
+    # Keys which cannot be used as attribute names
+    RENAMED = {'from': 'from_'}
+
+    def __init__(self, **kwargs):
+        """
+        Creates a new record.
+
+        :param kwargs: values of the record, using the same keys as the
+                       dictionaries returned by the parsers
+        """
+
+        self._extra = None
+        self._set_values(kwargs)
+
+    @classmethod
+    def from_dict(cls, data, keep_raw=True):
+        """
+        Creates a new record from a parsed message.
+
+        The record type is selected by the `beacon_type` of the message.
+
+        :param dict data: parsed message
+        :param bool keep_raw: False if the raw message should be dropped
+        :return: record with the values of the parsed message
+        :rtype: ogn_lib.records.Beacon
+        """
+
+        class_ = RECORD_TYPES.get(data.get('beacon_type'), cls)
+
+        if not keep_raw:
+            data = dict(data)
+            data.pop('raw', None)
+
+        return class_(**data)
+
+    def _set_values(self, values):
+        """
+        Stores the values of a parsed message in the record.
+
+        :param dict values: values to be stored
+        """
+
+        attrs = self._attrs()
+        for key, value in values.items():
+            attr = attrs.get(key)
+            if attr:
+                if attr == 'gps_quality':
+                    value = GpsQuality(value['horizontal'], value['vertical'])
+                setattr(self, attr, value)
+            elif self._extra is None:
+                self._extra = {key: value}
+            else:
+                self._extra[key] = value
+
+    @classmethod
+    def _attrs(cls):
+        """
+        Returns a mapping between the keys and the slots of the record type.
+
+        :return: dictionary mapping keys to slot names
+        :rtype: dict
+        """
+
+        try:
+            return cls.__dict__['_ATTRS']
+        except KeyError:
+            slots = []
+            for class_ in reversed(cls.__mro__):
+                slots.extend(s for s in class_.__dict__.get('__slots__', ())
+                             if not s.startswith('_'))
+
+            renamed = {v: k for k, v in cls.RENAMED.items()}
+            cls._ATTRS = {renamed.get(s, s): s for s in slots}
+            return cls._ATTRS
+
+    def __getitem__(self, key):
+        attr = self._attrs().get(key)
+
+        if attr:
+            value = getattr(self, attr, _MISSING)
+        elif self._extra is not None:
+            value = self._extra.get(key, _MISSING)
+        else:
+            value = _MISSING
+
+        if value is _MISSING:
+            raise KeyError(key)
+        elif isinstance(value, GpsQuality):
+            return {'horizontal': value.horizontal,
+                    'vertical': value.vertical}
+
+        return value
+
+    def __iter__(self):
+        for key, attr in self._attrs().items():
+            if getattr(self, attr, _MISSING) is not _MISSING:
+                yield key
+
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, dict(self.items()))
+
+    def to_dict(self):
+        """
+        Converts the record to a dictionary in the format returned by the
+        parsers.
+
+        :return: record values
+        :rtype: dict
+        """
+
+        return dict(self.items())
+
+
+class AircraftBeacon(Beacon):
+    """
+    Record of an aircraft beacon.
+    """
+
+    __slots__ = ('uid', 'stealth', 'do_not_track', 'aircraft_type',
+                 'address_type', 'vertical_speed', 'turn_rate', 'flight_level',
+                 'signal_to_noise_ratio', 'error_count', 'frequency_offset',
+                 'gps_quality', 'flarm_software', 'flarm_id', 'power_ratio',
+                 'other_devices', 'flarm_hardware', 'id', 'model', 'status',
+                 'signal_strength', 'spider_id', 'gps_status', 'source')
+
+
+class ServerBeacon(Beacon):
+    """
+    Record of a server beacon.
+    """
+
+    __slots__ = ()
+
+
+class ServerStatus(Beacon):
+    """
+    Record of a server status message.
+    """
+
+    __slots__ = ('comment',)
+
+
+class LazyAircraftBeacon(AircraftBeacon):
+    """
+    Record of an aircraft beacon with a deferred protocol specific comment.
+
+    Header and position fields are parsed when the record is created; the
+    comment is parsed on the first access to any other field.
+
+    The third decimal of the position (`!Wxy!`) is applied when the record is
+    created so the position is always complete.
+    """
+
+    __slots__ = ('_comment', '_parser', '_position_updated')
+
+    HEADER_KEYS = dict(Beacon._attrs())
+
+    def __init__(self, data, comment, parser_class):
+        """
+        Creates a new LazyAircraftBeacon.
+
+        :param dict data: parsed header and position
+        :param comment: unparsed protocol specific comment
+        :type comment: str or None
+        :param parser_class: parser used to parse the comment
+        :type parser_class: ogn_lib.parser.ParserBase
+        """
+
+        self._extra = None
+
+        # Header fields are assigned directly; Beacon._set_values is only
+        # needed for unexpected keys.
+        attrs = self.HEADER_KEYS
+        for key, value in data.items():
+            attr = attrs.get(key)
+            if attr:
+                setattr(self, attr, value)
+            else:
+                self._set_values({key: value})
+
+        self._comment = comment or None
+        self._parser = parser_class
+        self._position_updated = bool(comment) and self._update_position()
+
+    def _update_position(self):
+        """
+        Applies the third position decimal from the unparsed comment.
+
+        :return: True if the position was updated
+        :rtype: bool
+        """
+
+        decimals = self._parser._scan_third_decimal(self._comment)
+        if decimals is None:
+            return False
+
+        self.latitude = parser.Parser._update_location_decimal(
+            self.latitude, decimals[0])
+        self.longitude = parser.Parser._update_location_decimal(
+            self.longitude, decimals[1])
+        return True
+
+    def _materialize(self):
+        """
+        Parses the deferred comment and stores its values in the record.
+
+        :raises ogn_lib.exceptions.ParseError: if the comment could not be
+            parsed
+        """
+
+        comment = self._comment
+
+        try:
+            comment_data = self._parser._parse_protocol_specific(comment)
+        except exceptions.ParseError:
+            raise
+        except Exception as e:
+            raise exceptions.ParseError('Failed to parse comment: {} ({})'
+                                        .format(comment, e))
+
+        # Cleared only after a successful parse, so the error is raised again
+        # on the next access
+        self._comment = None
+
+        decimals = comment_data.pop('_third_decimal', None)
+        if decimals is not None and not self._position_updated:
+            self.latitude = parser.Parser._update_location_decimal(
+                self.latitude, decimals[0])
+            self.longitude = parser.Parser._update_location_decimal(
+                self.longitude, decimals[1])
+
+        self._set_values(comment_data)
+
+    @property
+    def is_materialized(self):
+        """
+        True if the protocol specific comment was already parsed.
+        """
+
+        return self._comment is None
+
+    def __getattr__(self, name):
+        # Only called for unset slots
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        if self._comment is not None and name in AircraftBeacon.__slots__:
+            self._materialize()
+            return getattr(self, name)
+
+        raise AttributeError(name)
+
+    def __getitem__(self, key):
+        attr = self.HEADER_KEYS.get(key)
+
+        if attr is None:
+            if self._comment is not None:
+                self._materialize()
+
+            return super().__getitem__(key)
+
+        value = getattr(self, attr, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+
+        return value
+
+    def __iter__(self):
+        if self._comment is not None:
+            self._materialize()
+
+        return super().__iter__()
+
+
+RECORD_TYPES = {
+    constants.BeaconType.aircraft_beacon: AircraftBeacon,
+    constants.BeaconType.server_beacon: ServerBeacon,
+    constants.BeaconType.server_status: ServerStatus
+}
+
+
+class RecordParser:
+    """
+    Wraps a parser so it returns beacon records instead of dictionaries.
+
+    This is a conversion layer: every message is still parsed into a
+    dictionary, which is copied into the record and then discarded. Parsing
+    is therefore slightly slower than with the wrapped parser; the benefit is
+    the smaller size of the records that are kept.
+
+    Instances can be passed to OgnClient.receive in place of the parser.
+    """
+
+    def __init__(self, parser=parser.Parser, keep_raw=True):
+        """
+        Creates a new RecordParser.
+
+        :param parser: the underlying parser
+        :type parser: ogn_lib.parser.ParserBase
+        :param bool keep_raw: False if records should not keep the raw
+                              messages
+        """
+
+        self.parser = parser
+        self.keep_raw = keep_raw
+
+    def __call__(self, raw_message):
+        """
+        Parses the raw APRS message to a record.
+
+        :param str raw_message: raw APRS message
+        :return: parsed message
+        :rtype: ogn_lib.records.Beacon
+        :raises ogn_lib.exceptions.ParseError: if message cannot be parsed
+        """
+
+        return Beacon.from_dict(self.parser(raw_message), self.keep_raw)
+
+    def parse_many(self, raw_messages, failures=None, prefilter=None):
+        """
+        Parses an iterable of raw APRS messages to records (see
+        ParserBase.parse_many).
+
+        :param raw_messages: raw APRS messages
+        :type raw_messages: iterable
+        :param failures: optional list collecting the parse failures
+        :type failures: list or None
+        :param prefilter: optional filter of the raw messages (see
+                          ogn_lib.filters); rejected messages are skipped
+        :type prefilter: callable or None
+        :return: generator of records
+        :rtype: generator
+        """
+
+        keep_raw = self.keep_raw
+        for data in self.parser.parse_many(raw_messages, failures,
+                                           prefilter):
+            yield Beacon.from_dict(data, keep_raw)
+
+
+class LazyParser(RecordParser):
+    """
+    Parser returning records with a deferred protocol specific comment.
+
+    Aircraft beacons are returned as LazyAircraftBeacon records; server
+    messages are parsed eagerly.
+
+    Because the comment is parsed on first access, errors in the comment are
+    raised (as ogn_lib.exceptions.ParseError) by the accessed record instead
+    of the parser.
+    """
+
+    def __call__(self, raw_message):
+        """
+        Parses the raw APRS message to a record.
+
+        :param str raw_message: raw APRS message
+        :return: parsed message
+        :rtype: ogn_lib.records.Beacon
+        :raises ogn_lib.exceptions.ParseError: if message cannot be parsed
+        """
+
+        try:
+            return self._parse(self.parser.find_parser(raw_message),
+                               raw_message)
+        except exceptions.ParserNotFoundError:
+            raise
+        except Exception as e:
+            raise exceptions.ParseError('Failed to parse message: {}'
+                                        .format(raw_message)) from e
+
+    def parse_many(self, raw_messages, failures=None, prefilter=None):
+        """
+        Parses an iterable of raw APRS messages to records (see
+        ParserBase.parse_many).
+
+        :param raw_messages: raw APRS messages
+        :type raw_messages: iterable
+        :param failures: optional list collecting the parse failures
+        :type failures: list or None
+        :param prefilter: optional filter of the raw messages (see
+                          ogn_lib.filters); rejected messages are skipped
+        :type prefilter: callable or None
+        :return: generator of records
+        :rtype: generator
+        """
+
+        return self.parser._parse_each(raw_messages, failures, self._parse,
+                                       prefilter)
+
+    def _parse(self, class_, raw_message):
+        """
+        Parses the message using the given parser class.
+
+        :param class_: parser for the message
+        :type class_: ogn_lib.parser.ParserBase
+        :param str raw_message: raw APRS message
+        :return: parsed message
+        :rtype: ogn_lib.records.Beacon
+        """
+
+        if issubclass(class_, parser.ServerParser):
+            return Beacon.from_dict(class_.parse_message(raw_message),
+                                    self.keep_raw)
+
+        data, comment = class_._parse_report(raw_message)
+        if not self.keep_raw:
+            del data['raw']
+
+        return LazyAircraftBeacon(data, comment, class_)
@@ -0,0 +1,202 @@
+"""
+ogn_lib.replay
+--------------
+
+This module contains a source which replays the recordings written by
+ogn_lib.recorder.Recorder through the same callback/parser contract as
+OgnClient.receive.
+"""
+
+import io
+import logging
+import mmap
+import os
+import time
+from datetime import datetime, timedelta
+
+import ogn_lib.client
+from ogn_lib import parser as parser_module, recorder
+
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class Replay:
+    """
+    Replays recorded APRS messages.
+
+    Messages are replayed as fast as possible (`speed` is None), at the
+    recorded pace (`speed` is 1) or N times faster (`speed` is N). While the
+    messages are replayed, the reference time of the timestamp resolver is
+    set to the recorded receive time, so the timestamps of the messages are
+    resolved as they were when the messages were received. The previous
+    reference time of the resolver (usually the wall clock) is restored when
+    the replay ends.
+
+    Lines of the recordings which cannot be read (e.g. a line truncated when
+    the recorder was stopped) are skipped, reported through the rate-limited
+    log and counted in Replay.malformed.
+
+    Uncompressed recordings are memory-mapped; compressed recordings are read
+    through a large buffer.
+    """
+
+    def __init__(self, paths, speed=None, resolver=None,
+                 buffer_size=1 << 20):
+        """
+        Creates a new Replay.
+
+        :param paths: recordings, replayed in the given order
+        :type paths: str or list
+        :param speed: replay speed relative to the recorded pace or None to
+                      replay as fast as possible
+        :type speed: float or None
+        :param resolver: timestamp resolver to be updated (defaults to
+                         Parser.timestamp_resolver)
+        :type resolver: ogn_lib.timestamps.TimestampResolver or None
+        :param int buffer_size: read buffer size for compressed recordings
+        """
+
+        self.paths = [paths] if isinstance(paths, str) else list(paths)
+        self.speed = speed
+        self.resolver = (resolver if resolver is not None
+                         else parser_module.Parser.timestamp_resolver)
+        self.buffer_size = buffer_size
+        self.lines = 0
+        self.malformed = 0
+        self.elapsed = 0.0
+
+    @property
+    def lines_per_second(self):
+        """
+        Number of lines replayed per second (of wall-clock time).
+        """
+
+        return self.lines / self.elapsed if self.elapsed else 0.0
+
+    def receive(self, callback, parser=None, prefilter=None):
+        """
+        Passes the recorded messages to the callback function.
+
+        :param callback: the callback function which takes one parameter
+                         (the replayed message)
+        :type callback: callable
+        :param parser: function that parses the APRS messages or None if
+                       callback should receive raw messages
+        :type parser: callable or None
+        :param prefilter: optional filter of the raw messages (see
+                          ogn_lib.filters)
+        :type prefilter: callable or None
+        """
+
+        for line in self.messages(prefilter):
+            if parser is None:
+                callback(line)
+                continue
+
+            try:
+                data = parser(line)
+            except ogn_lib.exceptions.ParseError as e:
+                ogn_lib.client.message_log.report(
+                    logging.ERROR, 'unparsed', type(e).__name__, line,
+                    exc_info=True)
+            else:
+                callback(data)
+
+    def messages(self, prefilter=None):
+        """
+        Iterates over the recorded messages at the replay speed.
+
+        :param prefilter: optional filter of the raw messages
+        :type prefilter: callable or None
+        :return: generator of raw APRS messages
+        :rtype: generator
+        """
+
+        resolver = self.resolver
+        previous = resolver.fixed_reference
+        speed = self.speed
+        second = None
+        first = None
+
+        self.lines = 0
+        start = time.monotonic()
+
+        try:
+            for received, line in self.records():
+                self.lines += 1
+
+                if int(received) != second:
+                    second = int(received)
+                    resolver.set_reference(EPOCH +
+                                           timedelta(seconds=received))
+
+                if speed is not None:
+                    if first is None:
+                        first = received
+                    delay = (start + (received - first) / speed -
+                             time.monotonic())
+                    if delay > 0.001:
+                        time.sleep(delay)
+
+                if prefilter is None or prefilter(line):
+                    yield line
+        finally:
+            self.elapsed = time.monotonic() - start
+            resolver.set_reference(previous)
+            logger.info('Replayed %d lines in %.1fs (%.0f lines/s)',
+                        self.lines, self.elapsed, self.lines_per_second)
+
+    def records(self):
+        """
+        Reads the recordings. Malformed lines are skipped (see Replay).
+
+        :return: generator of (receive time, raw message) tuples
+        :rtype: generator
+        """
+
+        self.malformed = 0
+
+        for path in self.paths:
+            for line in self._read_lines(path):
+                line = line.rstrip(b'\r\n')
+                if not line:
+                    continue
+
+                received, _, message = line.partition(b' ')
+                try:
+                    if not message:
+                        raise ValueError('No message')
+                    received = float(received)
+                except ValueError:
+                    self.malformed += 1
+                    ogn_lib.client.message_log.report(
+                        logging.WARNING, 'malformed-record', path,
+                        line.decode(errors='replace'))
+                    continue
+
+                yield received, message.decode(errors='replace')
+
+    def _read_lines(self, path):
+        """
+        Reads the lines of a recording.
+
+        :param str path: path to the recording
+        :return: generator of lines (bytes)
+        :rtype: generator
+        """
+
+        for open_, extension in recorder.COMPRESSION.values():
+            if extension and path.endswith(extension):
+                with open_(path, 'rb') as f:
+                    yield from io.BufferedReader(f, self.buffer_size)
+                return
+
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                yield from iter(data.readline, b'')
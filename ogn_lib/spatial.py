@@ -0,0 +1,264 @@
+"""
+ogn_lib.spatial
+---------------
+
+This module contains a spatial index of the latest aircraft positions.
+"""
+
+import math
+
+
+EARTH_RADIUS = 6371008.8  # mean radius (m)
+METERS_PER_DEGREE = EARTH_RADIUS * math.pi / 180
+
+
+def distance(lat1, lon1, lat2, lon2):
+    """
+    Returns the great-circle distance between two points.
+
+    :param float lat1: latitude of the first point (degrees)
+    :param float lon1: longitude of the first point (degrees)
+    :param float lat2: latitude of the second point (degrees)
+    :param float lon2: longitude of the second point (degrees)
+    :return: distance in meters
+    :rtype: float
+    """
+
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2 +
+         math.cos(phi1) * math.cos(phi2) *
+         math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+class SpatialGrid:
+    """
+    Index of aircraft positions in a grid of `cell_size` x `cell_size`
+    degree cells.
+
+    Every aircraft is kept in the cell of its latest position; it is moved
+    to another cell when a position in a different cell is received.
+    Queries only inspect the cells which intersect the queried area, so
+    their cost is proportional to the number of aircraft in these cells
+    rather than to the number of all aircraft.
+
+    The grid can be maintained on its own (SpatialGrid.update) or by a
+    ogn_lib.fleet.FleetState (the `index` argument), which also removes the
+    evicted aircraft from the grid.
+    """
+
+    def __init__(self, cell_size=0.25, key='uid'):
+        """
+        Creates a new SpatialGrid.
+
+        :param float cell_size: size of the cells in degrees
+        :param str key: `uid` or `from`; key of the aircraft used by
+                        SpatialGrid.update
+        """
+
+        self.cell_size = cell_size
+        self.key = key
+        self._cells = {}  # cell -> {key: (latitude, longitude)}
+        self._positions = {}  # key -> cell
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def update(self, beacon):
+        """
+        Moves the aircraft to the position of the parsed beacon.
+
+        :param beacon: parsed beacon
+        :type beacon: collections.abc.Mapping
+        :return: True if the beacon contained a position
+        :rtype: bool
+        """
+
+        latitude = beacon.get('latitude')
+        longitude = beacon.get('longitude')
+        if latitude is None or longitude is None:
+            return False
+
+        key = ((self.key == 'uid' and beacon.get('uid')) or
+               beacon.get('from'))
+        self.move(key, latitude, longitude)
+        return True
+
+    def move(self, key, latitude, longitude):
+        """
+        Sets the position of the aircraft.
+
+        :param key: key of the aircraft
+        :param float latitude: latitude (degrees)
+        :param float longitude: longitude (degrees)
+        """
+
+        cell = (math.floor(latitude / self.cell_size),
+                math.floor(longitude / self.cell_size))
+        old_cell = self._positions.get(key)
+
+        if old_cell != cell:
+            if old_cell is not None:
+                self._remove_from_cell(key, old_cell)
+            self._positions[key] = cell
+
+            members = self._cells.get(cell)
+            if members is None:
+                members = self._cells[cell] = {}
+        else:
+            members = self._cells[cell]
+
+        members[key] = (latitude, longitude)
+
+    def remove(self, key):
+        """
+        Removes the aircraft from the grid.
+
+        :param key: key of the aircraft
+        :return: True if the aircraft was in the grid
+        :rtype: bool
+        """
+
+        cell = self._positions.pop(key, None)
+        if cell is None:
+            return False
+
+        self._remove_from_cell(key, cell)
+        return True
+
+    def position(self, key):
+        """
+        Returns the position of the aircraft.
+
+        :param key: key of the aircraft
+        :return: (latitude, longitude) or None if the aircraft is not known
+        :rtype: tuple or None
+        """
+
+        cell = self._positions.get(key)
+        return None if cell is None else self._cells[cell][key]
+
+    def within_bbox(self, south, west, north, east):
+        """
+        Returns the aircraft in the bounding box. Boxes crossing the
+        antimeridian are given with `west` > `east`.
+
+        :param float south: southern bound (degrees)
+        :param float west: western bound (degrees)
+        :param float north: northern bound (degrees)
+        :param float east: eastern bound (degrees)
+        :return: list of (key, latitude, longitude) tuples
+        :rtype: list
+        """
+
+        if west > east:
+            return (self.within_bbox(south, west, north, 180) +
+                    self.within_bbox(south, -180, north, east))
+
+        result = []
+
+        for members in self._cells_in(south, west, north, east):
+            for key, (lat, lon) in members.items():
+                if south <= lat <= north and west <= lon <= east:
+                    result.append((key, lat, lon))
+
+        return result
+
+    def within_radius(self, latitude, longitude, radius):
+        """
+        Returns the aircraft within the radius of the point, nearest first.
+
+        :param float latitude: latitude of the center (degrees)
+        :param float longitude: longitude of the center (degrees)
+        :param float radius: radius in meters
+        :return: list of (key, distance) tuples
+        :rtype: list
+        """
+
+        dlat = radius / METERS_PER_DEGREE
+        south = max(latitude - dlat, -90)
+        north = min(latitude + dlat, 90)
+
+        cos_lat = math.cos(math.radians(max(abs(south), abs(north))))
+        if south == -90 or north == 90 or dlat >= 90 * cos_lat:
+            ranges = [(-180, 180)]
+        else:
+            dlon = dlat / cos_lat
+            west = longitude - dlon
+            east = longitude + dlon
+            if west < -180:
+                ranges = [(west + 360, 180), (-180, east)]
+            elif east > 180:
+                ranges = [(west, 180), (-180, east - 360)]
+            else:
+                ranges = [(west, east)]
+
+        result = []
+
+        for west, east in ranges:
+            for members in self._cells_in(south, west, north, east):
+                for key, (lat, lon) in members.items():
+                    d = distance(latitude, longitude, lat, lon)
+                    if d <= radius:
+                        result.append((key, d))
+
+        result.sort(key=lambda item: item[1])
+        return result
+
+    def clear(self):
+        """
+        Removes all aircraft.
+        """
+
+        self._cells.clear()
+        self._positions.clear()
+
+    def _cells_in(self, south, west, north, east):
+        """
+        Returns the non-empty cells which intersect the bounding box.
+
+        :param float south: southern bound (degrees)
+        :param float west: western bound (degrees)
+        :param float north: northern bound (degrees)
+        :param float east: eastern bound (degrees)
+        :return: generator of the members of the cells
+        :rtype: generator
+        """
+
+        size = self.cell_size
+        lats = range(math.floor(south / size), math.floor(north / size) + 1)
+        lons = range(math.floor(west / size), math.floor(east / size) + 1)
+
+        # Boxes larger than the occupied part of the grid check the occupied
+        # cells instead
+        if len(lats) * len(lons) > len(self._cells):
+            for (lat, lon), members in self._cells.items():
+                if lat in lats and lon in lons:
+                    yield members
+            return
+
+        cells = self._cells
+        for lat in lats:
+            for lon in lons:
+                members = cells.get((lat, lon))
+                if members:
+                    yield members
+
+    def _remove_from_cell(self, key, cell):
+        """
+        Removes the aircraft from the cell, dropping the cell if it becomes
+        empty.
+
+        :param key: key of the aircraft
+        :param tuple cell: cell of the aircraft
+        """
+
+        members = self._cells[cell]
+        del members[key]
+        if not members:
+            del self._cells[cell]
@@ -0,0 +1,149 @@
+"""
+ogn_lib.timestamps
+------------------
+
+This module contains the resolver of the timestamps used in APRS messages.
+
+APRS timestamps only contain the time of day (`HHMMSS`) or the day of month
+and the time (`DDHHMM`). The full date is taken from a reference time, which
+is either a snapshot of the UTC wall clock or a time set explicitly (e.g. when
+replaying archived messages).
+"""
+
+import time as time_module
+from datetime import datetime, time, timedelta
+
+
+TD_1DAY = timedelta(days=1)
+
+
+class TimestampResolver:
+    """
+    Resolves APRS timestamps against a reference time.
+
+    When no reference time is set, the wall clock (UTC) is read at most once
+    per `snapshot_interval` seconds. Resolved `HHMMSS` timestamps are memoized
+    until the reference time changes, since beacons received in the same
+    second usually share the timestamp.
+
+    The reference time, its date and the memoized timestamps are replaced
+    together as a single snapshot, so the resolver can be shared by threads
+    (e.g. the workers of OgnClient.receive_threaded) without a lock.
+    """
+
+    # Timestamps up to this far ahead of the reference time are considered to
+    # be in the future; later ones are assumed to be from the previous day.
+    MAX_AHEAD = timedelta(minutes=5)
+
+    # Maximum number of memoized timestamps
+    MAX_CACHED = 4096
+
+    def __init__(self, reference=None, snapshot_interval=1.0):
+        """
+        Creates a new TimestampResolver.
+
+        :param reference: reference time (UTC) or None if the wall clock
+                          should be used
+        :type reference: datetime.datetime or None
+        :param float snapshot_interval: seconds between the snapshots of the
+                                        wall clock
+        """
+
+        self.snapshot_interval = snapshot_interval
+        self._snapshot = None  # (reference, its date, memoized timestamps)
+        self._expires = 0
+        self.set_reference(reference)
+
+    @property
+    def reference(self):
+        """
+        Current reference time (UTC).
+        """
+
+        if self._fixed is None and time_module.monotonic() >= self._expires:
+            self.refresh()
+
+        return self._snapshot[0]
+
+    @property
+    def fixed_reference(self):
+        """
+        Reference time set by TimestampResolver.set_reference or None if the
+        wall clock is used.
+        """
+
+        return self._fixed
+
+    def set_reference(self, reference):
+        """
+        Sets the reference time used to resolve the timestamps.
+
+        :param reference: reference time (UTC) or None if the wall clock
+                          should be used
+        :type reference: datetime.datetime or None
+        """
+
+        self._fixed = reference
+        self.refresh()
+
+    def refresh(self):
+        """
+        Takes a new snapshot of the wall clock (e.g. at the start of a batch)
+        and clears the memoized timestamps.
+        """
+
+        if self._fixed is None:
+            reference = datetime.utcnow()
+            self._expires = time_module.monotonic() + self.snapshot_interval
+        else:
+            reference = self._fixed
+
+        self._snapshot = (reference, reference.date(), {})
+
+    def resolve_time(self, timestamp):
+        """
+        Resolves the `HHMMSS` timestamp.
+
+        The timestamp is placed on the date of the reference time, or on the
+        previous day if it would otherwise be more than MAX_AHEAD ahead of the
+        reference time.
+
+        :param str timestamp: utc timestamp string in %H%M%S
+        :return: resolved timestamp
+        :rtype: datetime.datetime
+        """
+
+        if self._fixed is None and time_module.monotonic() >= self._expires:
+            self.refresh()
+
+        reference, date, cache = self._snapshot
+
+        try:
+            return cache[timestamp]
+        except KeyError:
+            pass
+
+        resolved = datetime.combine(date, time(int(timestamp[:2]),
+                                               int(timestamp[2:4]),
+                                               int(timestamp[4:6])))
+        if resolved - reference > self.MAX_AHEAD:
+            resolved -= TD_1DAY
+
+        if len(cache) >= self.MAX_CACHED:
+            cache.clear()
+
+        cache[timestamp] = resolved
+        return resolved
+
+    def resolve_datetime(self, timestamp):
+        """
+        Resolves the `DDHHMM` timestamp in the month of the reference time.
+
+        :param str timestamp: utc timestamp string in %d%H%M
+        :return: resolved timestamp
+        :rtype: datetime.datetime
+        """
+
+        reference = self.reference
+        return datetime(reference.year, reference.month, int(timestamp[:2]),
+                        int(timestamp[2:4]), int(timestamp[4:6]))
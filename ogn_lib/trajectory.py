@@ -0,0 +1,291 @@
+"""
+ogn_lib.trajectory
+------------------
+
+This module contains a store of the recent tracks of aircraft, kept in
+NumPy ring buffers.
+
+NumPy is an optional dependency of ogn-lib; it is only required when this
+module is used.
+"""
+
+from datetime import datetime
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+EPOCH = datetime(1970, 1, 1)
+NAN = float('nan')
+
+DTYPE = [
+    ('timestamp', 'float64'),  # seconds since the unix epoch (UTC)
+    ('latitude', 'float64'),
+    ('longitude', 'float64'),
+    ('altitude', 'float32'),
+    ('vertical_speed', 'float32'),
+    ('ground_speed', 'float32'),
+    ('heading', 'float32')
+]
+
+
+class TrajectoryStore:
+    """
+    Keeps the last `capacity` points of every aircraft.
+
+    All tracks are rows of a single structured array. Points are appended
+    to the row one after another; when the row is full, the last
+    `capacity - 1` points are moved to its start with a single copy (the
+    row has room for `capacity / 4` extra points, so this happens once per
+    `capacity / 4` appends). The last `capacity` points are therefore always
+    a contiguous slice of the row, so TrajectoryStore.track returns a view
+    of the buffer without copying or reordering, and an append writes the
+    fields of one point without allocating per-point objects.
+
+    Rows are allocated for `initial_aircraft` aircraft and the buffer is
+    doubled when more aircraft are tracked.
+
+    Points older than the latest point of the aircraft are ignored, so the
+    tracks are sorted by time.
+    """
+
+    def __init__(self, capacity=128, max_age=None, key='uid',
+                 initial_aircraft=64):
+        """
+        Creates a new TrajectoryStore.
+
+        :param int capacity: maximum number of points per aircraft
+        :param max_age: default maximum age (seconds) of the returned points,
+                        relative to the latest point of the aircraft
+        :type max_age: float or None
+        :param str key: `uid` or `from`; key of the aircraft used by
+                        TrajectoryStore.append
+        :param int initial_aircraft: initial number of rows of the buffer
+        """
+
+        if numpy is None:
+            raise ImportError('TrajectoryStore requires NumPy')
+
+        self.capacity = capacity
+        self.max_age = max_age
+        self.key = key
+        self._width = capacity + max(1, capacity // 4)
+        self._slots = {}
+        self._free = []
+        self._buffer = None
+        self._columns = []  # views of the fields of the buffer, see DTYPE
+        # Per-row state: next write position, number of points and the
+        # timestamp of the latest point
+        self._positions = []
+        self._counts = []
+        self._last = []
+        self._allocate_rows(initial_aircraft)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, key):
+        return key in self._slots
+
+    def append(self, beacon):
+        """
+        Appends the position of the parsed beacon to the track of the
+        aircraft.
+
+        :param beacon: parsed beacon
+        :type beacon: collections.abc.Mapping
+        :return: True if the point was appended
+        :rtype: bool
+        """
+
+        timestamp = beacon.get('timestamp')
+        latitude = beacon.get('latitude')
+        if timestamp is None or latitude is None:
+            return False
+
+        key = ((self.key == 'uid' and beacon.get('uid')) or
+               beacon.get('from'))
+
+        return self.append_point(
+            key, (timestamp - EPOCH).total_seconds(), latitude,
+            beacon.get('longitude'), beacon.get('altitude'),
+            beacon.get('vertical_speed'), beacon.get('ground_speed'),
+            beacon.get('heading'))
+
+    def append_point(self, key, timestamp, latitude, longitude, altitude=None,
+                     vertical_speed=None, ground_speed=None, heading=None):
+        """
+        Appends a point to the track of the aircraft.
+
+        :param key: key of the aircraft
+        :param float timestamp: seconds since the unix epoch
+        :param float latitude: latitude (degrees)
+        :param float longitude: longitude (degrees)
+        :param altitude: altitude (m)
+        :type altitude: float or None
+        :param vertical_speed: vertical speed (m/s)
+        :type vertical_speed: float or None
+        :param ground_speed: ground speed (m/s)
+        :type ground_speed: float or None
+        :param heading: heading (degrees)
+        :type heading: float or None
+        :return: True if the point was appended
+        :rtype: bool
+        """
+
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._allocate(key)
+        elif timestamp < self._last[slot]:
+            return False
+
+        capacity = self.capacity
+        position = self._positions[slot]
+
+        if position == self._width:
+            # Keeps the points which remain in the track after this append
+            row = self._buffer[slot]
+            row[:capacity - 1] = row[position - capacity + 1:position]
+            position = capacity - 1
+
+        (timestamps, latitudes, longitudes, altitudes, vertical_speeds,
+         ground_speeds, headings) = self._columns
+        index = (slot, position)
+        timestamps[index] = timestamp
+        latitudes[index] = latitude
+        longitudes[index] = longitude
+        altitudes[index] = NAN if altitude is None else altitude
+        vertical_speeds[index] = (NAN if vertical_speed is None
+                                  else vertical_speed)
+        ground_speeds[index] = NAN if ground_speed is None else ground_speed
+        headings[index] = NAN if heading is None else heading
+
+        self._positions[slot] = position + 1
+        self._counts[slot] = min(self._counts[slot] + 1, capacity)
+        self._last[slot] = timestamp
+        return True
+
+    def track(self, key, max_age=None):
+        """
+        Returns the track of the aircraft, oldest point first.
+
+        The returned array is a view of the ring buffer: it is not copied,
+        but it is only valid until the next point of the aircraft is
+        appended (or the store grows).
+
+        :param key: key of the aircraft
+        :param max_age: maximum age (seconds) of the points relative to the
+                        latest point (defaults to `max_age` of the store)
+        :type max_age: float or None
+        :return: structured array with the fields of `DTYPE` or None if the
+                 aircraft is not known
+        :rtype: numpy.ndarray or None
+        """
+
+        slot = self._slots.get(key)
+        if slot is None:
+            return None
+
+        end = self._positions[slot]
+        points = self._buffer[slot, end - self._counts[slot]:end]
+
+        if max_age is None:
+            max_age = self.max_age
+        if max_age is not None:
+            start = numpy.searchsorted(points['timestamp'],
+                                       self._last[slot] - max_age)
+            points = points[start:]
+
+        return points
+
+    def keys(self):
+        """
+        Returns the keys of the known aircraft.
+
+        :return: list of keys
+        :rtype: list
+        """
+
+        return list(self._slots)
+
+    def remove(self, key):
+        """
+        Removes the track of the aircraft.
+
+        :param key: key of the aircraft
+        :return: True if the aircraft was known
+        :rtype: bool
+        """
+
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return False
+
+        self._free.append(slot)
+        return True
+
+    def evict(self, before):
+        """
+        Removes the tracks of the aircraft whose latest point is older than
+        the given time.
+
+        :param before: cutoff time
+        :type before: datetime.datetime or float
+        :return: number of removed aircraft
+        :rtype: int
+        """
+
+        if isinstance(before, datetime):
+            before = (before - EPOCH).total_seconds()
+
+        stale = [key for key, slot in self._slots.items()
+                 if self._last[slot] < before]
+        for key in stale:
+            self.remove(key)
+
+        return len(stale)
+
+    def _allocate(self, key):
+        """
+        Assigns an empty row to the aircraft, growing the buffer if
+        necessary.
+
+        :param key: key of the aircraft
+        :return: index of the row
+        :rtype: int
+        """
+
+        if not self._free:
+            self._allocate_rows(2 * len(self._buffer))
+
+        slot = self._free.pop()
+        self._positions[slot] = 0
+        self._counts[slot] = 0
+        self._last[slot] = -float('inf')
+        self._slots[key] = slot
+        return slot
+
+    def _allocate_rows(self, rows):
+        """
+        Resizes the buffer to the given number of rows, keeping the existing
+        tracks.
+
+        :param int rows: number of rows
+        """
+
+        buffer = numpy.zeros((rows, self._width), dtype=DTYPE)
+        old_rows = 0
+
+        if self._buffer is not None:
+            old_rows = len(self._buffer)
+            buffer[:old_rows] = self._buffer
+
+        added = rows - old_rows
+        self._buffer = buffer
+        self._columns = [buffer[name] for name, _ in DTYPE]
+        self._positions.extend([0] * added)
+        self._counts.extend([0] * added)
+        self._last.extend([-float('inf')] * added)
+        self._free.extend(range(rows - 1, old_rows - 1, -1))
@@ -26,6 +26,9 @@ setup(
     license=ogn_lib.__license__,
     packages=find_packages(exclude=['docs', 'tests']),
     install_requires=[],
+    extras_require={
+        'numpy': ['numpy']
+    },
     tests_require=tests_require,
     classifiers=[
         'Development Status :: 3 - Alpha',
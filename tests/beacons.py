@@ -0,0 +1,31 @@
+"""
+Parsed beacons for the tests of the modules which process parsed beacons
+(ogn_lib.dedup, ogn_lib.fleet and ogn_lib.trajectory).
+"""
+
+from datetime import datetime, timedelta
+
+
+T0 = datetime(2018, 1, 1, 12, 0, 0)
+
+
+def beacon(seconds=0, source='FLRDDA5BA', uid='0ADDA5BA', **fields):
+    """
+    Returns a parsed aircraft beacon with the fields used by the tests.
+
+    :param float seconds: timestamp of the beacon in seconds after T0
+    :param str source: callsign of the aircraft
+    :param uid: unique id of the aircraft
+    :type uid: str or None
+    :param fields: values of the other fields (e.g. `latitude`)
+    :return: parsed beacon
+    :rtype: dict
+    """
+
+    data = {'from': source, 'uid': uid,
+            'timestamp': T0 + timedelta(seconds=seconds),
+            'latitude': 44.25, 'longitude': 6.0, 'altitude': 1000.0,
+            'ground_speed': 25.0, 'heading': 342, 'receiver': 'LFMX',
+            'signal_to_noise_ratio': 10.0}
+    data.update(fields)
+    return data
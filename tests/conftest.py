@@ -0,0 +1,5 @@
+import sys
+
+
+# The asyncio client (and its tests) require Python 3.7 or greater
+collect_ignore = [] if sys.version_info >= (3, 7) else ['test_aio.py']
@@ -0,0 +1,227 @@
+import asyncio
+
+import pytest
+
+from ogn_lib import aio, client, exceptions
+from tests.test_client import APRS_RECORDS
+
+
+LOGIN = [b'# aprsc 2.1.4-g408ed49\r\n',
+         b'# logresp username unverified, server GLIDERN3\r\n']
+
+
+class TestAsyncClient:
+
+    def _patch_connection(self, mocker, lines):
+        connections = []
+
+        async def open_connection(host, port):
+            reader = asyncio.StreamReader()
+            reader.feed_data(b''.join(LOGIN + lines))
+            reader.feed_eof()
+
+            writer = mocker.MagicMock()
+            writer.drain = mocker.AsyncMock()
+            writer.wait_closed = mocker.AsyncMock()
+            connections.append(writer)
+            return reader, writer
+
+        mocker.patch('asyncio.open_connection', side_effect=open_connection)
+        return connections
+
+    @staticmethod
+    def _records(extra=()):
+        return [r.encode() + b'\r\n' for r in APRS_RECORDS] + list(extra)
+
+    def test_init(self):
+        cl = aio.AsyncOgnClient('username', filter_='filter')
+        assert cl.port == client.OgnClient.APRS_PORT_FILTER
+        assert cl.parser is None
+
+    def test_no_blocking_methods(self):
+        for name in ['stream', 'receive_threaded', '_receive', '_read_lines']:
+            assert not hasattr(aio.AsyncOgnClient, name)
+
+    def test_connect(self, mocker):
+        connections = self._patch_connection(mocker, [])
+        cl = aio.AsyncOgnClient('username')
+
+        async def run():
+            await cl.connect()
+            assert cl._keepalive_task is not None
+            await cl.disconnect()
+
+        asyncio.run(run())
+
+        writer, = connections
+        writer.write.assert_called_once_with(
+            (cl._gen_auth_message() + '\n').encode())
+        assert writer.close.called
+        assert cl._kill
+        assert cl._keepalive_task is None
+
+    def test_connect_failed_auth(self, mocker):
+        connections = self._patch_connection(mocker, [])
+        cl = aio.AsyncOgnClient('username')
+        cl._validate_login = mocker.MagicMock(
+            side_effect=exceptions.ParseError)
+
+        with pytest.raises(exceptions.ParseError):
+            asyncio.run(cl.connect())
+
+        assert connections[0].close.called
+
+    def test_connect_failed_send(self, mocker):
+        connections = self._patch_connection(mocker, [])
+        cl = aio.AsyncOgnClient('username')
+        cl.send = mocker.AsyncMock(side_effect=OSError)
+
+        with pytest.raises(OSError):
+            asyncio.run(cl.connect())
+
+        assert connections[0].close.called
+        assert cl._writer is None
+
+    def test_aiter(self, mocker):
+        self._patch_connection(mocker, self._records([b'# server\r\n']))
+        cl = aio.AsyncOgnClient('username', parser=lambda x: x[:9],
+                                prefilter=lambda x: 'EDQE' not in x)
+        received = []
+
+        async def run():
+            await cl.connect()
+            async for beacon in cl:
+                received.append(beacon)
+                if len(received) == 2:
+                    await cl.disconnect()
+
+        asyncio.run(run())
+        assert received == ['FLRDF0F8E', 'FLRDD51B2']
+
+    def test_messages(self, mocker):
+        self._patch_connection(mocker, self._records())
+        cl = aio.AsyncOgnClient('username')
+
+        async def run():
+            await cl.connect()
+            return [m async for m in cl.messages(reconnect=False)]
+
+        assert asyncio.run(run()) == APRS_RECORDS
+
+    def test_messages_parse_error(self, mocker):
+        self._patch_connection(mocker, self._records())
+        mocker.patch.object(client.message_log, 'report')
+        cl = aio.AsyncOgnClient('username')
+
+        def parse(line):
+            if 'EDER' in line:
+                raise exceptions.ParseError()
+            return line
+
+        async def run():
+            await cl.connect()
+            return [m async for m in cl.messages(False, parse)]
+
+        assert asyncio.run(run()) == [APRS_RECORDS[0], APRS_RECORDS[2]]
+        assert client.message_log.report.call_count == 1
+
+    def test_messages_reconnect(self, mocker):
+        connections = self._patch_connection(mocker, self._records())
+        cl = aio.AsyncOgnClient('username')
+        received = []
+
+        async def run():
+            await cl.connect()
+            async for message in cl.messages():
+                received.append(message)
+                if len(received) == 2 * len(APRS_RECORDS):
+                    await cl.disconnect()
+
+        asyncio.run(run())
+
+        assert received == 2 * APRS_RECORDS
+        assert len(connections) == 2
+
+    def test_messages_disconnect_while_reconnecting(self, mocker):
+        connections = self._patch_connection(mocker, self._records())
+        cl = aio.AsyncOgnClient('username')
+        cl.RECONNECT_WAIT = 30
+        received = []
+
+        async def run():
+            await cl.connect()
+            asyncio.open_connection.side_effect = OSError
+
+            async def disconnect():
+                while asyncio.open_connection.call_count < 2:
+                    await asyncio.sleep(0.01)
+                await cl.disconnect()
+
+            task = asyncio.ensure_future(disconnect())
+            async for message in cl.messages():
+                received.append(message)
+            await task
+
+        asyncio.run(asyncio.wait_for(run(), 5))
+
+        assert received == APRS_RECORDS
+        assert len(connections) == 1
+        assert cl._kill
+
+    def test_reconnect_disconnected_while_connecting(self, mocker):
+        connections = self._patch_connection(mocker, [])
+        cl = aio.AsyncOgnClient('username')
+
+        async def run():
+            stop = cl._stop = asyncio.Event()
+            cl._validate_login = lambda status: stop.set() or True
+            await cl._reconnect(stop, retries=1, wait_period=0)
+
+        asyncio.run(run())
+
+        assert connections[0].close.called
+        assert cl._kill
+        assert cl._keepalive_task is None
+
+    def test_receive_coroutine_callback(self, mocker):
+        self._patch_connection(mocker, self._records())
+        cl = aio.AsyncOgnClient('username')
+        received = []
+
+        async def callback(message):
+            await asyncio.sleep(0)
+            received.append(message)
+
+        async def run():
+            await cl.connect()
+            await cl.receive(callback, reconnect=False)
+
+        asyncio.run(run())
+        assert received == APRS_RECORDS
+
+    def test_receive_callback(self, mocker):
+        self._patch_connection(mocker, self._records())
+        cl = aio.AsyncOgnClient('username')
+        received = []
+
+        async def run():
+            await cl.connect()
+            await cl.receive(received.append, reconnect=False)
+
+        asyncio.run(run())
+        assert received == APRS_RECORDS
+
+    def test_keepalive(self, mocker):
+        connections = self._patch_connection(mocker, [])
+        cl = aio.AsyncOgnClient('username')
+        cl.SOCKET_KEEPALIVE = 0.01
+
+        async def run():
+            await cl.connect()
+            await asyncio.sleep(0.05)
+            await cl.disconnect()
+
+        asyncio.run(run())
+
+        calls = connections[0].write.call_args_list
+        assert calls[1][0][0] == b'#keepalive\n'
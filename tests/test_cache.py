@@ -0,0 +1,123 @@
+import threading
+
+from ogn_lib import cache
+
+
+class TestLRUCache:
+
+    def test_get_put(self):
+        c = cache.LRUCache(2)
+        c.put('a', 1)
+
+        assert c.get('a') == 1
+        assert c.get('b') is None
+        assert c.get('b', 2) == 2
+        assert 'a' in c
+        assert len(c) == 1
+
+    def test_eviction(self):
+        c = cache.LRUCache(2)
+        c.put('a', 1)
+        c.put('b', 2)
+        c.get('a')
+        c.put('c', 3)
+
+        assert 'a' in c
+        assert 'b' not in c
+        assert c.evictions == 1
+
+    def test_put_existing(self):
+        c = cache.LRUCache(2)
+        c.put('a', 1)
+        c.put('b', 2)
+        c.put('a', 3)
+        c.put('c', 4)
+
+        assert c.get('a') == 3
+        assert 'b' not in c
+
+    def test_resize(self):
+        c = cache.LRUCache(3)
+        for key in 'abc':
+            c.put(key, key)
+
+        c.resize(1)
+        assert 'c' in c
+        assert len(c) == 1
+        assert c.evictions == 2
+
+    def test_stats(self):
+        c = cache.LRUCache(1)
+        c.put('a', 1)
+        c.get('a')
+        c.get('b')
+        c.put('b', 2)
+
+        assert c.stats() == cache.CacheStats(hits=1, misses=1, evictions=1,
+                                             size=1, maxsize=1)
+
+        c.clear()
+        assert c.stats() == (0, 0, 0, 0, 1)
+
+    def test_threads(self):
+        c = cache.LRUCache(4)
+
+        def worker():
+            for i in range(2000):
+                key = i % 8
+                if c.get(key) is None:
+                    c.put(key, i)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        stats = c.stats()
+        assert stats.hits + stats.misses == 8000
+        assert stats.size <= 4
+
+
+class TestInternPool:
+
+    def test_intern(self):
+        pool = cache.InternPool()
+        a = ''.join(['FLR', 'DD83BC'])
+        b = ''.join(['FLRDD', '83BC'])
+
+        assert a is not b
+        assert pool.intern(a) is a
+        assert pool.intern(b) is a
+        assert pool.stats()[:2] == (1, 1)
+
+    def test_generations(self):
+        pool = cache.InternPool(2)
+        for value in ('a', 'b', 'c'):
+            pool.intern(value)
+
+        assert len(pool) == 3
+        assert pool._previous == {'a': 'a', 'b': 'b'}
+
+        pool.intern('a')  # promoted to the current generation
+        pool.intern('d')
+        pool.intern('e')
+
+        assert 'a' in pool
+        assert 'b' not in pool
+        assert pool.evictions == 1
+
+    def test_bounded(self):
+        pool = cache.InternPool(10)
+        for i in range(1000):
+            pool.intern(str(i))
+
+        assert len(pool) <= 20
+
+    def test_clear(self):
+        pool = cache.InternPool()
+        pool.intern('a')
+        pool.clear()
+
+        assert 'a' not in pool
+        assert pool.stats() == (0, 0, 0, 0, 2 * pool.generation_size)
@@ -1,6 +1,8 @@
+import socket
+import threading
 import time
 import pytest
-from ogn_lib import client, exceptions
+from ogn_lib import client, exceptions, parser
 
 APRS_RECORDS = [
     'FLRDF0F8E>APRS,qAS,EDTD:/075201h4753.35N/00840.21E\'350/063/A=004359 !W69'
@@ -12,6 +14,56 @@ APRS_RECORDS = [
 ]
 
 
+class TestBatcher:
+
+    def test_size(self):
+        batches = []
+        b = client.Batcher(batches.append, size=2)
+        for i in range(5):
+            b.add(i)
+
+        assert batches == [[0, 1], [2, 3]]
+        assert len(b) == 1
+
+    def test_interval(self, mocker):
+        batches = []
+        b = client.Batcher(batches.append, interval=10)
+        mocker.patch('time.monotonic', return_value=0)
+        b.add(0)
+        b.add(1)
+        b.flush_due()
+        assert batches == []
+
+        time.monotonic.return_value = 10
+        b.flush_due()
+        assert batches == [[0, 1]]
+
+        b.add(2)
+        b.add(3)
+        time.monotonic.return_value = 20
+        b.add(4)
+        assert batches == [[0, 1], [2, 3]]
+
+    def test_remaining(self, mocker):
+        b = client.Batcher(None, interval=10)
+        mocker.patch('time.monotonic', return_value=0)
+        assert b.remaining() is None
+
+        b.add(0)
+        time.monotonic.return_value = 4
+        assert b.remaining() == 6
+        assert client.Batcher(None, size=10).remaining() is None
+
+    def test_flush(self):
+        batches = []
+        b = client.Batcher(batches.append, size=10)
+        b.flush()
+        b.add(0)
+        b.flush()
+
+        assert batches == [[0]]
+
+
 class TestClient:
 
     def test_init_set_server(self):
@@ -106,6 +158,141 @@ class TestClient:
 
         assert cl._reconnect.call_count == 1
 
+    def test_receive_batches(self, mocker):
+        cl = self._threaded_client(mocker)
+        batches = []
+        cl.receive(batches.append, reconnect=False, batch_size=2)
+
+        assert batches == [APRS_RECORDS[:2], APRS_RECORDS[2:]]
+        assert cl._batcher is None
+
+    def test_receive_batches_interval(self, mocker):
+        cl = self._threaded_client(mocker)
+        clock = [0]
+        mocker.patch('time.monotonic', side_effect=lambda: clock[0])
+        lines = iter(APRS_RECORDS + [''])
+
+        def readline():
+            clock[0] += 1
+            return next(lines)
+
+        cl._sock_file.readline.side_effect = readline
+        batches = []
+        cl.receive(batches.append, reconnect=False, batch_interval=1.5)
+
+        assert batches == [APRS_RECORDS[:2], APRS_RECORDS[2:]]
+
+    def test_receive_batches_reconnect(self, mocker):
+        cl = self._threaded_client(mocker)
+        batches = []
+
+        def drop_connection(callback, parser, prefilter):
+            callback(APRS_RECORDS[0])
+            raise BrokenPipeError()
+
+        cl._receive_loop = mocker.MagicMock(side_effect=drop_connection)
+        cl._reconnect = mocker.MagicMock(side_effect=ConnectionError)
+        with pytest.raises(ConnectionError):
+            cl.receive(batches.append, batch_size=10)
+
+        assert batches == [APRS_RECORDS[:1]]
+
+    def test_stream(self, mocker):
+        cl = self._threaded_client(mocker)
+
+        assert list(cl.stream(reconnect=False)) == APRS_RECORDS
+        assert cl._kill
+        assert cl._socket.shutdown.called
+        assert cl._socket.close.called
+
+    def test_stream_parser(self, mocker):
+        cl = self._threaded_client(mocker)
+        mocker.patch.object(client.message_log, 'report')
+
+        def parse(line):
+            if 'EDER' in line:
+                raise exceptions.ParseError()
+            return line.lower()
+
+        assert list(cl.stream(parse, reconnect=False)) == [
+            APRS_RECORDS[0].lower(), APRS_RECORDS[2].lower()]
+        assert client.message_log.report.call_count == 1
+
+    def test_stream_parse_error_logged_once(self, mocker):
+        cl = self._threaded_client(mocker)
+        cl._sock_file.readline.side_effect = ['FLR123456>APRS,', '']
+        mocker.patch.object(client.message_log, 'report')
+        mocker.patch.object(parser.message_log, 'report')
+
+        assert list(cl.stream(parser.Parser, reconnect=False)) == []
+        assert [c[0][1] for c in client.message_log.report.call_args_list] == [
+            'unparsed']
+        assert not parser.message_log.report.called
+
+    def test_stream_idle_timeout(self, mocker):
+        cl = self._threaded_client(mocker)
+        closed = threading.Event()
+        lines = iter(APRS_RECORDS[:1])
+
+        def readline():
+            return next(lines, None) or (closed.wait() and '')
+
+        cl._sock_file.readline.side_effect = readline
+        cl._socket.shutdown.side_effect = lambda how: closed.set()
+
+        assert list(cl.stream(idle_timeout=0.05)) == APRS_RECORDS[:1]
+
+    def test_stream_read_ahead(self, mocker):
+        cl = self._threaded_client(mocker)
+        cl._sock_file.readline.side_effect = lambda: APRS_RECORDS[0]
+        cl._sock_file.readline.reset_mock()
+
+        messages = cl.stream(read_ahead=2)
+        assert next(messages) == APRS_RECORDS[0]
+        time.sleep(0.05)
+        # 1 returned, 2 buffered and 1 waiting for space in the buffer
+        assert cl._sock_file.readline.call_count <= 4
+        messages.close()
+
+        assert cl._kill
+
+    def test_stream_idle_timeout_reconnecting(self, mocker):
+        cl = self._threaded_client(mocker)
+        reads = []
+
+        def readline():
+            reads.append(1)
+            if len(reads) == 1:
+                raise BrokenPipeError()
+            time.sleep(0.01)
+            return APRS_RECORDS[0]
+
+        def connect():
+            time.sleep(0.3)
+            cl._kill = False
+
+        cl._sock_file.readline.side_effect = readline
+        cl.connect = mocker.Mock(side_effect=connect)
+
+        start = time.monotonic()
+        assert list(cl.stream(idle_timeout=0.1)) == []
+        assert time.monotonic() - start < cl.STREAM_JOIN_TIMEOUT + 0.5
+
+        time.sleep(0.3)
+        assert cl._kill
+        assert len(reads) == 1
+        assert not any(t.name == 'OgnClient-stream' and t.is_alive()
+                       for t in threading.enumerate())
+
+    def test_stream_error(self, mocker):
+        cl = self._threaded_client(mocker)
+        cl._reconnect = mocker.MagicMock(side_effect=ConnectionError)
+
+        messages = cl.stream()
+        assert [next(messages) for _ in APRS_RECORDS] == APRS_RECORDS
+        with pytest.raises(ConnectionError):
+            next(messages)
+
     def test_reconnect_success(self, mocker):
         cl = client.OgnClient('username')
         cl.connect = mocker.MagicMock()
@@ -155,6 +342,52 @@ class TestClient:
 
             cb.assert_called_once_with(APRS_RECORDS[0])
 
+    def test_receive_loop_prefilter(self, mocker):
+        sock = self._get_mocked_socket(mocker, True)
+        with mocker.patch('socket.create_connection', return_value=sock):
+            cl = client.OgnClient('username')
+            cl.connect()
+            cb = mocker.MagicMock(side_effect=lambda x: cl.disconnect())
+            parser = mocker.Mock(spec=[], side_effect=lambda x: x)
+            cl._receive_loop(cb, parser, lambda line: 'EDER' in line)
+
+            parser.assert_called_once_with(APRS_RECORDS[1])
+            cb.assert_called_once_with(APRS_RECORDS[1])
+
+    def test_receive_loop_parse_stream(self, mocker):
+        class StreamParser:
+            def parse_stream(self, lines, failures):
+                for line in lines:
+                    if 'EDER' in line:
+                        failures.append(parser.ParseFailure(0, line, 'Error'))
+                    else:
+                        yield line
+
+        sock = self._get_mocked_socket(mocker, True)
+        mocker.patch.object(client.message_log, 'report')
+        with mocker.patch('socket.create_connection', return_value=sock):
+            cl = client.OgnClient('username')
+            cl.connect()
+            cl._sock_file.readline.side_effect = APRS_RECORDS + ['']
+            cb = mocker.MagicMock()
+            cl._receive_loop(cb, StreamParser())
+
+        assert cb.call_count == 2
+        assert client.message_log.report.call_count == 1
+
+    def test_receive_loop_recorder(self, mocker):
+        sock = self._get_mocked_socket(mocker)
+        mocker.patch('socket.create_connection', return_value=sock)
+
+        cl = client.OgnClient('username')
+        cl.connect()
+        cl.recorder = mocker.Mock()
+        cl._sock_file.readline.side_effect = (['# server'] + APRS_RECORDS +
+                                              [''])
+        cl._receive_loop(mocker.Mock(), None, prefilter=lambda line: False)
+
+        assert [c[0][0] for c in cl.recorder.call_args_list] == APRS_RECORDS
+
     def test_receive_loop_keepalive(self, mocker):
         sock = self._get_mocked_socket(mocker, True)
         with mocker.patch('socket.create_connection', return_value=sock):
@@ -166,6 +399,145 @@ class TestClient:
 
         assert cl._keepalive.call_count > 0
 
+    def _threaded_client(self, mocker):
+        sock = self._get_mocked_socket(mocker)
+        mocker.patch('socket.create_connection', return_value=sock)
+
+        cl = client.OgnClient('username')
+        cl.connect()
+        cl._sock_file.readline.side_effect = APRS_RECORDS + ['']
+        return cl
+
+    def test_receive_threaded(self, mocker):
+        cl = self._threaded_client(mocker)
+        received = []
+        cl.receive_threaded(received.append, reconnect=False,
+                            parser=lambda x: x.lower(), workers=2)
+
+        assert sorted(received) == sorted(r.lower() for r in APRS_RECORDS)
+        assert cl.queue_stats.received == 3
+        assert cl.queue_stats.processed == 3
+        assert cl.queue_stats.dropped == 0
+        assert cl.queue_stats.depth == 0
+
+    def test_receive_threaded_errors(self, mocker):
+        cl = self._threaded_client(mocker)
+        mocker.patch.object(client.message_log, 'report')
+
+        def callback(line):
+            if 'EDER' in line:
+                raise ValueError()
+
+        def parse(line):
+            if 'EDQE' in line:
+                raise exceptions.ParseError()
+            return line
+
+        mocker.patch.object(client.logger, 'exception')
+        cl.receive_threaded(callback, reconnect=False, parser=parse)
+
+        assert ([c[0][1] for c in client.message_log.report.call_args_list] ==
+                ['unparsed'])
+        assert client.logger.exception.call_count == 1
+        assert cl.queue_stats.processed == 3
+        assert cl.queue_stats.callback_errors == 1
+
+    def test_receive_threaded_drop_newest(self, mocker):
+        cl = self._threaded_client(mocker)
+        cl.receive_threaded(None, reconnect=False, workers=0, queue_size=1,
+                            overflow=client.OgnClient.OVERFLOW_DROP_NEWEST)
+
+        assert cl.queue_stats.dropped == 2
+        assert cl.queue_stats.max_depth == 1
+        assert cl.queue_stats._queue.get_nowait() == APRS_RECORDS[0]
+
+    def test_receive_threaded_drop_oldest(self, mocker):
+        cl = self._threaded_client(mocker)
+        cl.receive_threaded(None, reconnect=False, workers=0, queue_size=1,
+                            overflow=client.OgnClient.OVERFLOW_DROP_OLDEST)
+
+        assert cl.queue_stats.dropped == 2
+        assert cl.queue_stats._queue.get_nowait() == APRS_RECORDS[2]
+
+    def test_receive_threaded_overflow_unknown(self):
+        with pytest.raises(ValueError):
+            client.OgnClient('username').receive_threaded(None,
+                                                          overflow='unknown')
+
+    def _socket_client(self, mocker, lines, bulk_read=True):
+        left, right = socket.socketpair()
+        mocker.patch('socket.create_connection', return_value=left)
+        right.sendall(b'# aprsc 2.1.4-g408ed49\r\n'
+                      b'# logresp username unverified, server GLIDERN3\r\n')
+
+        cl = client.OgnClient('username', bulk_read=bulk_read)
+        cl.connect()
+        right.sendall(''.join(line + '\r\n' for line in lines).encode())
+        return cl, right
+
+    def _bulk_client(self, mocker, lines):
+        cl, server = self._socket_client(mocker, lines)
+        server.close()
+        return cl
+
+    @pytest.mark.parametrize('bulk_read', [False, True])
+    def test_receive_batch_interval_quiet(self, mocker, bulk_read):
+        cl, server = self._socket_client(mocker, APRS_RECORDS[:1], bulk_read)
+        batches = []
+
+        def callback(batch):
+            batches.append(batch)
+            cl.disconnect()
+
+        start = time.monotonic()
+        cl.receive(callback, reconnect=False, batch_interval=0.05)
+
+        # Delivered without further traffic and before the socket timeout
+        assert batches == [APRS_RECORDS[:1]]
+        assert time.monotonic() - start < 1
+        server.close()
+
+    def test_receive_bulk_raw(self, mocker):
+        cl = self._bulk_client(mocker, APRS_RECORDS + ['# server', ''])
+        received = []
+        cl.receive(received.append, reconnect=False)
+
+        assert received == APRS_RECORDS
+        assert not cl._authenticated
+
+    def test_receive_bulk_parse_many(self, mocker):
+        cl = self._bulk_client(mocker, APRS_RECORDS + ['invalid message'])
+        mocker.patch.object(client.message_log, 'report')
+        received = []
+        cl.receive(received.append, reconnect=False, parser=parser.Parser)
+
+        assert [r['raw'] for r in received] == APRS_RECORDS
+        assert client.message_log.report.call_count == 1
+
+    def test_receive_bulk_recorder(self, mocker):
+        cl = self._bulk_client(mocker, APRS_RECORDS + ['# server'])
+        cl.recorder = mocker.Mock()
+        cl.receive(lambda line: None, reconnect=False,
+                   prefilter=lambda line: False)
+
+        assert [c[0][0] for c in cl.recorder.call_args_list] == [
+            r.encode() for r in APRS_RECORDS]
+
+    def test_receive_bulk_parse(self, mocker):
+        cl = self._bulk_client(mocker, APRS_RECORDS)
+        received = []
+        cl.receive(received.append, reconnect=False, parser=str.lower)
+
+        assert received == [r.lower() for r in APRS_RECORDS]
+
+    def test_receive_bulk_prefilter(self, mocker):
+        cl = self._bulk_client(mocker, APRS_RECORDS)
+        received = []
+        cl.receive(received.append, reconnect=False,
+                   prefilter=lambda line: b'EDER' in line)
+
+        assert received == [APRS_RECORDS[1]]
+
     def test_send(self, mocker):
         cl = client.OgnClient('username')
         cl._socket = mocker.Mock()
@@ -288,6 +660,6 @@ class TestClient:
         sock_file.readline = mocker.MagicMock(side_effect=data)
 
         socket = mocker.MagicMock()
-        socket.makefile = mocker.MagicMock(return_value=sock_file)
+        mocker.patch('ogn_lib.reader.LineReader', return_value=sock_file)
 
         return socket
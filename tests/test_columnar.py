@@ -0,0 +1,143 @@
+import calendar
+import math
+import pytest
+from datetime import datetime
+
+from ogn_lib import parser
+from tests.test_parser import get_messages
+
+numpy = pytest.importorskip('numpy')
+columnar = pytest.importorskip('ogn_lib.columnar')
+
+
+def _close(a, b):
+    if b is None:
+        return math.isnan(a)
+
+    return abs(a - b) < 1e-9
+
+
+class TestDictionary:
+
+    def test_encode(self):
+        d = columnar.Dictionary()
+        assert d.encode('a') == 0
+        assert d.encode('b') == 1
+        assert d.encode('a') == 0
+        assert d.encode(None) == columnar.NO_CODE
+        assert len(d) == 2
+
+    def test_decode(self):
+        d = columnar.Dictionary()
+        codes = numpy.array([d.encode('a'), d.encode(None), d.encode('b')])
+        assert d.decode(codes) == ['a', None, 'b']
+
+
+class TestColumnarParser:
+
+    def test_parse_matches_parser(self):
+        messages = [m for m in get_messages() if 'TCPIP*' not in m]
+        reference = datetime.utcnow()
+
+        cp = columnar.ColumnarParser()
+        beacons = cp.parse(messages, reference=reference)
+        assert len(beacons) == len(messages)
+
+        for msg, row in zip(messages, beacons):
+            data = parser.Parser(msg)
+
+            assert cp.sources.values[row['from']] == data['from']
+            assert cp.receivers.values[row['receiver']] == data['receiver']
+            assert _close(row['latitude'], data['latitude'])
+            assert _close(row['longitude'], data['longitude'])
+            assert _close(row['altitude'], data['altitude'])
+            assert _close(row['heading'], data.get('heading'))
+            assert _close(row['ground_speed'], data.get('ground_speed'))
+            assert _close(row['vertical_speed'], data.get('vertical_speed'))
+
+            if msg.split(':')[1][7] == 'h':
+                assert (abs(row['timestamp'] -
+                            calendar.timegm(data['timestamp'].timetuple()))
+                        <= 1)
+
+            if 'aircraft_type' in data and 'uid' in data:
+                assert cp.uids.values[row['uid']] == data['uid']
+                assert row['aircraft_type'] == data['aircraft_type'].value
+                assert row['address_type'] == data['address_type'].value
+
+    def test_parse_matches_parser_generic_comment(self):
+        # Capturs does not parse the comments, so neither the third decimal
+        # nor the vertical speed is applied
+        messages = [m.replace('>OGFLR,', '>OGCAPT,') for m in get_messages()
+                    if '>OGFLR,' in m]
+
+        cp = columnar.ColumnarParser()
+        beacons = cp.parse(messages)
+        assert len(beacons) == len(messages)
+
+        for msg, row in zip(messages, beacons):
+            data = parser.Parser(msg)
+
+            assert _close(row['latitude'], data['latitude'])
+            assert _close(row['longitude'], data['longitude'])
+            assert _close(row['vertical_speed'], data.get('vertical_speed'))
+            assert row['uid'] == columnar.NO_CODE
+
+    def test_parse_invalid_comment(self):
+        failures = []
+        msg = [m for m in get_messages() if '>OGFLR,' in m][0]
+        beacons = columnar.ColumnarParser().parse(
+            [msg.replace(' id', ' idXY')], failures=failures)
+
+        assert len(beacons) == 0
+        assert len(failures) == 1
+
+    def test_parse_missing_id(self):
+        beacons = columnar.ColumnarParser().parse([
+            "FLRDDEEF1>OGCAPT,qAS,CAPTURS:/062744h4845.03N/00230.46E'000/000"])
+
+        assert beacons['uid'][0] == columnar.NO_CODE
+        assert beacons['aircraft_type'][0] == columnar.NO_TYPE
+        assert math.isnan(beacons['altitude'][0])
+        assert math.isnan(beacons['heading'][0])
+        assert math.isnan(beacons['vertical_speed'][0])
+
+    def test_parse_timestamp_rollover(self):
+        reference = datetime(2018, 4, 1, 0, 1, 0)
+        beacons = columnar.ColumnarParser().parse([
+            "FLRDDEEF1>OGCAPT,qAS,CAPTURS:/235959h4845.03N/00230.46E'000/000",
+            "FLRDDEEF1>OGCAPT,qAS,CAPTURS:/000030h4845.03N/00230.46E'000/000"],
+            reference=reference)
+
+        midnight = calendar.timegm(datetime(2018, 4, 1).timetuple())
+        assert list(beacons['timestamp']) == [midnight - 1, midnight + 30]
+
+    def test_parse_datetime_reference(self):
+        reference = datetime(2018, 4, 20, 12, 0, 0)
+        beacons = columnar.ColumnarParser().parse([
+            "FLRDDEEF1>OGCAPT,qAS,CAPTURS:/141200z4845.03N/00230.46E'000/000"],
+            reference=reference)
+
+        assert beacons['timestamp'][0] == calendar.timegm(
+            datetime(2018, 4, 14, 12, 0).timetuple())
+
+    def test_parse_failures(self):
+        failures = []
+        messages = get_messages(1)
+        beacons = columnar.ColumnarParser().parse(
+            ['invalid', messages[0],
+             'LKHS>APRS,TCPIP*,qAC,GLIDERN2:/211635h4902.45NI01429.51E&'],
+            failures=failures)
+
+        assert len(beacons) == 1
+        assert [f.index for f in failures] == [0, 2]
+
+    def test_parse_shared_dictionaries(self):
+        cp = columnar.ColumnarParser()
+        messages = get_messages(2)
+
+        first = cp.parse(messages[:1])
+        second = cp.parse(messages)
+
+        assert first['receiver'][0] == second['receiver'][0]
+        assert cp.receivers.decode(second['receiver']) == ['LFMX', 'Letzi']
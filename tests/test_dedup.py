@@ -0,0 +1,101 @@
+from ogn_lib import dedup, parser
+from tests.beacons import T0, beacon
+
+
+class TestDeduplicator:
+
+    def test_duplicates(self):
+        d = dedup.Deduplicator()
+        first = beacon()
+
+        assert d(first) is first
+        assert d(beacon(receiver='Letzi')) is None
+        assert d(beacon(seconds=1)) is not None
+        assert d(beacon(latitude=44.26)) is not None
+        assert d(beacon(source='FLRDDEF49')) is not None
+        assert d.hits == 1
+        assert d.misses == 4
+        assert d.hit_rate == 0.2
+
+    def test_no_position(self):
+        d = dedup.Deduplicator()
+        status = {'from': 'LFMX', 'timestamp': T0}
+
+        assert d(status) is status
+        assert d(status) is status
+        assert len(d) == 0
+
+    def test_receivers(self):
+        d = dedup.Deduplicator(collect_receivers=True)
+        first = beacon()
+
+        data, receivers = d(first)
+        assert data is first
+        assert d(beacon(receiver='Letzi', signal_to_noise_ratio=5.0)) is None
+        assert receivers == [('LFMX', 10.0), ('Letzi', 5.0)]
+
+    def test_ttl(self):
+        d = dedup.Deduplicator(ttl=10)
+        d(beacon())
+        d(beacon(source='FLRDDEF49', seconds=10))
+
+        assert len(d) == 2
+        d(beacon(source='FLRDDEF49', seconds=11))
+        assert len(d) == 2
+        assert d.evictions == 1
+        assert d(beacon()) is not None
+
+    def test_ttl_out_of_order(self):
+        d = dedup.Deduplicator(ttl=10)
+        d(beacon(seconds=5))
+        d(beacon(source='FLRDDEF49', seconds=0))  # received late
+        d(beacon(source='FLRDDEF49', seconds=12))
+
+        assert len(d) == 2
+        assert d.evictions == 1
+        assert d(beacon(source='FLRDDEF49', seconds=0)) is not None
+
+    def test_maxsize(self):
+        d = dedup.Deduplicator(maxsize=2)
+        for i in range(3):
+            d(beacon(seconds=i))
+
+        assert d.stats() == (0, 3, 1, 2, 2)
+        assert d(beacon(seconds=0)) is not None
+
+    def test_filter(self):
+        d = dedup.Deduplicator()
+        beacons = [beacon(), beacon(receiver='Letzi'), beacon(seconds=1)]
+
+        assert list(d.filter(beacons)) == [beacons[0], beacons[2]]
+
+    def test_parsed_messages(self):
+        messages = [
+            "FLRDDA5BA>APRS,qAS,LFMX:/165829h4415.41N/00600.03E'342/049/A=005"
+            "524 id0ADDA5BA -454fpm -1.1rot 8.8dB 0e +51.2kHz gps4x5",
+            "FLRDDA5BA>APRS,qAS,Letzi:/165829h4415.41N/00600.03E'342/049/A=00"
+            "5524 id0ADDA5BA -454fpm -1.1rot 5.1dB 0e +51.2kHz gps4x5",
+            "FLRDDA5BA>APRS,OGN123456*,qAS,LFMY:/165829h4415.41N/00600.03E'34"
+            "2/049/A=005524 id0ADDA5BA -454fpm -1.1rot 3.0dB 0e +51.2kHz"
+        ]
+        d = dedup.Deduplicator(collect_receivers=True)
+        unique = list(d.filter(parser.Parser.parse_many(messages)))
+
+        assert len(unique) == 1
+        assert unique[0][1] == [('LFMX', 8.8), ('Letzi', 5.1), ('LFMY', 3.0)]
+
+    def test_memory_usage(self):
+        d = dedup.Deduplicator()
+        empty = d.memory_usage()
+        d(beacon())
+
+        assert d.memory_usage() > empty
+
+    def test_clear(self):
+        d = dedup.Deduplicator()
+        d(beacon())
+        d(beacon())
+        d.clear()
+
+        assert len(d) == 0
+        assert d.stats() == (0, 0, 0, 0, 100000)
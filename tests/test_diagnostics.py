@@ -0,0 +1,116 @@
+import logging
+
+from ogn_lib import diagnostics, exceptions, parser
+
+
+logger = logging.getLogger('ogn_lib.tests.diagnostics')
+
+
+class TestRateLimitedLog:
+
+    def _log(self, mocker, **kwargs):
+        self.now = mocker.patch('time.monotonic', return_value=0)
+        return diagnostics.RateLimitedLog(logger, interval=60, **kwargs)
+
+    def test_first_logged(self, mocker, caplog):
+        log = self._log(mocker)
+        log.report(logging.WARNING, 'unknown-destto', 'OGXYZ', 'sample 1')
+
+        assert len(caplog.records) == 1
+        assert caplog.records[0].levelno == logging.WARNING
+        assert caplog.records[0].getMessage() == \
+            'unknown-destto message for OGXYZ: sample 1'
+
+    def test_repeated_aggregated(self, mocker, caplog):
+        log = self._log(mocker)
+        for i in range(5):
+            log.report(logging.WARNING, 'unknown-destto', 'OGXYZ',
+                       'sample {}'.format(i))
+
+        assert len(caplog.records) == 1
+
+        self.now.return_value = 60
+        log.report(logging.WARNING, 'unknown-destto', 'OGXYZ', 'sample 5')
+
+        assert len(caplog.records) == 2
+        assert caplog.records[1].getMessage() == \
+            ('4 unknown-destto messages for OGXYZ in the last 60s; '
+             'sample: sample 1')
+
+    def test_idle_key_forgotten(self, mocker, caplog):
+        log = self._log(mocker)
+        log.report(logging.WARNING, 'unknown-destto', 'OGXYZ', 'sample')
+
+        self.now.return_value = 60
+        log.report(logging.WARNING, 'unknown-destto', 'OGXYZ', 'sample')
+
+        assert len(caplog.records) == 2
+        assert caplog.records[1].getMessage().startswith('unknown-destto')
+
+    def test_keys_separate(self, mocker, caplog):
+        log = self._log(mocker)
+        log.report(logging.WARNING, 'unknown-destto', 'OGXYZ', 'sample')
+        log.report(logging.WARNING, 'unknown-destto', 'OGABC', 'sample')
+        log.report(logging.ERROR, 'unparseable', 'OGXYZ', 'sample')
+
+        assert len(caplog.records) == 3
+
+    def test_max_keys(self, mocker, caplog):
+        log = self._log(mocker, max_keys=2)
+        for i in range(10):
+            log.report(logging.WARNING, 'unknown-destto', str(i), 'sample')
+
+        assert len(caplog.records) == 3
+        assert len(log._entries) == 3
+
+        log.flush()
+        assert caplog.records[-1].getMessage().startswith(
+            '7 unknown-destto messages for *')
+
+    def test_flush(self, mocker, caplog):
+        log = self._log(mocker)
+        log.report(logging.WARNING, 'unknown-destto', 'OGXYZ', 'sample')
+        log.report(logging.WARNING, 'unknown-destto', 'OGXYZ', 'sample')
+
+        self.now.return_value = 30
+        log.flush()
+
+        assert caplog.records[-1].getMessage().startswith(
+            '1 unknown-destto messages for OGXYZ in the last 30s')
+        log.flush()
+        assert len(caplog.records) == 2
+
+    def test_exc_info(self, mocker, caplog):
+        log = self._log(mocker)
+        try:
+            raise ValueError('invalid')
+        except ValueError:
+            log.report(logging.ERROR, 'unparseable', 'ValueError', 'sample',
+                       exc_info=True)
+
+        assert caplog.records[0].exc_info[0] is ValueError
+
+
+class TestParserDiagnostics:
+
+    def test_unknown_destto_rate_limited(self, mocker):
+        mocker.patch.object(parser.ParserBase, 'default', parser.Parser)
+        mocker.patch.object(parser.message_log, 'report')
+        msg = ('FLRDD83BC>OGXYZ,qAS,EDLF:/163148h5124.56N/00634.42E\''
+               '276/075/A=001551')
+
+        parser.Parser(msg)
+
+        parser.message_log.report.assert_called_once_with(
+            logging.WARNING, 'unknown-destto', 'OGXYZ', msg)
+
+    def test_parse_error_not_logged(self, mocker):
+        # Parse errors are reported once, by the caller (e.g. OgnClient)
+        mocker.patch.object(parser.message_log, 'report')
+
+        try:
+            parser.Parser('FLR123456>APRS,')
+        except exceptions.ParseError as e:
+            assert e.__cause__ is not None
+
+        assert not parser.message_log.report.called
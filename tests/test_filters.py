@@ -0,0 +1,225 @@
+import math
+import random
+
+from ogn_lib import filters, parser
+from tests.test_parser import get_messages
+
+
+AIRCRAFT = ("FLRDDA5BA>APRS,qAS,LFMX:/165829h4415.41N/00600.03E'342/049/A="
+            "005524 id0ADDA5BA -454fpm -1.1rot 8.8dB 0e +51.2kHz gps4x5")
+RELAYED = ("ICA4B0E3A>APRS,OGN123456*,qAS,Letzi:/072319h4711.75N\\00802.59E^"
+           "327/149/A=006498 id154B0E3A -3959fpm +0.5rot 9.0dB 0e -6.3kHz")
+NAVITER = ("NAV07220E>OGNAVI,qAS,NAVITER:/140648h4550.36N/01314.85E'090/152/"
+           "A=001066 !W47! id1C4007220E +000fpm +0.0rot")
+SERVER = ('LKHS>APRS,TCPIP*,qAC,GLIDERN2:/211635h4902.45NI01429.51E&'
+          '000/000/A=001689')
+
+
+class TestHeaderFilter:
+
+    def test_accept_all(self):
+        f = filters.HeaderFilter()
+        assert all(map(f, [AIRCRAFT, RELAYED, NAVITER, SERVER]))
+
+    def test_sources(self):
+        f = filters.HeaderFilter(sources=['FLR', 'ICA'])
+        assert f(AIRCRAFT)
+        assert f(RELAYED)
+        assert not f(NAVITER)
+
+    def test_destto(self):
+        f = filters.HeaderFilter(destto=['OGNAVI'])
+        assert not f(AIRCRAFT)
+        assert f(NAVITER)
+
+    def test_receivers(self):
+        f = filters.HeaderFilter(receivers=['Letzi', 'NAVITER'])
+        assert not f(AIRCRAFT)
+        assert f(RELAYED)
+        assert f(NAVITER)
+
+    def test_combined(self):
+        f = filters.HeaderFilter(sources=['FLR'], destto=['APRS'],
+                                 receivers=['Letzi'])
+        assert not f(AIRCRAFT)
+        assert not f(RELAYED)
+
+    def test_servers(self):
+        assert filters.HeaderFilter(sources=['FLR'])(SERVER)
+        assert not filters.HeaderFilter(servers=False)(SERVER)
+
+    def test_binary(self):
+        f = filters.HeaderFilter(sources=['FLR', 'ICA'], receivers=['Letzi'],
+                                 binary=True)
+        assert not f(AIRCRAFT.encode())
+        assert f(RELAYED.encode())
+        assert f(SERVER.encode())
+        assert filters.HeaderFilter(destto=['OGNAVI'],
+                                    binary=True)(NAVITER.encode())
+
+    def test_incomplete_header(self):
+        assert not filters.HeaderFilter(destto=['APRS'])('FLRDDA5BA:/1658')
+        assert filters.HeaderFilter(destto=['APRS'])('FLRDDA5BA>APRS:/1658')
+        assert filters.HeaderFilter(destto=['APRS'])('FLRDDA5BA>APRS')
+        assert not filters.HeaderFilter(destto=['APR'])('FLRDDA5BA>APRS,qAS')
+        assert not filters.HeaderFilter(receivers=['APRS'])(
+            'FLRDDA5BA>APRS:/1658')
+        assert not filters.HeaderFilter(receivers=['EDE'])(
+            'FLRDDA5BA>APRS,qAS,EDER')
+
+    def test_only_header(self):
+        f = filters.HeaderFilter(receivers=['LFMX'])
+        assert not f('FLRDDA5BA>APRS,qAS,EDER:/165829h4415.41N,LFMX')
+
+
+def _positions():
+    for msg in get_messages():
+        match = parser.Parser.PATTERN_ALL.match(msg.strip('/'))
+        if match and match.group('latitude'):
+            yield (msg, parser.Parser._parse_location(match.group('latitude')),
+                   parser.Parser._parse_location(match.group('longitude')))
+
+
+class TestBoundingBoxFilter:
+
+    def test_box(self):
+        f = filters.BoundingBoxFilter([(44, 5, 45, 7)])
+        assert f(AIRCRAFT)
+        assert not f(RELAYED)
+        assert not f(NAVITER)
+
+    def test_multiple_boxes(self):
+        f = filters.BoundingBoxFilter([(44, 5, 45, 7), (45, 13, 46, 14)])
+        assert f(AIRCRAFT)
+        assert f(NAVITER)
+        assert not f(RELAYED)
+
+    def test_bounds(self):
+        # 4415.41N 00600.03E
+        lat = 44 + 15.41 / 60
+        lon = 6 + 0.03 / 60
+        assert filters.BoundingBoxFilter([(lat, lon, lat, lon)])(AIRCRAFT)
+        # Bounds are truncated to hundredths of a minute
+        step = 0.01 / 60
+        assert filters.BoundingBoxFilter(
+            [(lat + step / 2, lon, 45, 7)])(AIRCRAFT)
+        assert not filters.BoundingBoxFilter(
+            [(lat + step, lon, 45, 7)])(AIRCRAFT)
+        assert not filters.BoundingBoxFilter(
+            [(44, 5, 45, lon - step)])(AIRCRAFT)
+
+    def test_hemispheres(self):
+        msg = "FLRDDA5BA>APRS,qAS,LFMX:/165829h0015.41S/00100.03W'342/049"
+        assert filters.BoundingBoxFilter([(-1, -2, 1, 2)])(msg)
+        assert filters.BoundingBoxFilter([(-0.3, -1.1, -0.2, -1)])(msg)
+        assert not filters.BoundingBoxFilter([(0, -2, 1, 2)])(msg)
+        assert not filters.BoundingBoxFilter([(-1, 0, 1, 2)])(msg)
+        assert not filters.BoundingBoxFilter([(-0.2, -2, 0, 0)])(msg)
+
+    def test_binary(self):
+        f = filters.BoundingBoxFilter([(44, 5, 45, 7), (45, 13, 46, 14)],
+                                      binary=True)
+        assert f(AIRCRAFT.encode())
+        assert f(NAVITER.encode())
+        assert not f(RELAYED.encode())
+
+        msg = b"FLRDDA5BA>APRS,qAS,LFMX:/165829h0015.41S/00100.03W'342/049"
+        assert filters.BoundingBoxFilter([(-1, -2, 1, 2)], binary=True)(msg)
+        assert not filters.BoundingBoxFilter([(-1, 0, 1, 2)],
+                                             binary=True)(msg)
+
+    def test_no_colon(self):
+        assert not filters.GridFilter([(0, 0)])('FLRDDA5BA>APRS,qAS,LFMX')
+
+    def test_unpositioned(self):
+        msg = 'GLIDERN2>APRS,TCPIP*,qAC,GLIDERN2:>211635h v0.2.6.ARM'
+        assert not filters.BoundingBoxFilter([(-90, -180, 90, 180)])(msg)
+        assert filters.BoundingBoxFilter([], keep_unpositioned=True)(msg)
+
+    def test_covering_inclusive(self):
+        f = filters.GridFilter.covering(44, 5, 47, 14)
+        assert f("FLRDDA5BA>APRS,qAS,LFMX:/165829h4700.00N/01400.00E'342/049")
+        assert f("FLRDDA5BA>APRS,qAS,LFMX:/165829h4400.00N/00500.00E'342/049")
+
+        f = filters.GridFilter.covering(-10, -10, -9.5, -9.5)
+        assert f("FLRDDA5BA>APRS,qAS,LFMX:/165829h1000.00S/01000.00W'342/049")
+        assert f("FLRDDA5BA>APRS,qAS,LFMX:/165829h0930.00S/00930.00W'342/049")
+        assert not f(AIRCRAFT)
+
+    def test_matches_parsed(self):
+        rnd = random.Random(0)
+        positions = list(_positions())
+
+        for _ in range(200):
+            lats = sorted(rnd.randrange(-90 * 6000, 90 * 6000) / 6000
+                          for _ in range(2))
+            lons = sorted(rnd.randrange(-180 * 6000, 180 * 6000) / 6000
+                          for _ in range(2))
+            if rnd.random() < 0.5:  # boxes around the sample messages
+                _, lat, lon = rnd.choice(positions)
+                lats = [lat - rnd.random(), lat + rnd.random()]
+                lons = [lon - rnd.random(), lon + rnd.random()]
+
+            f = filters.BoundingBoxFilter([(lats[0], lons[0], lats[1],
+                                            lons[1])])
+            for msg, lat, lon in positions:
+                expected = (lats[0] - 1e-9 <= lat <= lats[1] + 1e-9 and
+                            lons[0] - 1e-9 <= lon <= lons[1] + 1e-9)
+                if (abs(lat - lats[0]) > 1e-3 and abs(lat - lats[1]) > 1e-3 and
+                        abs(lon - lons[0]) > 1e-3 and
+                        abs(lon - lons[1]) > 1e-3):
+                    assert f(msg) == expected
+
+
+class TestGridFilter:
+
+    def test_cells(self):
+        f = filters.GridFilter([(44, 6), (45, 13)])
+        assert f(AIRCRAFT)
+        assert f(NAVITER)
+        assert not f(RELAYED)
+
+    def test_negative_cells(self):
+        msg = "FLRDDA5BA>APRS,qAS,LFMX:/165829h0015.41S/00100.03W'342/049"
+        assert filters.GridFilter([(-1, -2)])(msg)
+        assert not filters.GridFilter([(0, -2), (-1, -1)])(msg)
+
+    def test_covering(self):
+        f = filters.GridFilter.covering(44.5, 5.5, 46.2, 13.1)
+        assert len(f._cells) == 3 * 9
+        assert f(AIRCRAFT)
+        assert f(NAVITER)
+        assert not f(RELAYED)
+
+    def test_matches_parsed(self):
+        positions = list(_positions())
+        for msg, lat, lon in positions:
+            if lat == int(lat) or lon == int(lon):
+                continue  # see GridFilter
+
+            cell = (math.floor(lat), math.floor(lon))
+            assert filters.GridFilter([cell])(msg)
+
+    def test_binary(self):
+        f = filters.GridFilter.covering(44.5, 5.5, 46.2, 13.1, binary=True)
+        assert f(AIRCRAFT.encode())
+        assert f(NAVITER.encode())
+        assert not f(RELAYED.encode())
+        assert not f(b'GLIDERN2>APRS,TCPIP*,qAC,GLIDERN2:>211635h v0.2.6')
+
+    def test_boundary(self):
+        msg = "FLRDDA5BA>APRS,qAS,LFMX:/165829h1000.00S/01000.00W'342/049"
+        assert filters.GridFilter([(-11, -11)])(msg)
+
+    def test_unpositioned(self):
+        msg = 'GLIDERN2>APRS,TCPIP*,qAC,GLIDERN2:>211635h v0.2.6.ARM'
+        assert not filters.GridFilter([(0, 0)])(msg)
+        assert filters.GridFilter([], keep_unpositioned=True)(msg)
+
+
+def test_all_of():
+    f = filters.all_of(filters.HeaderFilter(sources=['FLR']),
+                       filters.BoundingBoxFilter([(44, 5, 46, 14)]))
+    assert f(AIRCRAFT)
+    assert not f(NAVITER)
+    assert not f(RELAYED)
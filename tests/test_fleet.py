@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+from ogn_lib import fleet, parser
+from tests.beacons import T0, beacon
+
+
+class TestFleetState:
+
+    def test_update_get(self):
+        f = fleet.FleetState()
+        assert f.update(beacon())
+
+        state = f.get('0ADDA5BA')
+        assert state == fleet.AircraftState(
+            '0ADDA5BA', T0, 44.25, 6.0, 1000.0, 25.0, None, 342.0, 'LFMX')
+        assert '0ADDA5BA' in f
+        assert len(f) == 1
+        assert f.get('FLRDDA5BA') is None
+
+    def test_key_from(self):
+        f = fleet.FleetState(key='from')
+        f.update(beacon())
+        f.update(beacon(source='OGN123456', uid=None))
+
+        assert 'FLRDDA5BA' in f
+        assert 'OGN123456' in f
+
+        f = fleet.FleetState()
+        f.update(beacon(source='OGN123456', uid=None))
+        assert 'OGN123456' in f
+
+    def test_latest_state(self):
+        f = fleet.FleetState()
+        f.update(beacon(seconds=10, altitude=1200.0, receiver='Letzi'))
+        assert not f.update(beacon(seconds=5))
+        assert f.update(beacon(seconds=10, altitude=1300.0))
+
+        state = f.get('0ADDA5BA')
+        assert state.altitude == 1300.0
+        assert state.timestamp == T0 + timedelta(seconds=10)
+        assert len(f) == 1
+
+    def test_ignored(self):
+        f = fleet.FleetState()
+        assert not f.update({'from': 'LFMX', 'timestamp': T0})
+        assert not f.update({'from': 'LFMX', 'latitude': 44.0})
+        assert len(f) == 0
+
+    def test_ttl(self):
+        f = fleet.FleetState(ttl=60)
+        f.update(beacon())
+        f.update(beacon(uid='A', seconds=30))
+        f.update(beacon(uid='B', seconds=61))
+
+        assert '0ADDA5BA' not in f
+        assert 'A' in f
+        assert f.evictions == 1
+
+        # slot of the evicted aircraft is reused
+        f.update(beacon(uid='C', seconds=61))
+        assert len(f._times) == 3
+
+    def test_ttl_out_of_order(self):
+        f = fleet.FleetState(ttl=60)
+        f.update(beacon(uid='A', seconds=30))
+        f.update(beacon(uid='B', seconds=0))  # received late
+        f.update(beacon(uid='A', seconds=10))  # older than the known state
+        f.update(beacon(uid='C', seconds=61))
+
+        assert 'A' in f
+        assert 'B' not in f
+        assert f.evictions == 1
+
+        f.update(beacon(uid='C', seconds=91))
+        assert 'A' not in f
+
+    def test_evict(self):
+        f = fleet.FleetState(ttl=60)
+        f.update(beacon())
+        assert f.evict() == 0
+        assert f.evict(T0 + timedelta(seconds=61)) == 1
+        assert len(f) == 0
+
+    def test_snapshot(self):
+        f = fleet.FleetState()
+        f.update(beacon(uid='A'))
+        f.update(beacon(uid='B', seconds=1))
+        f.update(beacon(uid='A', seconds=2))
+
+        assert [s.key for s in f.snapshot()] == ['B', 'A']
+        assert [s.key for s in f] == ['B', 'A']
+
+    def test_clear(self):
+        f = fleet.FleetState()
+        f.update(beacon())
+        f.clear()
+
+        assert len(f) == 0
+        assert f.update(beacon())
+
+    def test_parsed(self):
+        f = fleet.FleetState()
+        f.update(parser.Parser(
+            "FLRDDA5BA>APRS,qAS,LFMX:/165829h4415.41N/00600.03E'342/049/A=005"
+            "524 id0ADDA5BA -454fpm -1.1rot 8.8dB 0e +51.2kHz gps4x5"))
+
+        state = f.get('0ADDA5BA')
+        assert state.receiver == 'LFMX'
+        assert abs(state.vertical_speed + 2.306) < 1e-3
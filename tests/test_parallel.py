@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+from ogn_lib import parallel, parser
+from tests.test_parser import get_messages
+
+
+@pytest.fixture
+def pparser():
+    with parallel.ParallelParser(processes=2, chunk_size=7) as p:
+        yield p
+
+
+class TestParallelParser:
+
+    def test_parse_many(self, pparser):
+        messages = get_messages()
+        expected = list(parser.Parser.parse_many(messages))
+
+        assert list(pparser.parse_many(messages)) == expected
+
+    def test_parse_many_failures(self, pparser):
+        messages = get_messages(10)
+        messages[3] = 'invalid'
+        failures = []
+
+        parsed = list(pparser.parse_many(messages + ['FLR>APRS,'], failures))
+
+        assert len(parsed) == 9
+        assert [f.index for f in failures] == [3, 10]
+        assert failures[0].raw == 'invalid'
+        assert failures[0].reason.startswith('ValueError')
+
+    def test_parse_many_prefilter(self, pparser):
+        messages = get_messages(20) + ['invalid']
+        failures = []
+
+        parsed = list(pparser.parse_many(messages, failures,
+                                         prefilter=lambda m: m != messages[2]))
+
+        assert [d['raw'] for d in parsed] == messages[:2] + messages[3:20]
+        assert [f.index for f in failures] == [20]
+
+    def test_parse_stream(self):
+        messages = get_messages(20)
+
+        with parallel.ParallelParser(processes=1, chunk_size=100,
+                                     max_delay=0) as p:
+            parsed = list(p.parse_stream(iter(messages)))
+
+        assert [d['raw'] for d in parsed] == messages
+
+    def test_parse_stream_idle(self):
+        messages = get_messages(2)
+        release = threading.Event()
+        released = []
+
+        def stream():
+            yield from messages
+            # No further input until the results are read
+            released.append(release.wait(5))
+
+        with parallel.ParallelParser(processes=1, chunk_size=100,
+                                     max_delay=0.05) as p:
+            parsed = p.parse_stream(stream())
+            first = [next(parsed)['raw'], next(parsed)['raw']]
+            release.set()
+            rest = list(parsed)
+
+        assert first == messages
+        assert rest == []
+        assert released == [True]
+
+    def test_parse_stream_input_error(self):
+        def stream():
+            yield from get_messages(2)
+            raise OSError()
+
+        with parallel.ParallelParser(processes=1) as p:
+            with pytest.raises(OSError):
+                list(p.parse_stream(stream()))
+
+    def test_projected(self):
+        messages = get_messages(10)
+        projected = parser.Parser.compile(['from', 'latitude'])
+
+        with parallel.ParallelParser(processes=1,
+                                     parser_=projected) as p:
+            parsed = list(p.parse_many(messages))
+
+        assert parsed == [projected(m) for m in messages]
+
+    def test_call(self):
+        msg = get_messages(1)[0]
+        assert parallel.ParallelParser()(msg) == parser.Parser(msg)
+
+    def test_close(self, pparser):
+        list(pparser.parse_many(get_messages(1)))
+        assert pparser._pool is not None
+
+        pparser.close()
+        assert pparser._pool is None
@@ -1,7 +1,7 @@
 import os
 import pytest
 from datetime import datetime, timedelta, time
-from ogn_lib import exceptions, parser, constants
+from ogn_lib import cache, exceptions, parser, constants
 
 
 def get_messages(n_messages=float('inf')):
@@ -106,6 +106,66 @@ class TestParserBase:
             with pytest.raises(exceptions.ParseError):
                 parser.ParserBase.__call__('FLR123456>APRS,')
 
+    def test_parse_many(self):
+        messages = get_messages()
+        parsed = list(parser.Parser.parse_many(messages))
+
+        assert len(parsed) == len(messages)
+        for msg, data in zip(messages, parsed):
+            assert data['raw'] == msg
+
+    def test_parse_many_lazy(self, mocker):
+        mocker.spy(parser.APRS, 'parse_message')
+        results = parser.Parser.parse_many(get_messages(3))
+
+        parser.APRS.parse_message.assert_not_called()
+        next(results)
+        assert parser.APRS.parse_message.call_count == 1
+
+    def test_parse_many_dispatch(self, mocker):
+        class Callsign(parser.Parser):
+            __destto__ = 'CALLMANY'
+
+            parse_message = mocker.Mock()
+
+        msg = ('FLRDD83BC>CALLMANY,qAS,EDLF:/163148h5124.56N/00634.42E\''
+               '276/075/A=001551')
+        list(parser.Parser.parse_many([msg, msg]))
+
+        assert Callsign.parse_message.call_count == 2
+
+    def test_parse_many_failures(self):
+        messages = get_messages(2)
+        failures = []
+        parsed = list(parser.Parser.parse_many(
+            [messages[0], 'invalid message', messages[1], 'FLR>APRS,'],
+            failures=failures))
+
+        assert [d['raw'] for d in parsed] == messages
+        assert [f.index for f in failures] == [1, 3]
+        assert failures[0].raw == 'invalid message'
+        assert failures[0].reason.startswith('ValueError')
+        assert failures[1].reason.startswith('ParseError')
+
+    def test_parse_many_prefilter(self):
+        messages = get_messages(3)
+        failures = []
+        parsed = list(parser.Parser.parse_many(
+            messages + ['invalid'], failures,
+            prefilter=lambda m: m != messages[1]))
+
+        assert [d['raw'] for d in parsed] == [messages[0], messages[2]]
+        assert [f.index for f in failures] == [3]
+
+    def test_parse_many_no_parser(self):
+        parser.ParserBase.default = None
+        failures = []
+        msg = ('FLRDD83BC>APRS-1,qAS,EDLF:/163148h5124.56N/00634.42E\''
+               '276/075/A=001551')
+
+        assert list(parser.Parser.parse_many([msg], failures)) == []
+        assert failures[0].reason.startswith('ParserNotFoundError')
+
 
 class TestParser:
     messages = get_messages()
@@ -166,6 +226,63 @@ class TestParser:
     def test_pattern_all_matches_all(self):
         self._test_matches_all(parser.Parser.PATTERN_ALL)
 
+    def test_scan_message_matches_pattern(self):
+        for msg in self.messages:
+            fields = parser.Parser._scan_message(msg)
+            if fields is None:
+                continue
+
+            match = parser.Parser.PATTERN_ALL.match(msg)
+            assert fields == match.group(*parser.Parser.PATTERN_FIELDS)
+
+    def test_scan_message_aircraft(self):
+        for msg in self.messages:
+            if 'TCPIP*' not in msg:
+                assert parser.Parser._scan_message(msg) is not None
+
+    def test_scan_message_fields(self):
+        fields = parser.Parser._scan_message(self.message)
+        expected = dict(self.expected_matches,
+                        protocol_specific='id0ADDA5BA -454fpm -1.1rot 8.8dB '
+                                          '0e+51.2kHz gps4x5')
+
+        assert fields == tuple(expected[f]
+                               for f in parser.Parser.PATTERN_FIELDS)
+
+    def test_scan_message_optional_fields(self):
+        fields = parser.Parser._scan_message(
+            "FLRDDEEF1>OGCAPT,qAS,CAPTURS:/062744h4845.03N/00230.46E'")
+        assert fields[6:] == (None, None, None, None)
+
+        fields = parser.Parser._scan_message(
+            "FLRDDDD33>APRS,qAS,LFNF:/165341h4344.27N/00547.41E'/A=000886")
+        assert fields[6:] == (None, None, '000886', None)
+
+    def test_scan_message_rejected(self):
+        for msg in ['invalid message',
+                    'FLRDDDD33>APRS,qAS,LFNF:/165341h4344.27N/00547.41E',
+                    "FLRDDDD33>APRS,qAS,LFNF:/1653a1h4344.27N/00547.41E'",
+                    "FLRDDDD33>APRS,qAS,LFNF:/165341h4344.27N/00547.41E'/",
+                    "FLR>DDD33>APRS,qAS,LFNF:/165341h4344.27N/00547.41E'",
+                    "FLRDDDD33>APRS,qAS,LF:NF:/165341h4344.27N/00547.41E'",
+                    "FLRDDDD33>APRS,qAS,LFNF:/165341h4344.27N/00547.41E'\n"]:
+            assert parser.Parser._scan_message(msg) is None
+
+    def test_match_message_fallback(self, mocker):
+        mocker.patch('ogn_lib.parser.Parser._scan_message', return_value=None)
+
+        fields = parser.Parser._match_message(self.message)
+        assert fields[0] == 'FLRDDA5BA'
+        assert parser.Parser._scan_message.call_count == 1
+
+    def test_match_message_no_fast_scan(self, mocker):
+        mocker.spy(parser.Parser, '_scan_message')
+        parser.ServerParser._match_message(
+            'LKHS>APRS,TCPIP*,qAC,GLIDERN2:/211635h4902.45NI01429.51E&'
+            '000/000/A=001689')
+
+        parser.Parser._scan_message.assert_not_called()
+
     def test_parse_msg_no_match(self):
         with pytest.raises(exceptions.ParseError):
             parser.Parser.parse_message('invalid message')
@@ -210,18 +327,17 @@ class TestParser:
 
         assert data['raw'] == msg
 
-    def test_parse_msg_delete_update(self, mocker):
+    def test_parse_msg_third_decimal(self, mocker):
         msg = ('NAV07220E>OGNAVI,qAS,NAVITER:/125447h4557.77N/01220.19E\'258/'
                '056/A=006562 !W76! id1C4007220E +180fpm +0.0rot')
 
-        data = {'_update': [{'target': 'key', 'function': lambda x: x}]}
-
         mocker.patch('ogn_lib.parser.Parser._parse_protocol_specific',
-                     return_value=data)
-        mocker.patch('ogn_lib.parser.Parser._update_data')
+                     return_value={'_third_decimal': (7, 6)})
 
-        parser.Parser.parse_message(msg)
-        assert parser.Parser._update_data.call_count == 1
+        data = parser.Parser.parse_message(msg)
+        assert '_third_decimal' not in data
+        assert abs(data['latitude'] - (45 + 57.777 / 60)) < 1e-9
+        assert abs(data['longitude'] - (12 + 20.196 / 60)) < 1e-9
 
     def test_parse_msg_comment(self, mocker):
         mocker.patch('ogn_lib.parser.Parser._parse_protocol_specific',
@@ -314,6 +430,26 @@ class TestParser:
 
         assert (parsed - now).total_seconds() < 60
 
+    def test_string_pool(self, mocker):
+        mocker.patch.object(parser.Parser, 'string_pool', cache.InternPool())
+        msg = ("FLRDDA5BA>APRS,qAS,LFMX:/165829h4415.41N/00600.03E'342/049/A="
+               "005524 id0ADDA5BA -454fpm -1.1rot 8.8dB 0e +51.2kHz gps4x5")
+
+        parser.APRS.id_cache.clear()
+        first = parser.Parser(msg)
+        parser.APRS.id_cache.clear()
+        second = parser.Parser((msg + ' ')[:-1])
+
+        for key in ('from', 'destto', 'receiver', 'uid'):
+            assert first[key] is second[key]
+
+    def test_string_pool_relayer(self, mocker):
+        mocker.patch.object(parser.Parser, 'string_pool', cache.InternPool())
+        relayer = ''.join(['OGN', '123456'])
+
+        data = parser.Parser._parse_digipeaters('OGN123456*,qAS,LFMX')
+        assert parser.Parser.string_pool.intern(relayer) is data['relayer']
+
     def test_parse_location_sign(self):
         assert parser.Parser._parse_location('0100.00N') >= 0
         assert parser.Parser._parse_location('00100.00E') >= 0
@@ -329,6 +465,16 @@ class TestParser:
     def test_parse_protocol_specific(self):
         assert parser.Parser._parse_protocol_specific("1 2 3 4") == {}
 
+    def test_parse_protocol_specific_rate_limited(self, mocker):
+        mocker.patch.object(parser.message_log, 'report')
+        mocker.patch.object(parser.logger, 'warning')
+
+        for _ in range(4):
+            parser.Parser._parse_protocol_specific("1 2 3 4")
+
+        assert parser.message_log.report.call_count == 4
+        parser.logger.warning.assert_not_called()
+
     def test_conv_fpm_to_ms(self):
         assert abs(parser.Parser._convert_fpm_to_ms('+123fpm') - 0.624) < 0.01
         assert abs(abs(parser.Parser._convert_fpm_to_ms('-123fpm')) - 0.624) < 0.01
@@ -337,10 +483,6 @@ class TestParser:
         assert parser.Parser._convert_fpm_to_ms('+123fpm') > 0
         assert parser.Parser._convert_fpm_to_ms('-123fpm') < 0
 
-    def test_get_location_update_func(self):
-        fn = parser.Parser._get_location_update_func(0)
-        assert 1 == fn(1)
-
     def test_update_location_decimal_same(self):
         existing = 1
         new = parser.Parser._update_location_decimal(existing, 0)
@@ -362,25 +504,58 @@ class TestParser:
             parser.Parser(msg)
             parser.APRS.parse_message.assert_called_once_with(msg)
 
-    def test_update_data(self):
-        updates = [
-            {'target': 'key1', 'function': lambda x: 0},
-            {'target': 'key2', 'function': lambda x: x - 1}
-        ]
-        data = {
-            'key1': 1,
-            'key2': 2
-        }
 
-        assert parser.Parser._update_data(data, updates) == {
-            'key1': 0,
-            'key2': 1
-        }
+class TestTokenTable:
+
+    def _table(self, calls):
+        def handler(name):
+            return lambda parser, data, field: calls.append((name, field))
+
+        return parser.TokenTable([
+            ('enclosed', parser.TokenTable.ENCLOSED, '!', handler('enclosed')),
+            ('prefix', parser.TokenTable.PREFIX, 'ab', handler('prefix')),
+            ('suffix', parser.TokenTable.SUFFIX, 'yz', handler('suffix')),
+            ('short', parser.TokenTable.PREFIX, 'a', handler('short'))
+        ])
 
-    def test_update_data_missing(self):
-        # following should pass:
-        parser.Parser._update_data({}, [{'target': 'key',
-                                         'function': lambda x: x}])
+    def test_parse(self):
+        calls = []
+        self._table(calls).parse(None, '!W12! abc xyz ac  other')
+
+        assert calls == [('enclosed', '!W12!'), ('prefix', 'abc'),
+                         ('suffix', 'xyz'), ('short', 'ac')]
+
+    def test_parse_priority(self):
+        calls = []
+        self._table(calls).parse(None, 'abyz ayz')
+
+        assert calls == [('prefix', 'abyz'), ('suffix', 'ayz')]
+
+    def test_parse_cached(self):
+        calls = []
+        table = self._table(calls)
+        table.parse(None, 'abc')
+        table.parse(None, 'abc !x!')
+
+        assert calls == [('prefix', 'abc')] * 2 + [('enclosed', '!x!')]
+        assert set(table._candidates) == {'ac', '!!'}
+
+    def test_select(self):
+        calls = []
+        table = self._table(calls).select('suffix', 'short')
+        table.parse(None, 'abc !W12! xyz')
+
+        assert calls == [('short', 'abc'), ('suffix', 'xyz')]
+
+    def test_handle(self):
+        calls = []
+        self._table(calls).handle('suffix', None, {}, 'abc')
+
+        assert calls == [('suffix', 'abc')]
+
+    def test_third_decimal(self):
+        data = parser.COMMENT_TOKENS.parse(parser.APRS, '!W12! !W01!')
+        assert data == {'_third_decimal': (1, 3)}
 
 
 class TestAPRS:
@@ -389,10 +564,8 @@ class TestAPRS:
         msg = ('!W12! id06DF0A52 +020fpm +0.0rot FL000.00 55.2dB 0e -6.2kHz'
                ' gps4x6 s6.01 h03 rDDACC4 +5.0dBm hearD7EA hearDA95')
         data = parser.APRS._parse_protocol_specific(msg)
-        assert len(data['_update']) == 2
-        assert (set(map(lambda x: x['target'], data['_update'])) ==
-                {'latitude', 'longitude'})
-        del data['_update']
+        assert data['_third_decimal'] == (1, 2)
+        del data['_third_decimal']
 
         assert abs(data['vertical_speed'] - 0.1016) < 0.01
         del data['vertical_speed']
@@ -426,6 +599,31 @@ class TestAPRS:
         assert data['aircraft_type'] is constants.AirplaneType.glider
         assert data['address_type'] is constants.AddressType.flarm
 
+    def test_parse_id_string_cached(self):
+        parser.APRS.id_cache.clear()
+
+        data = parser.APRS._parse_id_string('06DF0A52')
+        assert parser.APRS._parse_id_string('06DF0A52') is data
+        assert parser.APRS.id_cache.stats()[:2] == (1, 1)
+
+        with pytest.raises(TypeError):
+            data['uid'] = 'other'
+
+    def test_parse_id_string_invalid(self):
+        with pytest.raises(ValueError):
+            parser.APRS._parse_id_string('38DF0A52')  # aircraft type 14
+
+        assert '38DF0A52' not in parser.APRS.id_cache
+
+    def test_flag_table(self):
+        for flags, decoded in enumerate(parser.APRS.FLAG_TABLE):
+            try:
+                expected = parser.APRS._decode_flags(flags)
+            except ValueError:
+                expected = None
+
+            assert decoded == expected
+
     def test_registered(self, mocker):
         mocker.spy(parser.APRS, '_parse_protocol_specific')
         parser.Parser("FLRDDA5BA>APRS,qAS,LFMX:/165829h4415.41N/00600.03E'342/"
@@ -440,10 +638,8 @@ class TestNaviter:
     def test_parse_protocol_specific(self):
         msg = '!W76! id1C4007220E +180fpm +0.0rot'
         data = parser.Naviter._parse_protocol_specific(msg)
-        assert len(data['_update']) == 2
-        assert (set(map(lambda x: x['target'], data['_update'])) ==
-                {'latitude', 'longitude'})
-        del data['_update']
+        assert data['_third_decimal'] == (7, 6)
+        del data['_third_decimal']
 
         assert abs(data['vertical_speed'] - 0.9144) < 0.01
         del data['vertical_speed']
@@ -467,6 +663,11 @@ class TestNaviter:
         assert data['aircraft_type'] is constants.AirplaneType.paraglider
         assert data['address_type'] is constants.AddressType.naviter
 
+    def test_parse_id_string_cached(self):
+        data = parser.Naviter._parse_id_string('1C4007220E')
+        assert parser.Naviter._parse_id_string('1C4007220E') is data
+        assert '1C4007220E' in parser.Naviter.id_cache
+
     def test_registered(self, mocker):
         mocker.spy(parser.Naviter, '_parse_protocol_specific')
         parser.Parser("NAV04220E>OGNAVI,qAS,NAVITER:/140748h4552.27N/01155.61E"
@@ -587,8 +788,7 @@ class TestFanet:
 
         assert data['id'] == 'id1E1103CE'
         assert abs(data['vertical_speed'] - 0.9144) < 0.01
-        assert (list(map(lambda x: x['target'], data['_update'])) ==
-                ['latitude', 'longitude'])
+        assert data['_third_decimal'] == (3, 0)
 
     def test_parse_protocol_specific_fail(self):
         with pytest.raises(exceptions.ParseError):
@@ -652,3 +852,99 @@ class TestServerParser:
         data = parser.ServerParser.parse_message(msg)
 
         assert data['comment'] == 'comment'
+
+
+class TestProjectedParser:
+    messages = get_messages()
+
+    def _test_matches_parser(self, fields):
+        projected = parser.Parser.compile(fields)
+
+        for msg in self.messages:
+            expected = parser.Parser(msg)
+            assert projected(msg) == {k: v for k, v in expected.items()
+                                      if k in fields}
+
+    def test_position(self):
+        self._test_matches_parser({'from', 'timestamp', 'latitude',
+                                   'longitude'})
+
+    def test_header(self):
+        self._test_matches_parser({'destto', 'beacon_type', 'raw',
+                                   'altitude', 'receiver', 'relayer',
+                                   'heading', 'ground_speed'})
+
+    def test_comment(self):
+        self._test_matches_parser({'latitude', 'longitude', 'uid',
+                                   'vertical_speed', 'comment'})
+
+    def test_skips_unused(self, mocker):
+        mocker.spy(parser.Parser, '_parse_digipeaters')
+        mocker.spy(parser.Parser, '_parse_heading_speed')
+        mocker.spy(parser.APRS, '_parse_protocol_specific')
+
+        projected = parser.Parser.compile(['latitude', 'longitude'])
+        data = projected("FLRDDA5BA>APRS,qAS,LFMX:/165829h4415.41N/00600.03E"
+                         "'342/049/A=005524 !W12! id0ADDA5BA -454fpm")
+
+        assert parser.Parser._parse_digipeaters.call_count == 0
+        assert parser.Parser._parse_heading_speed.call_count == 0
+        assert parser.APRS._parse_protocol_specific.call_count == 0
+        assert abs(data['latitude'] - (44 + 15.411 / 60)) < 1e-9
+        assert abs(data['longitude'] - (6 + 0.032 / 60)) < 1e-9
+
+    def test_call_failed(self):
+        with pytest.raises(exceptions.ParseError):
+            parser.Parser.compile(['from'])('FLR123456>APRS,')
+
+    def test_invalid_time(self):
+        msg = ("FLRDDA5BA>APRS,qAS,LFMX:/256829h4415.41N/00600.03E"
+               "'342/049/A=005524 id0ADDA5BA -454fpm")
+
+        with pytest.raises(exceptions.ParseError):
+            parser.Parser(msg)
+        with pytest.raises(exceptions.ParseError):
+            parser.Parser.compile(['from'])(msg)
+
+    def test_invalid_comment_lenient(self):
+        # The comment is only parsed if its fields are requested
+        msg = ("FLRDDA5BA>APRS,qAS,LFMX:/165829h4415.41N/00600.03E"
+               "'342/049/A=005524 idZZ -454fpm")
+
+        with pytest.raises(exceptions.ParseError):
+            parser.Parser(msg)
+        with pytest.raises(exceptions.ParseError):
+            parser.Parser.compile(['from', 'uid'])(msg)
+        assert parser.Parser.compile(['from'])(msg) == {'from': 'FLRDDA5BA'}
+
+    def test_parse_many(self):
+        failures = []
+        projected = parser.Parser.compile(['from'])
+        parsed = list(projected.parse_many(self.messages[:2] + ['invalid'],
+                                           failures))
+
+        assert parsed == [{'from': m.split('>')[0]}
+                          for m in self.messages[:2]]
+        assert [f.index for f in failures] == [2]
+
+
+class TestScanThirdDecimal:
+
+    def test_scan(self):
+        assert parser.APRS._scan_third_decimal('!W12! id123') == (1, 2)
+        assert parser.APRS._scan_third_decimal('id123 !W34!') == (3, 4)
+
+    def test_scan_sum(self):
+        assert parser.APRS._scan_third_decimal('!W12! !W34!') == (4, 6)
+        assert (parser.APRS._scan_third_decimal('!W12! !W34!') ==
+                parser.APRS._parse_protocol_specific(
+                    '!W12! !W34!')['_third_decimal'])
+
+    def test_scan_missing(self):
+        assert parser.APRS._scan_third_decimal('id123') is None
+        assert parser.APRS._scan_third_decimal('x!W12!') is None
+        assert parser.APRS._scan_third_decimal('!Wab!') is None
+
+    def test_scan_unused(self):
+        assert parser.Parser._scan_third_decimal('!W12! id123') is None
+        assert parser.Spot._scan_third_decimal('!W12! id123') is None
@@ -0,0 +1,86 @@
+import socket
+
+import pytest
+
+from ogn_lib import reader
+
+
+@pytest.fixture
+def sockets():
+    left, right = socket.socketpair()
+    yield left, right
+    left.close()
+    right.close()
+
+
+class TestLineReader:
+
+    def test_read_lines(self, sockets):
+        left, right = sockets
+        r = reader.LineReader(left)
+
+        right.sendall(b'first\r\nsecond\r\n\r\nthi')
+        assert r.read_lines() == [b'first', b'second', b'']
+
+        right.sendall(b'rd\r\n')
+        assert r.read_lines() == [b'third']
+
+    def test_read_lines_partial(self, sockets):
+        left, right = sockets
+        r = reader.LineReader(left)
+
+        right.sendall(b'partial')
+        assert r.read_lines() == []
+        right.sendall(b' line\n')
+        assert r.read_lines() == [b'partial line']
+
+    def test_read_lines_eof(self, sockets):
+        left, right = sockets
+        r = reader.LineReader(left)
+
+        right.sendall(b'line\n')
+        right.close()
+        assert r.read_lines() == [b'line']
+        assert r.read_lines() is None
+
+    def test_compact(self, sockets):
+        left, right = sockets
+        r = reader.LineReader(left, buffer_size=16)
+
+        right.sendall(b'0123456789\n0123')
+        assert r.read_lines() == [b'0123456789']
+        right.sendall(b'456789\n')
+        assert r.read_lines() == []  # buffer was full
+        assert r.read_lines() == [b'0123456789']
+        assert len(r._buffer) == 16
+
+    def test_grow(self, sockets):
+        left, right = sockets
+        r = reader.LineReader(left, buffer_size=4)
+
+        right.sendall(b'0123456789\n')
+        lines = []
+        while not lines:
+            lines = r.read_lines()
+
+        assert lines == [b'0123456789']
+        assert len(r._buffer) == 16
+
+    def test_readline(self, sockets):
+        left, right = sockets
+        r = reader.LineReader(left)
+
+        right.sendall(b'# login\r\nFLR1\nFLR2\n')
+        assert r.readline() == '# login\r\n'
+        assert r.read_lines() == [b'FLR1', b'FLR2']
+
+        right.close()
+        assert r.readline() == ''
+
+    def test_close(self, sockets):
+        left, right = sockets
+        r = reader.LineReader(left)
+        r.close()
+
+        assert len(r._buffer) == 0
+        assert left.fileno() != -1
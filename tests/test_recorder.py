@@ -0,0 +1,144 @@
+import gzip
+import lzma
+import os
+import time
+
+import pytest
+
+from ogn_lib import recorder
+
+
+def read(path):
+    open_ = {'.gz': gzip.open, '.xz': lzma.open}.get(
+        os.path.splitext(path)[1], open)
+    with open_(path, 'rb') as f:
+        return f.read().decode().splitlines()
+
+
+class TestRecorder:
+
+    def test_record(self, tmpdir, mocker):
+        mocker.patch('time.time', return_value=1514808000.5)
+        with recorder.Recorder(str(tmpdir)) as r:
+            r('FLRDDA5BA>APRS,qAS,LFMX:/165829h4415.41N/00600.03E')
+            r(b'FLRDDEF49>APRS,qAS,EDQE:/075201h4947.60N/01107.66E')
+
+        path, = r.files
+        assert os.path.basename(path) == 'ogn-20180101-120000.log'
+        assert read(path) == [
+            '1514808000.500 FLRDDA5BA>APRS,qAS,LFMX:/165829h4415.41N/'
+            '00600.03E',
+            '1514808000.500 FLRDDEF49>APRS,qAS,EDQE:/075201h4947.60N/'
+            '01107.66E']
+        assert r.recorded == 2
+
+    @pytest.mark.parametrize('compression', ['gzip', 'lzma'])
+    def test_compression(self, tmpdir, compression):
+        with recorder.Recorder(str(tmpdir), compression=compression) as r:
+            for i in range(100):
+                r('message {}'.format(i))
+
+        path, = r.files
+        lines = read(path)
+        assert len(lines) == 100
+        assert lines[-1].endswith(' message 99')
+
+    def test_unknown_compression(self, tmpdir):
+        with pytest.raises(ValueError):
+            recorder.Recorder(str(tmpdir), compression='zip')
+
+    def test_rotate_hourly(self, tmpdir, mocker):
+        times = iter([1514811599.0, 1514811599.9, 1514811600.0])
+        mocker.patch('time.time', side_effect=lambda: next(times))
+        with recorder.Recorder(str(tmpdir)) as r:
+            for i in range(3):
+                r('message {}'.format(i))
+
+        assert [os.path.basename(p) for p in r.files] == [
+            'ogn-20180101-125959.log', 'ogn-20180101-130000.log']
+        assert len(read(r.files[0])) == 2
+        assert len(read(r.files[1])) == 1
+
+    def test_rotate_size(self, tmpdir, mocker):
+        mocker.patch('time.time', return_value=1514808000.0)
+        # every line has 26 bytes
+        with recorder.Recorder(str(tmpdir), max_bytes=60,
+                               hourly=False) as r:
+            for i in range(5):
+                r('message {}'.format(i))
+
+        assert [os.path.basename(p) for p in r.files] == [
+            'ogn-20180101-120000.log', 'ogn-20180101-120000-1.log',
+            'ogn-20180101-120000-2.log']
+        assert [len(read(p)) for p in r.files] == [2, 2, 1]
+
+    def test_max_pending(self, tmpdir):
+        r = recorder.Recorder(str(tmpdir), max_pending=2, flush_interval=10)
+        for i in range(5):
+            r('message')
+        r.close()
+
+        assert r.dropped == 3
+        assert r.recorded == 2
+
+    def _failing_open(self, failures):
+        def open_(path, mode):
+            if failures:
+                raise failures.pop()
+            return open(path, mode)
+        return open_
+
+    def test_open_failed_retried(self, tmpdir, mocker):
+        mocker.patch.dict(recorder.COMPRESSION, {
+            None: (self._failing_open([OSError()]), '')})
+
+        with recorder.Recorder(str(tmpdir), flush_interval=0.01) as r:
+            for i in range(3):
+                r('message {}'.format(i))
+            for _ in range(100):
+                if r.recorded == 3:
+                    break
+                time.sleep(0.01)
+
+        path, = r.files
+        assert [line.split(' ', 1)[1] for line in read(path)] == [
+            'message 0', 'message 1', 'message 2']
+        assert r.dropped == 0
+
+    def test_write_failed_retried(self, tmpdir, mocker):
+        files = []
+
+        def open_(path, mode):
+            f = open(path, mode)
+            if not files:
+                f.write = mocker.Mock(side_effect=OSError)
+            files.append(f)
+            return f
+
+        mocker.patch.dict(recorder.COMPRESSION, {None: (open_, '')})
+        mocker.patch('time.time', return_value=1514808000.0)
+
+        with recorder.Recorder(str(tmpdir), max_bytes=60,
+                               flush_interval=0.01) as r:
+            for i in range(3):
+                r('message {}'.format(i))
+            for _ in range(100):
+                if r.recorded == 3:
+                    break
+                time.sleep(0.01)
+
+        assert r.recorded == 3
+        assert [len(read(p)) for p in r.files] == [0, 2, 1]
+
+    def test_failed_dropped_on_close(self, tmpdir, mocker):
+        mocker.patch.dict(recorder.COMPRESSION, {
+            None: (self._failing_open([OSError()]), '')})
+
+        r = recorder.Recorder(str(tmpdir), flush_interval=10)
+        for i in range(3):
+            r('message')
+        r.close()
+
+        assert r.recorded == 0
+        assert r.dropped == 3
+        assert r.files == []
@@ -0,0 +1,188 @@
+import pytest
+from ogn_lib import constants, exceptions, parser, records
+from tests.test_parser import get_messages
+
+
+AIRCRAFT_MSG = ("FLRDD98C6>OGFLR,qAS,LIDH:/115054h4543.21N/01132.80E'255/074/A="
+                "002535 !W83! id0ADD98C6 +158fpm -1.8rot 10.5dB 0e -0.8kHz "
+                "gps2x3 s6.09 h02")
+
+SERVER_MSG = ('LKHS>APRS,TCPIP*,qAC,GLIDERN2:/211635h4902.45NI01429.51E&'
+              '000/000/A=001689')
+
+STATUS_MSG = ('LKHS>APRS,TCPIP*,qAC,GLIDERN2:/211635h v0.2.6.ARM CPU:0.2 '
+              'RAM:777.7/972.2MB NTP:3.1ms/-3.8ppm')
+
+
+class TestBeacon:
+
+    def test_from_dict_type(self):
+        assert isinstance(records.Beacon.from_dict(parser.Parser(AIRCRAFT_MSG)),
+                          records.AircraftBeacon)
+        assert isinstance(records.Beacon.from_dict(parser.Parser(SERVER_MSG)),
+                          records.ServerBeacon)
+        assert isinstance(records.Beacon.from_dict(parser.Parser(STATUS_MSG)),
+                          records.ServerStatus)
+
+    def test_equal_to_dict(self):
+        for msg in get_messages():
+            data = parser.Parser(msg)
+            record = records.Beacon.from_dict(data)
+
+            assert record == data
+            assert record.to_dict() == data
+            assert set(record.keys()) == set(data.keys())
+            assert len(record) == len(data)
+
+    def test_no_dict(self):
+        record = records.Beacon.from_dict(parser.Parser(AIRCRAFT_MSG))
+
+        with pytest.raises(AttributeError):
+            record.__dict__
+
+    def test_attributes(self):
+        record = records.Beacon.from_dict(parser.Parser(AIRCRAFT_MSG))
+
+        assert record.from_ == 'FLRDD98C6'
+        assert record['from'] == 'FLRDD98C6'
+        assert record.aircraft_type is constants.AirplaneType.tow_plane
+        assert record.gps_quality.horizontal == 2
+        assert record['gps_quality'] == {'horizontal': 2, 'vertical': 3}
+
+    def test_missing_key(self):
+        record = records.Beacon.from_dict(parser.Parser(AIRCRAFT_MSG))
+
+        assert 'power_ratio' not in record
+        assert record.get('power_ratio') is None
+        with pytest.raises(KeyError):
+            record['power_ratio']
+
+    def test_extra_keys(self):
+        record = records.ServerBeacon(**{'from': 'LKHS', 'custom': 1})
+
+        assert record['custom'] == 1
+        assert dict(record) == {'from': 'LKHS', 'custom': 1}
+
+    def test_drop_raw(self):
+        data = parser.Parser(AIRCRAFT_MSG)
+        record = records.Beacon.from_dict(data, keep_raw=False)
+
+        assert 'raw' not in record
+        assert 'raw' in data
+
+
+class TestRecordParser:
+
+    def test_call(self):
+        record = records.RecordParser()(AIRCRAFT_MSG)
+
+        assert isinstance(record, records.AircraftBeacon)
+        assert record['raw'] == AIRCRAFT_MSG
+
+    def test_call_keep_raw(self):
+        record = records.RecordParser(keep_raw=False)(AIRCRAFT_MSG)
+        assert 'raw' not in record
+
+    def test_parse_many(self):
+        failures = []
+        parsed = list(records.RecordParser().parse_many(
+            [AIRCRAFT_MSG, 'invalid', SERVER_MSG], failures))
+
+        assert ([type(r) for r in parsed] ==
+                [records.AircraftBeacon, records.ServerBeacon])
+        assert len(failures) == 1
+
+
+class TestLazyAircraftBeacon:
+
+    def test_equal_to_dict(self):
+        for msg in get_messages():
+            record = records.LazyParser()(msg)
+            assert record == parser.Parser(msg)
+
+    def test_header_does_not_materialize(self, mocker):
+        mocker.spy(parser.APRS, '_parse_protocol_specific')
+        record = records.LazyParser()(AIRCRAFT_MSG)
+
+        for key in ['from', 'timestamp', 'latitude', 'longitude', 'altitude',
+                    'receiver', 'heading']:
+            record[key]
+        record.latitude
+        'relayer' in record
+
+        assert not record.is_materialized
+        parser.APRS._parse_protocol_specific.assert_not_called()
+
+    def test_materialize_once(self, mocker):
+        mocker.spy(parser.APRS, '_parse_protocol_specific')
+        record = records.LazyParser()(AIRCRAFT_MSG)
+
+        assert record.uid == '0ADD98C6'
+        assert abs(record['vertical_speed'] - 0.8026) < 0.001
+        assert record.is_materialized
+        assert parser.APRS._parse_protocol_specific.call_count == 1
+
+    def test_position_updated_eagerly(self):
+        record = records.LazyParser()(AIRCRAFT_MSG)
+        data = parser.Parser(AIRCRAFT_MSG)
+
+        assert record.latitude == data['latitude']
+        assert record.longitude == data['longitude']
+        assert not record.is_materialized
+
+    def test_missing_comment_field(self):
+        record = records.LazyParser()(AIRCRAFT_MSG)
+
+        assert 'power_ratio' not in record
+        with pytest.raises(AttributeError):
+            record.power_ratio
+
+    def test_comment_error(self):
+        record = records.LazyParser()(
+            'FNT1103CE>OGNFNT,qAS,FNB1103CE:/183734h5057.94N/00801.00Eg354/'
+            '001/A=001042 id1E1103CE')
+
+        assert record['from'] == 'FNT1103CE'
+        with pytest.raises(exceptions.ParseError):
+            record['vertical_speed']
+        with pytest.raises(exceptions.ParseError):
+            record.vertical_speed
+        assert not record.is_materialized
+
+    def test_multiple_third_decimals(self):
+        msg = AIRCRAFT_MSG.replace('!W83!', '!W12! !W34!')
+        record = records.LazyParser()(msg)
+        data = parser.Parser(msg)
+
+        assert record.latitude == data['latitude']
+        assert record.longitude == data['longitude']
+        assert record == data
+
+    def test_third_decimal_unused(self):
+        record = records.LazyAircraftBeacon(
+            {'latitude': 45.5, 'longitude': 11.5}, '!W83! id0ADD98C6',
+            parser.Parser)
+
+        assert record.latitude == 45.5
+        assert record.longitude == 11.5
+
+
+class TestLazyParser:
+
+    def test_server_message(self):
+        record = records.LazyParser()(STATUS_MSG)
+        assert isinstance(record, records.ServerStatus)
+
+    def test_call_failed(self):
+        with pytest.raises(exceptions.ParseError):
+            records.LazyParser()('FLR123456>APRS,')
+
+    def test_parse_many(self):
+        failures = []
+        parsed = list(records.LazyParser(keep_raw=False).parse_many(
+            [AIRCRAFT_MSG, 'invalid', SERVER_MSG], failures))
+
+        assert isinstance(parsed[0], records.LazyAircraftBeacon)
+        assert 'raw' not in parsed[0]
+        assert isinstance(parsed[1], records.ServerBeacon)
+        assert [f.index for f in failures] == [1]
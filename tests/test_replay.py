@@ -0,0 +1,139 @@
+import gzip
+import lzma
+import os
+from datetime import datetime
+
+import pytest
+
+from ogn_lib import client, exceptions, parser, replay, timestamps
+from tests.test_client import APRS_RECORDS
+
+
+# 2018-01-01 07:52:01 UTC, shortly after the timestamps of APRS_RECORDS
+RECEIVED = 1514793121.0
+
+
+def write(path, records, open_=open):
+    with open_(path, 'wb') as f:
+        for i, record in enumerate(records):
+            f.write('{:.3f} {}\n'.format(RECEIVED + i, record).encode())
+    return path
+
+
+@pytest.fixture
+def resolver():
+    return timestamps.TimestampResolver()
+
+
+class TestReplay:
+
+    @pytest.mark.parametrize('extension,open_', [
+        ('', open), ('.gz', gzip.open), ('.xz', lzma.open)])
+    def test_records(self, tmpdir, extension, open_):
+        path = write(str(tmpdir.join('rec.log' + extension)), APRS_RECORDS,
+                     open_)
+
+        assert list(replay.Replay(path).records()) == [
+            (RECEIVED + i, r) for i, r in enumerate(APRS_RECORDS)]
+
+    def test_multiple_files(self, tmpdir):
+        paths = [write(str(tmpdir.join('a.log')), APRS_RECORDS[:1]),
+                 write(str(tmpdir.join('b.log')), APRS_RECORDS[1:]),
+                 write(str(tmpdir.join('c.log')), [])]
+
+        assert [r for _, r in replay.Replay(paths).records()] == APRS_RECORDS
+
+    def test_receive_raw(self, tmpdir, resolver):
+        path = write(str(tmpdir.join('rec.log')), APRS_RECORDS)
+        r = replay.Replay(path, resolver=resolver)
+        received = []
+        r.receive(received.append, prefilter=lambda x: 'EDER' not in x)
+
+        assert received == [APRS_RECORDS[0], APRS_RECORDS[2]]
+        assert r.lines == 3
+        assert r.lines_per_second > 0
+
+    def test_receive_parser(self, tmpdir, mocker):
+        path = write(str(tmpdir.join('rec.log')),
+                     APRS_RECORDS + ['invalid message'])
+        mocker.patch.object(client.message_log, 'report')
+        r = replay.Replay(path)
+        received = []
+        r.receive(received.append, parser=parser.Parser)
+
+        assert [b['timestamp'] for b in received] == [
+            datetime(2018, 1, 1, 7, 52, 1)] * 3
+        assert client.message_log.report.call_count == 1
+        assert parser.Parser.timestamp_resolver._fixed is None
+
+    def test_reference(self, tmpdir, resolver):
+        path = write(str(tmpdir.join('rec.log')), APRS_RECORDS)
+        references = []
+        r = replay.Replay(path, resolver=resolver)
+        r.receive(lambda x: references.append(resolver.reference))
+
+        assert references == [datetime(2018, 1, 1, 7, 52, 1 + i)
+                              for i in range(3)]
+        assert resolver._fixed is None
+
+    def test_reference_restored(self, tmpdir):
+        path = write(str(tmpdir.join('rec.log')), APRS_RECORDS)
+        reference = datetime(2019, 6, 1, 12, 0, 0)
+        resolver = timestamps.TimestampResolver(reference)
+
+        list(replay.Replay(path, resolver=resolver).messages())
+        assert resolver.fixed_reference == reference
+        assert resolver.reference == reference
+
+    def test_malformed(self, tmpdir, resolver, mocker):
+        path = str(tmpdir.join('rec.log'))
+        with open(path, 'wb') as f:
+            f.write('{} {}\n'.format(RECEIVED, APRS_RECORDS[0]).encode())
+            f.write(b'1514793\n')  # truncated
+            f.write(b'\n')
+            f.write(b'1514793x1.000 FLRDDA5BA>APRS\n')
+            f.write('{} {}\n'.format(RECEIVED, APRS_RECORDS[1]).encode())
+        mocker.patch.object(client.message_log, 'report')
+
+        r = replay.Replay(path, resolver=resolver)
+        assert list(r.messages()) == APRS_RECORDS[:2]
+        assert r.malformed == 2
+        assert r.lines == 2
+        assert [c[0][1] for c in client.message_log.report.call_args_list] == [
+            'malformed-record'] * 2
+
+    def test_speed(self, tmpdir, resolver, mocker):
+        path = write(str(tmpdir.join('rec.log')), APRS_RECORDS)
+        mocker.patch('time.sleep')
+        mocker.patch('time.monotonic', return_value=0)
+
+        replay.Replay(path, speed=2, resolver=resolver).receive(
+            lambda x: None)
+
+        assert [c[0][0] for c in replay.time.sleep.call_args_list] == [
+            0.5, 1.0]
+
+    def test_fast(self, tmpdir, resolver, mocker):
+        path = write(str(tmpdir.join('rec.log')), APRS_RECORDS)
+        mocker.patch('time.sleep')
+
+        replay.Replay(path, resolver=resolver).receive(lambda x: None)
+        assert not replay.time.sleep.called
+
+    def test_empty_file(self, tmpdir, resolver):
+        path = str(tmpdir.join('rec.log'))
+        open(path, 'w').close()
+
+        assert os.path.getsize(path) == 0
+        assert list(replay.Replay(path, resolver=resolver).messages()) == []
+
+    def test_parse_error_not_raised(self, tmpdir, resolver):
+        path = write(str(tmpdir.join('rec.log')), APRS_RECORDS[:1])
+
+        def fail(line):
+            raise exceptions.ParseError()
+
+        received = []
+        replay.Replay(path, resolver=resolver).receive(received.append,
+                                                       parser=fail)
+        assert received == []
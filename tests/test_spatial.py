@@ -0,0 +1,127 @@
+import random
+from datetime import datetime, timedelta
+
+from ogn_lib import fleet, spatial
+
+
+def random_grid(n, seed=0, cell_size=0.25):
+    rnd = random.Random(seed)
+    grid = spatial.SpatialGrid(cell_size)
+    positions = {}
+    for i in range(n):
+        lat, lon = rnd.uniform(-90, 90), rnd.uniform(-180, 180)
+        grid.move(i, lat, lon)
+        positions[i] = (lat, lon)
+    return grid, positions
+
+
+class TestDistance:
+
+    def test_distance(self):
+        assert spatial.distance(46, 14, 46, 14) == 0
+        assert abs(spatial.distance(0, 0, 1, 0) -
+                   spatial.METERS_PER_DEGREE) < 1e-6
+        assert abs(spatial.distance(0, 179.5, 0, -179.5) -
+                   spatial.METERS_PER_DEGREE) < 1e-6
+
+
+class TestSpatialGrid:
+
+    def test_move(self):
+        g = spatial.SpatialGrid(1)
+        g.move('A', 46.5, 14.5)
+        g.move('A', 46.6, 14.6)
+        assert len(g._cells) == 1
+        assert g.position('A') == (46.6, 14.6)
+
+        g.move('A', 47.5, 14.5)
+        assert len(g._cells) == 1
+        assert g._positions['A'] == (47, 14)
+        assert len(g) == 1
+        assert 'A' in g
+
+    def test_remove(self):
+        g = spatial.SpatialGrid()
+        g.move('A', 46.5, 14.5)
+
+        assert g.remove('A')
+        assert not g.remove('A')
+        assert len(g) == 0
+        assert g._cells == {}
+        assert g.position('A') is None
+
+    def test_update(self):
+        g = spatial.SpatialGrid()
+        assert g.update({'uid': 'A', 'from': 'FLRA', 'latitude': 46.5,
+                         'longitude': 14.5})
+        assert g.update({'from': 'OGNB', 'latitude': 46.5,
+                         'longitude': 14.5})
+        assert not g.update({'from': 'LJLJ'})
+        assert 'A' in g
+        assert 'OGNB' in g
+
+    def test_within_bbox(self):
+        g = spatial.SpatialGrid()
+        g.move('A', 46.5, 14.5)
+        g.move('B', 46.0, 15.5)
+        g.move('C', -10, 179.9)
+        g.move('D', -10, -179.9)
+
+        assert sorted(k for k, _, _ in g.within_bbox(46, 14, 47, 15)) == ['A']
+        assert sorted(k for k, _, _ in g.within_bbox(46, 14, 47, 16)) == [
+            'A', 'B']
+        assert sorted(k for k, _, _ in g.within_bbox(-11, 179, -9, -179)) == [
+            'C', 'D']
+        assert g.within_bbox(0, 0, 1, 1) == []
+
+    def test_within_bbox_matches_scan(self):
+        rnd = random.Random(1)
+        g, positions = random_grid(2000)
+
+        for _ in range(100):
+            south, north = sorted(rnd.uniform(-90, 90) for _ in range(2))
+            west, east = sorted(rnd.uniform(-180, 180) for _ in range(2))
+
+            expected = sorted(k for k, (lat, lon) in positions.items()
+                              if south <= lat <= north and west <= lon <= east)
+            assert sorted(k for k, _, _ in
+                          g.within_bbox(south, west, north, east)) == expected
+
+    def test_within_radius(self):
+        g = spatial.SpatialGrid()
+        g.move('A', 46.0, 14.0)
+        g.move('B', 46.1, 14.0)
+        g.move('C', 46.0, 14.2)
+
+        result = g.within_radius(46.0, 14.0, 12000)
+        assert [k for k, _ in result] == ['A', 'B']
+        assert abs(result[1][1] - 0.1 * spatial.METERS_PER_DEGREE) < 1
+
+    def test_within_radius_matches_scan(self):
+        rnd = random.Random(2)
+        g, positions = random_grid(2000)
+        centers = [(89.9, 0), (-89.9, 0), (0, 179.9), (0, -179.9)]
+        centers += [(rnd.uniform(-90, 90), rnd.uniform(-180, 180))
+                    for _ in range(100)]
+
+        for lat, lon in centers:
+            radius = rnd.choice([10000, 200000, 2000000])
+            expected = sorted(
+                k for k, (plat, plon) in positions.items()
+                if spatial.distance(lat, lon, plat, plon) <= radius)
+            assert sorted(k for k, _ in
+                          g.within_radius(lat, lon, radius)) == expected
+
+    def test_fleet_index(self):
+        g = spatial.SpatialGrid()
+        f = fleet.FleetState(ttl=60, index=g)
+        t0 = datetime(2018, 1, 1)
+
+        f.update({'uid': 'A', 'timestamp': t0, 'latitude': 46.5,
+                  'longitude': 14.5})
+        f.update({'uid': 'B', 'timestamp': t0 + timedelta(seconds=61),
+                  'latitude': 46.6, 'longitude': 14.5})
+
+        assert [k for k, _, _ in g.within_bbox(46, 14, 47, 15)] == ['B']
+        f.clear()
+        assert len(g) == 0
@@ -0,0 +1,82 @@
+import pytest
+from datetime import datetime
+
+from ogn_lib import parser, timestamps
+
+
+class TestTimestampResolver:
+
+    def test_resolve_time(self):
+        resolver = timestamps.TimestampResolver(datetime(2018, 4, 1, 12))
+        assert resolver.resolve_time('113005') == datetime(2018, 4, 1, 11, 30, 5)
+
+    def test_resolve_time_future(self):
+        resolver = timestamps.TimestampResolver(datetime(2018, 4, 1, 12))
+        assert resolver.resolve_time('120500') == datetime(2018, 4, 1, 12, 5)
+        assert resolver.resolve_time('120501') == datetime(2018, 3, 31, 12, 5, 1)
+
+    def test_resolve_time_rollover(self):
+        resolver = timestamps.TimestampResolver(datetime(2018, 4, 1, 0, 1))
+        assert resolver.resolve_time('235959') == datetime(2018, 3, 31, 23, 59, 59)
+        assert resolver.resolve_time('000030') == datetime(2018, 4, 1, 0, 0, 30)
+
+    def test_resolve_time_invalid(self):
+        resolver = timestamps.TimestampResolver(datetime(2018, 4, 1, 12))
+        with pytest.raises(ValueError):
+            resolver.resolve_time('250000')
+
+    def test_resolve_time_memoized(self):
+        resolver = timestamps.TimestampResolver(datetime(2018, 4, 1, 12))
+        assert (resolver.resolve_time('113005') is
+                resolver.resolve_time('113005'))
+
+    def test_resolve_time_cache_limit(self, mocker):
+        mocker.patch.object(timestamps.TimestampResolver, 'MAX_CACHED', 2)
+        resolver = timestamps.TimestampResolver(datetime(2018, 4, 1, 12))
+        for ts in ('000001', '000002', '000003'):
+            resolver.resolve_time(ts)
+
+        assert list(resolver._snapshot[2]) == ['000003']
+
+    def test_set_reference(self):
+        resolver = timestamps.TimestampResolver(datetime(2018, 4, 1, 12))
+        resolver.resolve_time('113005')
+
+        resolver.set_reference(datetime(2018, 5, 2, 12))
+        assert resolver.reference == datetime(2018, 5, 2, 12)
+        assert resolver.resolve_time('113005') == datetime(2018, 5, 2, 11, 30, 5)
+
+    def test_wall_clock_snapshot(self, mocker):
+        monotonic = mocker.patch('ogn_lib.timestamps.time_module.monotonic',
+                                 return_value=100)
+        resolver = timestamps.TimestampResolver()
+        reference = resolver.reference
+
+        monotonic.return_value = 100.5
+        assert resolver.reference is reference
+
+        monotonic.return_value = 101
+        assert (resolver.reference - reference).total_seconds() >= 0
+        assert resolver._expires == 102
+
+    def test_wall_clock(self):
+        resolver = timestamps.TimestampResolver(datetime(2018, 4, 1, 12))
+        resolver.set_reference(None)
+
+        assert abs((resolver.reference - datetime.utcnow())
+                   .total_seconds()) < 2
+
+    def test_resolve_datetime(self):
+        resolver = timestamps.TimestampResolver(datetime(2018, 4, 1, 12))
+        assert resolver.resolve_datetime('031530') == datetime(2018, 4, 3, 15, 30)
+
+    def test_parser(self):
+        resolver = parser.Parser.timestamp_resolver
+        try:
+            resolver.set_reference(datetime(2018, 4, 1, 0, 1))
+            data = parser.Parser(
+                "FLRDDEEF1>OGCAPT,qAS,CAPTURS:/235959h4845.03N/00230.46E'000/000")
+        finally:
+            resolver.set_reference(None)
+
+        assert data['timestamp'] == datetime(2018, 3, 31, 23, 59, 59)
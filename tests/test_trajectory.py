@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+import pytest
+
+from tests.beacons import T0, beacon
+
+numpy = pytest.importorskip('numpy')
+trajectory = pytest.importorskip('ogn_lib.trajectory')
+
+S0 = (T0 - trajectory.EPOCH).total_seconds()
+
+
+class TestTrajectoryStore:
+
+    def test_append(self):
+        store = trajectory.TrajectoryStore(capacity=4)
+        assert store.append(beacon(0, uid='A'))
+        assert store.append(beacon(1, altitude=None, uid='A'))
+
+        track = store.track('A')
+        assert list(track['timestamp']) == [S0, S0 + 1]
+        assert track['altitude'][0] == 1000
+        assert numpy.isnan(track['altitude'][1])
+        assert numpy.isnan(track['vertical_speed']).all()
+        assert len(store) == 1
+        assert 'A' in store
+
+    def test_ignored(self):
+        store = trajectory.TrajectoryStore()
+        assert not store.append({'uid': 'A', 'timestamp': T0})
+        store.append(beacon(10, uid='A'))
+        assert not store.append(beacon(5, uid='A'))
+        assert len(store.track('A')) == 1
+
+    def test_ring(self):
+        store = trajectory.TrajectoryStore(capacity=4)
+        for i in range(10):
+            store.append(beacon(i, uid='A'))
+            track = store.track('A')
+            assert list(track['timestamp'] - S0) == list(
+                range(max(0, i - 3), i + 1))
+
+    def test_ring_fields(self):
+        store = trajectory.TrajectoryStore(capacity=8)
+        for i in range(30):
+            store.append(beacon(i, uid='A', altitude=float(i), heading=i))
+            track = store.track('A')
+            expected = list(range(max(0, i - 7), i + 1))
+            assert list(track['altitude']) == expected
+            assert list(track['heading']) == expected
+            assert list(track['timestamp'] - S0) == expected
+
+    def test_view(self):
+        store = trajectory.TrajectoryStore(capacity=4)
+        for i in range(6):
+            store.append(beacon(i, uid='A'))
+
+        track = store.track('A')
+        assert track.base is not None
+        assert numpy.shares_memory(track, store._buffer)
+
+    def test_max_age(self):
+        store = trajectory.TrajectoryStore(capacity=10, max_age=3)
+        for i in range(8):
+            store.append(beacon(i, uid='A'))
+
+        assert list(store.track('A')['timestamp'] - S0) == [4, 5, 6, 7]
+        assert len(store.track('A', max_age=100)) == 8
+
+    def test_append_point(self):
+        store = trajectory.TrajectoryStore()
+        store.append_point('X', 10.0, 46.0, 14.0, heading=180)
+
+        track = store.track('X')
+        assert track['heading'][0] == 180
+        assert track['latitude'][0] == 46.0
+        assert store.track('Y') is None
+
+    def test_grow(self):
+        store = trajectory.TrajectoryStore(capacity=4, initial_aircraft=2)
+        for uid in 'ABCDE':
+            store.append(beacon(0, uid=uid))
+            store.append(beacon(1, uid=uid))
+
+        assert len(store._buffer) == 8
+        assert sorted(store.keys()) == list('ABCDE')
+        assert all(len(store.track(uid)) == 2 for uid in 'ABCDE')
+
+    def test_remove_evict(self):
+        store = trajectory.TrajectoryStore(initial_aircraft=2)
+        store.append(beacon(0, uid='A'))
+        store.append(beacon(10, uid='B'))
+
+        assert store.evict(T0 + timedelta(seconds=5)) == 1
+        assert 'A' not in store
+        assert store.remove('B')
+        assert not store.remove('B')
+
+        # rows are reused
+        store.append(beacon(20, uid='C'))
+        assert len(store._buffer) == 2
+        assert len(store.track('C')) == 1